@@ -8,12 +8,60 @@ with the least cost and earliest time.
 City    : A city graph with the concept of multiverse.
 Location: A location in the city, which can be a regular location or a train station.
 Road    : A road between two locations.
+WaitRoad: The implicit road of waiting one minute at a location.
 MinHeap : A MinHeap for efficient selection of the minimum cost location.
+DijkstraSearch : A resumable dijkstra search over the multiverse of a city.
+LabelSearch : A dijkstra search that labels only the locations it reaches, forward or backward.
+SearchStats : Counters of a dijkstra search.
+SearchState : Costs, times, previous locations and visits of a search, in integer arrays.
+HubLabelIndex : A hub-label index for repeated queries between locations in the multiverse.
+DenseIndex : A table of routes between all locations in the multiverse of a small city.
+InterceptCache : Cached intercept() results, invalidated by the roads their routes use.
+LandmarkTable : Landmark distances in reality, as lower bounds for A* searches.
+
+:Functions:
+preprocess_roads : Reduces roads in reality before the multiverse is constructed.
+snapshot_diff    : Added, removed and changed roads between two snapshots of a road network.
+compact_locations : Maps sparse location numbers to dense indices.
+locality_order   : Order of the locations in reality that keeps the ends of roads close together.
+station_reach    : Finds the locations in reality that can reach any train station.
+train_schedule   : Accumulated train duration of each station from the friend's start.
+expand_profile   : Cost and time of a time-dependent road in each multiverse layer.
+build_route      : Builds a route of location numbers from the locations travelled.
+intercept        : Searches for the best route to intercept a friend on the train loop.
+set_profiler     : Sets the profiler that times the stages of intercept().
+intercept_many   : Answers many interception queries on one city, with a dense table for small cities.
+min_cost_assignment : Least cost assignment of rows to columns by the Hungarian algorithm.
+assign_fleet     : Assigns drivers to friends with one search for each driver or each friend.
+intercept_async  : Asynchronous intercept() that gives control back to the event loop during the search.
 
 """
 
 __author__ = "Er Jun Yet"
 
+import asyncio
+import copy
+import functools
+import json
+import time as clock
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Cost and time of a location not yet reached, the largest 64-bit integer
+INF = 2 ** 63 - 1
+
+# Profiler of the stages of intercept(), from set_profiler(), None when the stages are not timed
+_profiler = None
+
+# Largest table of intercept_many() in dense mode, and the distinct starts needed per N * N rows of the table,
+# as a dense table takes about as long as a search from each of N * N / DENSE_STARTS_PER_ROWS starts
+DENSE_ROW_LIMIT = 2000
+DENSE_STARTS_PER_ROWS = 1000
+
 
 class City:
     """
@@ -50,16 +98,34 @@ class City:
         total_reality_location      (int)       : Total number of all locations in reality.
         total_multiverse            (int)       : Total number of all multiverse layers.
         total_multiverse_locations  (int)       : Total number of all locations in all multiverse.
-        multiverse_locations   (List[Location]) : A list of all Location objects in multiverse.
+        multiverse_locations   (List[Location]) : A list of all Location objects in multiverse, None for the locations pruned by station_reachable.
         total_train_duration        (int)       : Total time for a train to loop through all stations.
         acum_train_duration       (List[int])   : Accumulated time for each station in the train loop.
+        station_targets           (dict)        : Maps the index of each interception location in the multiverse to its station.
         multiverse_count            (int)       : Equals total_train_duration. Represents total temporal layers.
         total_location              (int)       : Total number of nodes across all multiverse layers.
         locations           (List[Location])    : All Location nodes in the multiverse graph.
         station_position        (List[int])     : Maps each location number to its index in the station list.
+        wait_cost               (int or None)   : Cost per minute of waiting at a location, None when waiting is disabled.
+        contracted_roads            (dict)      : Maps a contracted road (start, end, cost, time) to the location numbers it passes through.
+        station_reachable       (Set[int] or None) : Locations in reality that can reach a train station, None when the city is not pruned.
+        road_profiles           (dict or None)  : Cost and time windows of the roads whose cost and time depend on the time of day.
+        state               (SearchState)       : Cost, time, previous location and visit of each location for the current search.
+        order                   (str or None)   : Locality order of the locations in reality, "bfs" or "rcm", None for the location numbers.
+        layout                      (str)       : "layer" when the locations of a layer are consecutive, "location" when the layers of a location are.
+        location_order    (List[int] or None)   : Location number in reality at each rank of the order, None without an order.
+        location_rank     (List[int] or None)   : Rank of each location number in reality in the order, None without an order.
+        roads   (List[Tuple[int, int, int, int]]) : The roads of the city, before pruning, for apply_diff().
+        stations        (List[Tuple[int, int]]) : The train stations with their travel time.
+        friend_start                (int)       : Starting location number of the friend (on the train).
+        incoming_roads    (List[List[Road]] or None) : Incoming roads of each location, constructed by reverse_roads().
+        landmarks       (LandmarkTable or None) : Landmark distances of the city in reality, for A* searches.
+        station_potential (List[int] or None)   : Lower bound of the cost from each location to a station, from the landmarks.
+        horizon             (int or None)       : Latest absolute time of the multiverse, None when the layers are the times of one train loop.
 
     """
-    def __init__(self, roads, stations, friend_start):
+    def __init__(self, roads, stations, friend_start, wait_cost=None, contracted_roads=None, station_reachable=None, road_profiles=None,
+                 order=None, layout="layer", horizon=None):
         """
         :Function description:
             A City constructor that constructs a city graph with the concept of multiverse.
@@ -68,6 +134,28 @@ class City:
             roads       (List[Tuple[int, int, int, int]]) : A list of roads in the city, where each road contains the start, end, cost, time of this road.
             stations    (List[Tuple[int, int]])           : A list of train stations in the city, where each station contains the station_no and time_travel of this station.
             friend_start (int)                            : Starting location number of the friend (on the train).
+            wait_cost   (int or None)                     : Cost per minute of waiting at a location. When given, every location in the multiverse
+                                                            has an implicit road of 1 minute to the same location in the next multiverse, which
+                                                            is generated during dijkstra_search and never stored. None disables waiting.
+            contracted_roads (dict or None)               : Contracted roads from preprocess_roads(), used to expand routes back to the original roads.
+            station_reachable (Set[int] or None)          : Locations from station_reach(). Any other location and the roads from or to it are
+                                                            excluded from the multiverse, as they never lead to an interception, leaving None
+                                                            in multiverse_locations. The search state keeps a slot for every index, so that
+                                                            node_index() is unchanged. None keeps every location and road.
+            road_profiles (dict or None)                  : Maps a road (start, end, cost, time) to its windows of (first_layer, cost, time),
+                                                            in order of first_layer. A road leaving in a multiverse layer takes the cost and
+                                                            time of the last window started by that layer, and its own cost and time before
+                                                            the first window. None gives every road the same cost and time in every layer.
+            order       (str or None)                     : Order of the locations in reality in multiverse_locations, "bfs" or "rcm" from
+                                                            locality_order(), so that the locations of a road are stored close together.
+                                                            None keeps the order of the location numbers.
+            layout      (str)                             : "layer" to store the multiverse layer by layer, or "location" to store the
+                                                            layers of each location together.
+            horizon     (int or None)                     : Latest absolute time to be reached. When given, the multiverse layers are the
+                                                            absolute times from 0 to the horizon rather than the times of one train loop,
+                                                            and roads arriving after the horizon are left out, so that a search keeps the
+                                                            least cost route to each location at each time of every loop up to the horizon.
+                                                            The multiverse then has horizon + 1 layers. None wraps around the train loop.
 
         :Time complexity:
             O(R + S + ML + MR) --> O(MR + ML) --> O(R + L)
@@ -93,13 +181,34 @@ class City:
             a constant, depending on the maximum duration of the entire train loop. Thus, the dominating space complexity is O(L + R).
             
         """
-        # Total number of locations in reality
+        if layout not in ("layer", "location"):
+            raise ValueError(f"Unknown layout {layout!r}, expected 'layer' or 'location'.")
+
+        # Total number of locations in reality, including stations without roads
         total_reality_location = 0
         for start, end, cost, time in roads:
             total_reality_location = max(total_reality_location, start+1, end+1)
+        for station_no, travel_time in stations:
+            total_reality_location = max(total_reality_location, station_no+1)
         self.total_reality_location = total_reality_location
 
+        # Layout of multiverse_locations, needed by node_index() from here on
+        self.order = order
+        self.layout = layout
+        self.location_major = layout == "location"
+        self.horizon = horizon
+        self.location_order = None
+        self.location_rank = None
+
+        # Locations in reality renumbered so that the ends of each road are close in multiverse_locations
+        if order is not None:
+            self.location_order = locality_order(roads, total_reality_location, order)
+            self.location_rank = [0] * total_reality_location
+            for rank in range(total_reality_location):
+                self.location_rank[self.location_order[rank]] = rank
+
         # Construction of train stations info
+        self.stations = stations
         station_duration = [0] * len(stations)
         for i in range(len(stations)):
             station_no, travel_time = stations[i]
@@ -108,603 +217,3994 @@ class City:
         # Total duration of train loop
         self.total_train_duration = sum(station_duration)
 
-        # Track friend's position
-        friend_position = -1
-        for i in range(len(stations)):
-            station_no = stations[i][0]
-            if station_no == friend_start:
-                friend_position = i
-                break
+        # Existence of multiverse, one loop of the train or every time up to the horizon, needed by set_friend_start()
+        self.total_multiverse = self.total_train_duration if horizon is None else horizon + 1
+        self.total_multiverse_location = self.total_reality_location * self.total_multiverse
 
-        # Track each accumulated train duration
-        self.acum_train_duration = [0] * len(stations)
-        duration = 0
-        for i in range(len(stations)):
-            self.acum_train_duration[friend_position] = duration
-            duration += station_duration[friend_position]
-            friend_position = (friend_position + 1) % len(stations)
+        # Track friend's position and each accumulated train duration
+        self.set_friend_start(friend_start)
 
-        # Existence of multiverse
-        self.total_multiverse = self.total_train_duration
-        self.total_multiverse_location = self.total_reality_location * self.total_multiverse
+        # Waiting at a location is an implicit road, never constructed
+        self.wait_cost = wait_cost
+
+        # Incoming roads, only constructed for backward searches
+        self.incoming_roads = None
+
+        # Landmarks, only constructed by build_landmarks()
+        self.landmarks = None
+        self.station_potential = None
+
+        # Contracted roads to be expanded in routes
+        self.contracted_roads = contracted_roads if contracted_roads is not None else {}
+
+        # Dead-end locations that never reach a train station are pruned
+        self.roads = roads
+        self.station_reachable = station_reachable
+        if station_reachable is not None:
+            roads = [road for road in roads if road[0] in station_reachable and road[1] in station_reachable]
 
-        # Construction of locations across multiverse
-        self.multiverse_locations = []
+        # Cost and time of the time-dependent roads in each multiverse layer
+        self.road_profiles = road_profiles
+        layer_roads = {}
+        if road_profiles:
+            for road in roads:
+                if road in road_profiles and road not in layer_roads:
+                    layer_roads[road] = expand_profile(road_profiles[road], self.total_train_duration, road[2], road[3])
+
+        # Construction of locations across multiverse, each at its index in the layout, except the pruned ones
+        self.multiverse_locations = [None] * self.total_multiverse_location
         for multiverse in range(self.total_multiverse):
             for location in range(self.total_reality_location):
-                self.multiverse_locations.append(Location(location))
+                if station_reachable is not None and location not in station_reachable:
+                    continue
+                index = self.node_index(multiverse, location)
+                self.multiverse_locations[index] = Location(location, self, index)
 
         # Construction of roads across multiverse
         for layer in range(self.total_multiverse):
-            for start, end, cost, time in roads:
-                starting = layer * self.total_reality_location + start
-                multiverse = (layer + time) % self.total_multiverse
-                ending = multiverse * self.total_reality_location + end
+            for road in roads:
+                start, end, cost, time = road
+                if road in layer_roads:
+                    cost, time = layer_roads[road][layer % self.total_train_duration]
+                multiverse = self.arrival_layer(layer, time)
+                if multiverse is None:
+                    continue
+                starting = self.node_index(layer, start)
+                ending = self.node_index(multiverse, end)
                 self.multiverse_locations[starting].add_road(Road(starting, ending, cost, time))
-    
-    def dijkstra_search(self, start):
+
+        # Search state of every location, in arrays rather than in each Location
+        self.state = SearchState(len(self.multiverse_locations))
+
+    def apply_diff(self, diff):
         """
         :Function description:
-            Search for the least cost paths from start location across all multiverses.
+            A city of the next snapshot of the road network, from this city and the difference between the snapshots.
+            The new city shares every Location of this city whose outgoing roads are unchanged, with their Road
+            objects, and constructs only the locations whose outgoing roads changed, in every multiverse layer.
+            This city is not modified, so its searches remain valid.
 
         :Approach description:
-            1. Constructs a MinHeap of locations with its costs
-            2. Get the minimum cost location from the heap.
-            3. Visit each outgoing roads from the current location.
-            4. Select the value with the lowest cost and time.
-            5. Update the heap with the new cost and time and continue comparing.
+            1.  Remove the removed and changed roads from the roads of the city, and add the added and changed roads.
+            2.  Construct a new city when the number of locations or the train loop duration changes, as the
+                multiverse itself changes.
+            3.  Otherwise compare the outgoing roads of each location, after pruning, with those of this city.
+            4.  Construct locations bound to the new city, sharing the outgoing roads of unchanged locations, and
+                rebuild the outgoing roads of those whose roads changed.
 
         :Input:
-            start (int): Starting location number
+            diff (dict) : Lists of "added" roads, "removed" roads and "changed" roads as (old, new) pairs, as from
+                          snapshot_diff(), and optionally the new "stations"
+
+        :Output:
+            City - The city of the next snapshot, with the same friend_start
 
         :Time complexity:
-            O(R log L), where R is the number of roads and L is the number of locations.
+            O(R + ML + MD), where R is the number of roads, L is the number of locations, M is the number of
+            multiverse layers and D is the number of outgoing roads of the changed locations.
 
         :Time complexity analysis:
-            - O(L) to construct heap array for location costs
-            - O(log L) to get the minimum cost location from heap
-            - O(R) to explore each and every outgoing roads
-            - O(log L) to update the heap for each road
-            Thus, the overall time complexity is O(R log L).
+            - O(R) to apply the diff to the roads and compare the outgoing roads of each location.
+            - O(ML) to construct the locations of the new city and allocate the search state.
+            - O(MD) to construct the changed locations in every multiverse layer.
 
         :Space complexity:
-            O(R + L), where R is the number of roads and L is the number of locations.
-
-        :Space complexity analysis:
-            Input space of O(R) for the number of roads and auxiliary space of O(L) for location_cost. 
+            O(R + ML + MD), as the time complexity.
 
         """
-        
-        # Reset city cost for each location
-        location_cost = self.reset_city(start)
-        
-        # Construction of MinHeap arranged by minimum cost
-        location_heap = MinHeap(location_cost)
-        
-        while not location_heap.is_empty():
-            # Choose location with lowest cost
-            current_cost, location_no = location_heap.get_min()
-            chosen_location = self.multiverse_locations[location_no]
-            current_time = chosen_location.time
-            
-            if chosen_location.visited:
-                continue
-            chosen_location.visited = True
-            
-            # Visit each outgoing roads
-            for road in chosen_location.outgoing_roads:     
-                new_cost = current_cost + road.cost
-                new_time = current_time + road.time
-                next_location = self.multiverse_locations[road.end]
-                another_cost = next_location.cost
-                another_time = next_location.time
-
-                # New cost or time lesser than current
-                if (next_location.visited == False) and (new_cost < another_cost or (new_cost == another_cost and new_time < another_time)):
-                    next_location.cost = new_cost
-                    next_location.time = new_time
-                    next_location.previous_location = chosen_location
-                    location_heap.update(road.end, new_cost)
-    
-    def reset_city(self, start):
+        if self.contracted_roads:
+            raise ValueError("A city of preprocessed roads cannot take a diff of the original roads.")
+
+        # Roads of the next snapshot
+        removed = list(diff.get("removed", ()))
+        added = list(diff.get("added", ()))
+        for old_road, new_road in diff.get("changed", ()):
+            removed.append(old_road)
+            added.append(new_road)
+        removing = {}
+        for road in removed:
+            removing[road] = removing.get(road, 0) + 1
+        roads = []
+        for road in self.roads:
+            if removing.get(road):
+                removing[road] -= 1
+            else:
+                roads.append(road)
+        if any(removing.values()):
+            raise ValueError("A removed road is not a road of the city.")
+        roads.extend(added)
+        stations = diff.get("stations", self.stations)
+        station_reachable = station_reach(roads, stations) if self.station_reachable is not None else None
+
+        # A different multiverse is constructed again
+        total_reality_location = 0
+        for start, end, cost, time in roads:
+            total_reality_location = max(total_reality_location, start+1, end+1)
+        for station_no, travel_time in stations:
+            total_reality_location = max(total_reality_location, station_no+1)
+        total_train_duration = sum(travel_time for station_no, travel_time in stations)
+        if total_reality_location != self.total_reality_location or total_train_duration != self.total_train_duration:
+            return City(roads, stations, self.friend_start, self.wait_cost, None, station_reachable, self.road_profiles,
+                        self.order, self.layout, self.horizon)
+
+        # Locations whose outgoing roads changed
+        old_roads = _outgoing_roads(self.roads, self.station_reachable)
+        new_roads = _outgoing_roads(roads, station_reachable)
+        changed = [location for location in range(self.total_reality_location)
+                   if old_roads.get(location) != new_roads.get(location)]
+
+        city = copy.copy(self)
+        city.roads = roads
+        city.stations = stations
+        city.station_reachable = station_reachable
+        city.incoming_roads = None
+        city.landmarks = None
+        city.station_potential = None
+        # Locations are bound to their city for the search state, so unchanged ones share only their roads
+        # A location pruned in either city has changed roads, unless it is pruned in both
+        city.multiverse_locations = [None] * len(self.multiverse_locations)
+        for index, old_location in enumerate(self.multiverse_locations):
+            if old_location is not None:
+                location = Location(old_location.location_no, city, index)
+                location.outgoing_roads = old_location.outgoing_roads
+                city.multiverse_locations[index] = location
+        layer_roads = {}
+        if self.road_profiles:
+            for location in changed:
+                for road in new_roads.get(location, ()):
+                    if road in self.road_profiles:
+                        layer_roads[road] = expand_profile(self.road_profiles[road], self.total_train_duration, road[2], road[3])
+        for layer in range(self.total_multiverse):
+            for location in changed:
+                starting = self.node_index(layer, location)
+                if station_reachable is not None and location not in station_reachable:
+                    city.multiverse_locations[starting] = None
+                    continue
+                city.multiverse_locations[starting] = Location(location, city, starting)
+                for road in new_roads.get(location, ()):
+                    start, end, cost, time = road
+                    if road in layer_roads:
+                        cost, time = layer_roads[road][layer % self.total_train_duration]
+                    multiverse = self.arrival_layer(layer, time)
+                    if multiverse is not None:
+                        ending = self.node_index(multiverse, end)
+                        city.multiverse_locations[starting].add_road(Road(starting, ending, cost, time))
+        city.set_friend_start(self.friend_start)
+        city.state = SearchState(len(city.multiverse_locations))
+        return city
+
+    def set_friend_start(self, friend_start):
         """
         :Function description:
-            Resets location heap of costs and times for all city locations for dijsktra algorithm.
+            Tracks the accumulated train duration of each station from the friend's starting station, and the
+            interception location of each station: the station in the multiverse layer of the friend's arrival.
+            The multiverse does not depend on the friend, so a city can be reused for another friend.
 
         :Input:
-            start (int): The starting location number
+            friend_start (int) : Starting location number of the friend (on the train).
 
-        :Output:
-            list[tuple]: A list of tuples (cost, location_no) for initialising the MinHeap
-        
         :Time complexity:
-            O(L), where L is the number of locations.
+            O(S), where S is the number of stations.
 
-        :Time complexity analysis:
-            Linear time for reassigning each location's cost and time.
-        
         :Space complexity:
-            O(L), where L is the number of locations.
-
-        :Space complexity analysis:
-            Input space of O(L) for the number of locations and auxiliary space of O(L) for the location_cost list.
+            O(S), where S is the number of stations.
 
         """
-        location_cost = []
-
-        # Reset corresponding cost and time for each location
-        for location_no in range(len(self.multiverse_locations)):
-            if location_no != start:
-                location_cost.append((float('inf'), location_no))
-                self.multiverse_locations[location_no].cost = float('inf')
-                self.multiverse_locations[location_no].time = float('inf')
-            else: # start location cost and time only 0, the rest unsure
-                location_cost.append((0, location_no))
-                self.multiverse_locations[location_no].cost = 0
-                self.multiverse_locations[location_no].time = 0
-
-        return location_cost
-
-class Road:
-    """
-    This class represents a road between two locations.
-    """
-    def __init__(self, start, end, cost, time):
+        self.friend_start = friend_start
+        self.acum_train_duration = train_schedule(self.stations, friend_start)
+        self.station_targets = {}
+        for station in range(len(self.stations)):
+            for multiverse in self.station_layers(station):
+                self.station_targets[self.node_index(multiverse, self.stations[station][0])] = station
+
+    def station_layers(self, station):
         """
         :Function description:
-            A Road constructor.
+            Multiverse layers of the friend's arrivals at a station: the time of the arrival in the train loop,
+            or with a horizon, the absolute time of the arrival in every loop up to the horizon.
 
         :Input:
-            start (int) : Start location no
-            end (int)   : End location no
-            cost (int)  : Travel cost of this road
-            time (int)  : Travel time (mins) of this road
+            station (int) : Index of the station in stations
+
+        :Output:
+            range - The multiverse layers of the arrivals
 
         :Time complexity:
             O(1)
 
-        :Time complexity analysis:
-            Constant time for initialisation of Road attributes. 
-
         :Space complexity:
             O(1)
 
-        :Space complexity analysis:
-            Constant space for input and auxiliary.
-
         """
-        self.start = start
-        self.end = end
-        self.cost = cost
-        self.time = time
-    
-    def __str__(self):
+        first = self.acum_train_duration[station] % self.total_train_duration
+        if self.horizon is None:
+            return range(first, first + 1)
+        return range(first, self.horizon + 1, self.total_train_duration)
+
+    def arrival_layer(self, layer, time):
         """
         :Function description:
-            Returns a string representation of the Road object.
+            Multiverse layer reached by travelling for some time from a layer, wrapping around the train loop,
+            or None with a horizon when the arrival is after the horizon.
+
+        :Input:
+            layer (int) : Multiverse layer of the departure
+            time  (int) : Travel time
 
         :Output:
-            str - A string representation descripting Road in the format "start --(cost, time)--> end"
-        """
-        return f"{self.start} --(cost: {self.cost}, time: {self.time})--> {self.end}"
+            int or None - The multiverse layer of the arrival
 
+        :Time complexity:
+            O(1)
 
-class Location:
-    """
-    This class represents a regular location or a train station.
-    """
-    def __init__(self, location_no):
+        :Space complexity:
+            O(1)
+
+        """
+        if self.horizon is None:
+            return (layer + time) % self.total_multiverse
+        if layer + time > self.horizon:
+            return None
+        return layer + time
+
+    def node_index(self, layer, location_no):
         """
         :Function description:
-            A Location constructor.
+            Index of a location of a multiverse layer in multiverse_locations. With the "layer" layout the
+            locations of a layer are consecutive, and with the "location" layout the layers of a location are
+            consecutive. Locations in reality are taken by their rank in location_order when an order is given.
 
         :Input:
-            location_no (int): Location number for tracking
+            layer       (int) : Multiverse layer of the location
+            location_no (int) : Location number in reality
+
+        :Output:
+            int - Index of the location in multiverse_locations
 
         :Time complexity:
             O(1)
 
-        :Time complexity analysis:
-            Constant time for initialisation of Location attributes. 
-
         :Space complexity:
             O(1)
 
-        :Space complexity analysis:
-            Constant space for input and auxiliary.
         """
-        self.location_no = location_no
-        self.outgoing_roads = []
-        self.cost = float('inf')  # minimum cost to reach this location
-        self.time = float('inf')  # time taken to reach this location
-        self.visited = False  # flag to check if location is visited
-        self.previous_location = None  # pointer to reconstruct route
-    
-    def __str__(self):
+        if self.location_rank is not None:
+            location_no = self.location_rank[location_no]
+        if self.location_major:
+            return location_no * self.total_multiverse + layer
+        return layer * self.total_reality_location + location_no
+
+    def node_position(self, location_index):
         """
         :Function description:
-            Returns a string representation of the Location object.
+            Multiverse layer and location number in reality of an index in multiverse_locations, the inverse of node_index().
+
+        :Input:
+            location_index (int) : Index of the location in multiverse_locations
 
         :Output:
-            str - A string descripting the location and its outgoing roads.
+            Tuple[int, int] - The multiverse layer and location number
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
 
         """
-        description = f"Location {self.location_no}"
-        for road in self.outgoing_roads:
-            description += f"\n• {str(road)}"
-        return description
+        if self.location_major:
+            location_no, layer = divmod(location_index, self.total_multiverse)
+        else:
+            layer, location_no = divmod(location_index, self.total_reality_location)
+        if self.location_order is not None:
+            location_no = self.location_order[location_no]
+        return layer, location_no
 
-    def add_road(self, road):
+    def wait_road(self, location_index):
         """
         :Function description:
-            Add one outgoing road to a list of all for this location.
+            Implicit road for waiting one minute at a location, which leads to the same location
+            in the next multiverse layer. The road is created on demand and is not stored in the city.
+            There is none at the horizon.
 
         :Input:
-            road (Road): Road object to be added
+            location_index (int) : Index of the waiting location in multiverse_locations
+
+        :Output:
+            WaitRoad or None - The waiting road of wait_cost and 1 minute, None at the horizon
 
         :Time complexity:
             O(1)
 
-        :Time complexity analysis:
-            Amortised complexity for append().
-
         :Space complexity:
-            O(N), where N is the number of roads.
-
-        :Space complexity analysis:
-            Input space of O(N) and auxiliary space of O(N).
+            O(1)
 
         """
-        self.outgoing_roads.append(road)
-
+        layer, location_no = self.node_position(location_index)
+        multiverse = self.arrival_layer(layer, 1)
+        if multiverse is None:
+            return None
+        return WaitRoad(location_index, self.node_index(multiverse, location_no), self.wait_cost, 1)
 
-class MinHeap:
-    """
-    This class represents a MinHeap for efficient selection of the minimum cost vertex.
-    """
-    def __init__(self, locations) :
+    def roads_from(self, location_index):
         """
         :Function description:
-            A MinHeap constructor to store an array of minimum cost to locations.
+            All outgoing roads of a location in the multiverse, including the implicit waiting road.
+            A location pruned by station_reachable has no roads.
 
         :Input:
-            locations (list[tuple]): List of tuples (cost, location_no)
+            location_index (int) : Index of the location in multiverse_locations
 
-        :Time complexity:
-            O(N), where N is the number of locations.
+        :Output:
+            List[Road] - Outgoing roads of the location
 
-        :Time complexity analysis:
-            Linear time for heapify().
+        :Time complexity:
+            O(D), where D is the number of outgoing roads of the location.
 
         :Space complexity:
-            O(N), where N is the number of input locations.
+            O(D), where D is the number of outgoing roads of the location.
 
-        :Space complexity analysis:
-            Input space of O(N) and auxiliary space of O(N) for heap and position arrays.
+        """
+        location = self.multiverse_locations[location_index]
+        if location is None:
+            return []
+        outgoing_roads = location.outgoing_roads
+        if self.wait_cost is not None:
+            wait_road = self.wait_road(location_index)
+            if wait_road is not None:
+                outgoing_roads = outgoing_roads + [wait_road]
+        return outgoing_roads
+
+    def reverse_roads(self):
+        """
+        :Function description:
+            Incoming roads of every location in the multiverse, including the implicit waiting roads,
+            for searches that travel the roads backwards. Constructed once and kept for reuse.
+
+        :Output:
+            List[List[Road]] - Incoming roads of each location, by index in multiverse_locations
+
+        :Time complexity:
+            O(ML + MR) on the first call and O(1) after, where R is the number of roads, L is the number
+            of locations and M is the number of multiverse layers.
+
+        :Space complexity:
+            O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
 
         """
-        self.length = len(locations)
-        self.heap = [None] * (self.length + 1)
-        self.position = list(range(1, self.length + 1)) # position map for updates
-        self.heapify(locations)
-    
-    def __len__(self):
+        if self.incoming_roads is None:
+            incoming_roads = [[] for _ in range(len(self.multiverse_locations))]
+            for location_index in range(len(self.multiverse_locations)):
+                for road in self.roads_from(location_index):
+                    incoming_roads[road.end].append(road)
+            self.incoming_roads = incoming_roads
+        return self.incoming_roads
+
+    def route_to(self, location_index):
         """
-        Function description:
-            Returns number of elements in heap array.
+        :Function description:
+            Backtrack previous locations from a searched location to build its route from the start.
+            Waiting at a location does not repeat that location in the route, unlike a road back to the
+            same location, and contracted roads
+            are expanded back into the locations they pass through.
 
         :Input:
-            None
+            location_index (int) : Index of the searched location at the end of the route
 
-        :Time complexity:
-            O(1)
+        :Output:
+            List[int] - Location numbers of the route in order of travel
 
-        :Time complexity analysis:
-            Constant time for accessing the length attribute.
+        :Time complexity:
+            O(L), where L is the number of locations in the route.
 
         :Space complexity:
-            O(1)
-
-        :Space complexity analysis:
-            No additional space is used.
+            O(L), where L is the number of locations in the route.
 
         """
-        return self.length
+        # Backtrack previous locations with their cost, time and whether each was reached by waiting
+        state = self.state
+        steps = []
+        backtrack = location_index
+        while backtrack != -1:
+            steps.append((self.multiverse_locations[backtrack].location_no, state.cost[backtrack], state.time[backtrack],
+                          state.waited[backtrack]))
+            backtrack = state.previous[backtrack]
+        steps.reverse()
+        return build_route(steps, self.contracted_roads)
     
-    def is_empty(self):
+    def dijkstra_search(self, start, stats=None, on_settle=None):
         """
         :Function description:
-            Checks if heap is empty.
+            Search for the least cost paths from start location across all multiverses.
+
+        :Approach description:
+            1. Constructs a MinHeap of locations with its costs
+            2. Get the minimum cost location from the heap.
+            3. Visit each outgoing roads from the current location.
+            4. Select the value with the lowest cost and time.
+            5. Update the heap with the new cost and time and continue comparing.
 
         :Input:
-            None
+            start     (int)                 : Starting location number
+            stats     (SearchStats or None) : Counters of the search, None to not count
+            on_settle (callable or None)    : Called with the index and Location of each settled location
 
         :Output:
-            bool - True if heap array is empty, False otherwise
+            DijkstraSearch - The finished search, of which the city state holds the least costs and times
 
         :Time complexity:
-            O(1)
+            O(R log L), where R is the number of roads and L is the number of locations.
 
         :Time complexity analysis:
-            Constant time for checking the heap array empty or not.
+            - O(L) to construct heap array for location costs
+            - O(log L) to get the minimum cost location from heap
+            - O(R) to explore each and every outgoing roads
+            - O(log L) to update the heap for each road
+            Thus, the overall time complexity is O(R log L).
 
         :Space complexity:
-            O(N), where N is the number of input locations.
+            O(R + L), where R is the number of roads and L is the number of locations.
 
         :Space complexity analysis:
-            Input space of O(N) and auxiliary space of O(1).
+            Input space of O(R) for the number of roads and auxiliary space of O(L) for location_cost. 
 
         """
-        return len(self) == 0
-
-    def heapify(self, locations):
+        search = DijkstraSearch(self, start, stats, on_settle)
+        search.settle_all()
+        return search
+    
+    def target_locations(self):
         """
         :Function description:
-            Bottom-up construction of MinHeap from an array of locations. 
+            Indices of the locations in the multiverse where the friend can be intercepted: each train
+            station in the multiverse layers of the friend's arrivals at that station.
 
-        :Input:
-            locations (list[tuple]): List of tuples (cost, location_no)
+        :Output:
+            List[int] - Index in multiverse_locations of each station's interception, in order of the stations
 
         :Time complexity:
-            O(N), where N is the number of locations.
-
-        :Time complexity analysis:
-            Linear time for input locations and construction of MinHeap.
+            O(S), where S is the number of stations.
 
         :Space complexity:
-            O(N), where N is the number of input locations.
-
-        :Space complexity analysis:
-            Input space of O(N) and auxiliary space of O(1).
+            O(S), where S is the number of stations.
 
         """
-        # Add input data into the heap
-        for i in range(self.length):
-            self.heap[i + 1] = locations[i]  # heap starts from index 1
-            self.position[locations[i][1]] = i + 1  # map location_no to its position in the heap
-        # Perform bottom-up operation
-        for i in range(self.length//2, 0, -1):
-            self.sink(i)
+        targets = []
+        for station in range(len(self.stations)):
+            for multiverse in self.station_layers(station):
+                targets.append(self.node_index(multiverse, self.stations[station][0]))
+        return targets
 
-    def get_min(self):
+    def bidirectional_search(self, start, stats=None):
         """
         :Function description:
-            Get minimum cost location from heap array.
+            Search for the least cost and earliest time interception from the start, searching forward from
+            the start and backward from every interception location at the same time.
+
+        :Approach description:
+            1.  A forward search from the start in the first multiverse follows the roads, and a backward search
+                from all interception locations follows the roads in reverse, each with its own heap.
+            2.  The side with fewer locations in its heap settles its least (cost, time) location, and every road
+                that reaches a location labelled by the other side is a candidate meeting.
+            3.  The search stops once the least locations of both heaps add up to no less than the best meeting,
+                as no route through unsettled locations can be better.
+            4.  The route is backtracked forward from the meeting location to the start and backward to the interception.
 
         :Input:
-            None
-            
+            start (int)                 : Starting location number of the driver
+            stats (SearchStats or None) : Counters of both searches, None to not count
+
         :Output:
-            Tuple[int, int] - Minimum cost and corresponding location
+            Tuple[int, int, List[int]] or None : The best interception route, containing the cost, time and the route.
 
         :Time complexity:
-            O(log N), where N is the number of elements in MinHeap.
+            O(R log L), where R is the number of roads and L is the number of locations, in the worst case.
+            Both searches usually stop far earlier than a single search reaching every station.
 
-        :Time complexity analysis:
-            Logarithmic time for sink().
+        :Space complexity:
+            O(R + L) for the incoming roads of the city and the labels of both searches.
+
+        """
+        total = len(self.multiverse_locations)
+        source = self.node_index(0, start)
+        incoming_roads = self.reverse_roads()
+
+        # Forward search from the start, backward search from all interception locations
+        searches = [LabelSearch(self.roads_from, True, MinHeap([], total, stats), stats, self),
+                    LabelSearch(incoming_roads.__getitem__, False, MinHeap([], total, stats), stats, self)]
+        searches[0].add_source(source)
+        for target in self.target_locations():
+            searches[1].add_source(target)
+
+        best = None
+        meeting = None
+        if source in searches[1].distance:
+            best = (0, 0)
+            meeting = source
+
+        while not searches[0].heap.is_empty() and not searches[1].heap.is_empty():
+            # No route through unsettled locations can beat the best meeting
+            forward_top = searches[0].heap.peek()[0]
+            backward_top = searches[1].heap.peek()[0]
+            if best is not None and (forward_top[0] + backward_top[0], forward_top[1] + backward_top[1]) >= best:
+                break
+
+            # Settle from the smaller heap, and every location it labels that the other side labelled is a candidate meeting
+            side = 0 if len(searches[0].heap) <= len(searches[1].heap) else 1
+            current, location_index = searches[side].settle_next()
+            for next_index in searches[side].relax(location_index, current):
+                other = searches[1 - side].distance.get(next_index)
+                if other is not None:
+                    new_distance = searches[side].distance[next_index]
+                    meet = (new_distance[0] + other[0], new_distance[1] + other[1])
+                    if best is None or meet < best:
+                        best = meet
+                        meeting = next_index
+
+        if best is None:
+            return None
+
+        # Backtrack the start to the meeting location, then the meeting location to the interception, by the road
+        # that reached each location
+        distance = [searches[0].distance, searches[1].distance]
+        via = [searches[0].via, searches[1].via]
+        path = []
+        location_index = meeting
+        while location_index is not None:
+            path.append((location_index, distance[0][location_index], type(via[0][location_index]) is WaitRoad))
+            location_index = searches[0].towards_source(location_index)
+        path.reverse()
+        road = via[1][meeting]
+        while road is not None:
+            remaining = distance[1][road.end]
+            path.append((road.end, (best[0] - remaining[0], best[1] - remaining[1]), type(road) is WaitRoad))
+            road = via[1][road.end]
+
+        steps = [(self.multiverse_locations[location_index].location_no, cost, time, waited)
+                 for location_index, (cost, time), waited in path]
+        return (best[0], best[1], build_route(steps, self.contracted_roads))
+
+    def backward_search(self, targets, sources, stats=None):
+        """
+        :Function description:
+            Search backward from interception locations until every source is settled, following the roads in reverse,
+            for the least cost and earliest time from each settled location to its nearest interception location.
+
+        :Approach description:
+            1.  Every target starts in the heap at (0, 0), so the search labels each location with the best of its
+                routes to any target, as a forward search from that location to every target would.
+            2.  Settle the least (cost, time) location and relax its incoming roads, recording the location
+                each one leads to, until every source is settled or the heap is empty.
+
+        :Input:
+            targets (List[int])           : Indices of the interception locations in multiverse_locations
+            sources (Iterable[int])       : Indices of the locations whose routes are needed
+            stats   (SearchStats or None) : Counters of the search, None to not count
+
+        :Output:
+            Tuple[dict, dict] - The (cost, time) to the nearest target of each labelled location, and the road to the next
+                                location of its route, None at a target
+
+        :Time complexity:
+            O(R log L), where R is the number of roads and L is the number of locations, in the worst case.
 
         :Space complexity:
-            O(1)
-            
-        :Space complexity analysis:
-            Input space of O(1) and auxiliary space of O(1).
+            O(R + L) for the incoming roads of the city and the labels of the search.
 
         """
-        if self.is_empty():
-            raise IndexError("Heap is empty.")
-        minimum = self.heap[1]
+        total = len(self.multiverse_locations)
+        search = LabelSearch(self.reverse_roads().__getitem__, False, MinHeap([], total, stats), stats, self)
+        for target in targets:
+            search.add_source(target)
+
+        remaining = set(sources)
+        while remaining and not search.heap.is_empty():
+            current, location_index = search.settle_next()
+            remaining.discard(location_index)
+            search.relax(location_index, current)
+        return search.distance, search.via
+
+    def backward_route(self, source, distance, via):
+        """
+        :Function description:
+            Route from a location settled by backward_search() to its nearest interception location.
 
-        # Swap the root with the last element
-        self.heap[1], self.heap[self.length] = self.heap[self.length], self.heap[1]
-        self.position[self.heap[1][1]], self.position[self.heap[self.length][1]] = 1, self.length
+        :Input:
+            source   (int)  : Index of the settled location at the start of the route
+            distance (dict) : Labels of the backward search
+            via      (dict) : Roads to the next locations of the backward search
+
+        :Output:
+            List[int] - Location numbers of the route in order of travel
+
+        :Time complexity:
+            O(L), where L is the number of locations in the route.
+
+        :Space complexity:
+            O(L), where L is the number of locations in the route.
 
-        self.length -= 1
-        self.sink(1)
-        return minimum
-    
-    def smallest_child(self, index):
+        """
+        best = distance[source]
+        steps = []
+        road = None
+        location_index = source
+        while location_index is not None:
+            remaining = distance[location_index]
+            steps.append((self.multiverse_locations[location_index].location_no, best[0] - remaining[0], best[1] - remaining[1],
+                          type(road) is WaitRoad))
+            road = via[location_index]
+            location_index = road.end if road is not None else None
+        return build_route(steps, self.contracted_roads)
+
+    def reality_roads(self):
         """
         :Function description:
-            Find smallest child of a given parent node in MinHeap.
+            Roads of the city in reality, recovered from the first multiverse layer, which holds a copy of every road
+            that the city can travel. With time-dependent roads, each pair of locations instead has the least cost of
+            its roads in any multiverse layer of the first train loop, as later loops repeat them, so costs in reality
+            stay lower bounds.
+
+        :Output:
+            List[Tuple[int, int, int]] - Roads as (start, end, cost) between locations in reality
+
+        :Time complexity:
+            O(R), where R is the number of roads, or O(MR) with time-dependent roads, where M is the number of multiverse layers.
+
+        :Space complexity:
+            O(R), where R is the number of roads.
+
+        """
+        roads = []
+        for location in range(self.total_reality_location):
+            if not self.road_profiles:
+                for road in self.roads_from(self.node_index(0, location)):
+                    if type(road) is WaitRoad:
+                        continue
+                    roads.append((location, self.node_position(road.end)[1], road.cost))
+                continue
+            # Layers may hold different roads of a location, as a road leaving late may arrive after the horizon
+            least = {}
+            for layer in range(min(self.total_multiverse, self.total_train_duration)):
+                for road in self.roads_from(self.node_index(layer, location)):
+                    if type(road) is WaitRoad:
+                        continue
+                    end = self.node_position(road.end)[1]
+                    least[end] = min(least.get(end, road.cost), road.cost)
+            roads.extend((location, end, cost) for end, cost in least.items())
+        return roads
+
+    def build_landmarks(self, count):
+        """
+        :Function description:
+            Chooses landmarks in reality and precomputes their distances, for A* searches towards the stations.
 
         :Input:
-            index (int): Parent node index in MinHeap
+            count (int) : Number of landmarks, trading memory for tighter lower bounds
 
         :Output:
-            int - Smallest child node index
+            LandmarkTable - The landmarks of the city, also kept in landmarks
 
         :Time complexity:
-            O(1)
+            O(K R log L), where K is the number of landmarks, R is the number of roads and L is the number of locations.
+
+        :Space complexity:
+            O(K L), where K is the number of landmarks and L is the number of locations.
+
+        """
+        return self.use_landmarks(LandmarkTable.build(self, count))
+
+    def use_landmarks(self, landmarks):
+        """
+        :Function description:
+            Uses a landmark table, such as one restored from to_dict(), and computes the lower bound of the
+            cost from each location to a station.
+
+        :Input:
+            landmarks (LandmarkTable) : Landmarks of this city in reality
+
+        :Output:
+            LandmarkTable - The landmarks of the city
+
+        :Time complexity:
+            O(K S L), where K is the number of landmarks, S is the number of stations and L is the number of locations.
+
+        :Space complexity:
+            O(L), where L is the number of locations.
+
+        """
+        self.landmarks = landmarks
+        self.station_potential = landmarks.potential([station_no for station_no, travel_time in self.stations])
+        return landmarks
+
+    def reset_city(self, start):
+        """
+        :Function description:
+            Resets the search state of every location in the multiverse for a dijkstra search from the start,
+            which is reached at cost and time 0.
+
+        :Input:
+            start (int) : Index of the starting location in the multiverse
+
+        :Time complexity:
+            O(ML), where L is the number of locations and M is the number of multiverse layers.
 
         :Time complexity analysis:
-            Constant time for comparisons to find smallest child.
+            Linear time for copying the arrays of unreached costs, times and previous locations.
 
         :Space complexity:
             O(1)
 
         :Space complexity analysis:
-            Input space of O(1) and auxiliary space of O(1).
+            The arrays of the search state are reused, so no auxiliary space is needed.
 
         """
-        left = 2 * index
-        right = left + 1
-        smallest = 0
-        if left == self.length or self.heap[left][0] < self.heap[right][0]:
-            smallest = left
-        else:
-            smallest = right
-        return smallest
+        # Reset corresponding cost, time, previous location and visit for each location
+        self.state.reset(start)
 
-    def sink(self, index):
+class SearchState:
+    """
+    This class represents the search state of every location in the multiverse of a city, in arrays of
+    64-bit integers with INF for a location not yet reached, so the search compares plain integers.
+
+    :Attributes:
+        cost     (array)     : Least cost of each location, INF when not reached.
+        time     (array)     : Time of the least cost of each location, INF when not reached.
+        previous (array)     : Index of the previous location of each location, -1 for none.
+        visited  (bytearray) : 1 for each settled location.
+        waited   (bytearray) : 1 for each location reached by waiting at its previous location.
+
+    """
+    def __init__(self, total_location):
         """
         :Function description:
-            Restores heap property by moving element down the heap.
+            A SearchState constructor with every location not yet reached.
 
         :Input:
-            index (int): Index of the element to sink
+            total_location (int) : Number of locations in the multiverse
 
         :Time complexity:
-            O(log N), where N is the number of elements in MinHeap.
+            O(N), where N is the number of locations in the multiverse.
 
-        :Time complexity analysis:
-            Sinking an element involves traversing log N depth of the MinHeap.
+        :Space complexity:
+            O(N), where N is the number of locations in the multiverse, as 26 bytes for each location.
+
+        """
+        self.total_location = total_location
+        self.unreached = array("q", [INF]) * total_location
+        self.no_previous = array("q", [-1]) * total_location
+        self.cost = array("q", self.unreached)
+        self.time = array("q", self.unreached)
+        self.previous = array("q", self.no_previous)
+        self.visited = bytearray(total_location)
+        self.waited = bytearray(total_location)
+
+    def reset(self, start):
+        """
+        :Function description:
+            Resets every location to not reached, except the start, by copying whole arrays.
+
+        :Input:
+            start (int) : Index of the starting location, reached at cost and time 0
+
+        :Time complexity:
+            O(N), where N is the number of locations in the multiverse.
 
         :Space complexity:
             O(1)
 
-        :Space complexity analysis:
-            Input space of O(1) and auxiliary space of O(1).
+        """
+        self.cost[:] = self.unreached
+        self.time[:] = self.unreached
+        self.previous[:] = self.no_previous
+        self.visited[:] = bytes(self.total_location)
+        self.waited[:] = bytes(self.total_location)
+        self.cost[start] = 0
+        self.time[start] = 0
+
+class SearchStats:
+    """
+    This class represents the counters of a dijkstra search, to explain the work done by a search.
 
+    :Attributes:
+        heap_pops           (int)               : Locations taken from the heap.
+        stale_pops          (int)               : Locations taken from the heap that were already visited.
+        relaxations         (int)               : Roads visited from settled locations.
+        decrease_keys       (int)               : Roads that lowered the cost or time of a location already in the heap.
+        max_heap_size       (int)               : Most locations in the heap at once.
+        settled_per_layer   (Dict[int, int])    : Locations settled in each multiverse layer.
+
+    """
+    def __init__(self):
         """
-        while 2 * index <= self.length:
-            smallest = self.smallest_child(index)
-            if self.heap[index][0] <= self.heap[smallest][0]:
-                break
-            else:
-                # Swap the current element with its smallest child
-                self.heap[index], self.heap[smallest] = self.heap[smallest], self.heap[index]
-                self.position[self.heap[index][1]], self.position[self.heap[smallest][1]] = index, smallest
+        :Function description:
+            A SearchStats constructor with every counter at zero.
 
-            index = smallest
+        :Time complexity:
+            O(1)
 
-    def rise(self, index):
+        :Space complexity:
+            O(1)
+
+        """
+        self.heap_pops = 0
+        self.stale_pops = 0
+        self.relaxations = 0
+        self.decrease_keys = 0
+        self.max_heap_size = 0
+        self.settled_per_layer = {}
+
+    def settled(self):
         """
         :Function description:
-            Restores heap property by moving element up the heap.
-            
+            Total number of settled locations across all multiverse layers.
+
+        :Output:
+            int - The number of settled locations
+
+        :Time complexity:
+            O(M), where M is the number of multiverse layers.
+
+        :Space complexity:
+            O(1)
+
+        """
+        return sum(self.settled_per_layer.values())
+
+    def to_dict(self):
+        """
+        :Function description:
+            Counters as a dictionary, for logging.
+
+        :Output:
+            dict - The counters by name
+
+        :Time complexity:
+            O(M), where M is the number of multiverse layers.
+
+        :Space complexity:
+            O(M), where M is the number of multiverse layers.
+
+        """
+        return {
+            "heap_pops": self.heap_pops,
+            "stale_pops": self.stale_pops,
+            "relaxations": self.relaxations,
+            "decrease_keys": self.decrease_keys,
+            "max_heap_size": self.max_heap_size,
+            "settled": self.settled(),
+            "settled_per_layer": dict(self.settled_per_layer),
+        }
+
+class DijkstraSearch:
+    """
+    This class represents a dijkstra search over the multiverse of a city, which can be resumed to settle
+    more locations on demand, keeping its heap and settled locations between calls.
+
+    :Class description:
+        The search settles locations in order of least cost, keeping the least cost, time and previous location
+        of each location in the city. A query only needs the locations up to its targets, so a search can stop
+        early and be resumed by a later query with the same start, paying only for the additional locations.
+        Only one search of a city holds its locations at a time, as starting a search resets the city.
+
+    :Attributes:
+        city        (City)      : The city being searched.
+        start       (int)       : Index of the starting location in the multiverse.
+        heap        (MinHeap)   : Locations not yet settled, arranged by minimum cost, then minimum time.
+        settled     (int)       : Number of locations settled so far.
+        stats   (SearchStats or None) : Counters of the search, None when not counted.
+        on_settle (callable or None)  : Called with the index and Location of each settled location.
+        potential (List[int] or None) : Lower bound of the cost from each location in reality to a station, None for a plain search.
+        deadline    (float or None) : Time of time.perf_counter() after which the search stops, None for no deadline.
+        check_every     (int)       : Number of heap pops between checks of the deadline.
+        timed_out       (bool)      : Whether the search stopped at its deadline.
+        best_intercept (Tuple[int, int, int, int] or None) : Cost, time, station and index of the best interception settled so far.
+        targets_left    (int)       : Number of interception locations of the city's stations not yet settled.
+
+    """
+    def __init__(self, city, start, stats=None, on_settle=None, potential=None, deadline=None, check_every=64):
+        """
+        :Function description:
+            A DijkstraSearch constructor that resets the city for a search from the start.
+
         :Input:
-            index (int): Rise element index in MinHeap
+            city      (City)                : The city to be searched
+            start     (int)                 : Starting location number, in the first multiverse
+            stats     (SearchStats or None) : Counters of the search, None to not count
+            on_settle (callable or None)    : Called with the index and Location of each settled location
+            potential (List[int] or None)   : Lower bound of the cost from each location in reality to a station, such as from
+                                              LandmarkTable.potential(). The heap is then arranged by cost plus the lower bound,
+                                              as an A* search, which settles locations towards the stations first.
+            deadline  (float or None)       : Time of time.perf_counter() after which the search stops, None for no deadline
+            check_every (int)               : Number of heap pops between checks of the deadline, as reading the clock is not free
 
         :Time complexity:
-            O(log N), where N is the number of elements in MinHeap.
+            O(ML), where L is the number of locations and M is the number of multiverse layers.
 
         :Time complexity analysis:
-            Rising an element involves traversing log N height of the MinHeap.
+            Linear time for reset_city() and the position array of the heap, copied from arrays rather than built
+            from objects.
 
         :Space complexity:
-            O(1)
+            O(ML), where L is the number of locations and M is the number of multiverse layers.
 
         :Space complexity analysis:
-            Input space of O(1) and auxiliary space of O(1).
+            Auxiliary space of O(ML) for the position array of the heap, which only holds the locations reached.
 
         """
-        while index > 1:
-            parent = index // 2
-            if self.heap[index][0] < self.heap[parent][0]:
-                # Swap the current element with its parent
-                self.heap[index], self.heap[parent] = self.heap[parent], self.heap[index]
-                self.position[self.heap[index][1]], self.position[self.heap[parent][1]] = index, parent
-                index = parent
-            else:
-                break
+        self.city = city
+        self.start = city.node_index(0, start)
 
-    def update(self, location_no, new_cost):
+        # Reset city cost for each location
+        city.reset_city(self.start)
+
+        # MinHeap arranged by minimum cost, then minimum time, holding only the start until roads reach more locations
+        self.heap = MinHeap([], city.state.total_location, stats)
+        self.heap.push(self.start, (0 if potential is None else potential[city.node_position(self.start)[1]], 0))
+        self.settled = 0
+        self.stats = stats
+        self.on_settle = on_settle
+        self.potential = potential
+        self.deadline = deadline
+        self.check_every = check_every
+        self.timed_out = False
+        self.pops = 0
+
+        # Interceptions recorded as their locations are settled
+        self.best_intercept = None
+        self.targets_left = len(city.station_targets)
+
+    def track_targets(self):
         """
         :Function description:
-            Updates new cost for a location in MinHeap and restores heap property.
+            Tracks the interceptions of the city's current friend, after City.set_friend_start() changed the
+            interception locations of a resumed search. Interception locations already settled are recorded.
+
+        :Time complexity:
+            O(S), where S is the number of stations.
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.best_intercept = None
+        self.targets_left = len(self.city.station_targets)
+        for location_index in self.city.station_targets:
+            if self.city.state.visited[location_index]:
+                self.record_target(location_index)
+
+    def record_target(self, location_index):
+        """
+        :Function description:
+            Records a settled interception location, as the best interception when the friend arrives at
+            its time and it has the least cost, then the earliest time, then the earliest station.
 
         :Input:
-            location_no (int)   : Location to update
-            new_cost (int)      : New cost to update to the location
+            location_index (int) : Index of the location in the multiverse, a key of City.station_targets
 
         :Time complexity:
-            O(log N)
+            O(1)
 
-        :Time complexity analysis:
-            Logarithmic time for rise().
+        :Space complexity:
+            O(1)
+
+        """
+        self.targets_left -= 1
+        state = self.city.state
+        station = self.city.station_targets[location_index]
+        if state.time[location_index] % self.city.total_train_duration == self.city.acum_train_duration[station]:
+            found = (state.cost[location_index], state.time[location_index], station, location_index)
+            if self.best_intercept is None or found < self.best_intercept:
+                self.best_intercept = found
+
+    def intercept_known(self):
+        """
+        :Function description:
+            Whether the best interception is known: every interception location is settled, or the
+            frontier costs more than the best interception settled so far.
+
+        :Output:
+            bool - True when the search need not settle more locations for the interception
+
+        :Time complexity:
+            O(1)
 
         :Space complexity:
             O(1)
 
-        :Space complexity analysis:
-            Input space of O(1) and auxiliary space of O(1).
+        """
+        if self.targets_left == 0:
+            return True
+        return self.best_intercept is not None and self.frontier_cost() > self.best_intercept[0]
 
+    def frontier_cost(self):
         """
-        position = self.position[location_no]
-        self.heap[position] = (new_cost, location_no)
-        self.rise(position)
+        :Function description:
+            Least cost of the locations not yet settled, which bounds the cost of every unsettled location.
+            With a potential, the least cost plus lower bound, which still bounds the cost of every unsettled station.
 
-def intercept(roads, stations, start, friend_start):
-    """
-    :Function description:
-        Search for best intercept location to meet a friend on a train loop.
+        :Output:
+            int or float - The least cost, float('inf') when nothing reachable is left
 
-    :Approach description:
-        1.  Construct a city of roads and stations of the entire multiverse, and 
-            marking the friend start and train stations duration.
-        2.  Run dijsktra algorithm to search for shortest path to each location 
-            from driver's location.
-        3.  Choose the correct intercept location, depending on the computation of 
-            multiverse layer and location index.
-        4.  Check each train station with the intercept location to be the same time.
-        5.  Backtrack intercept route by checking the previous visited location and save it.
-        6.  Check chosen intercept route is of lowest cost and earliest arrival time.
+        :Time complexity:
+            O(1)
 
-    :Input:
-        roads       (List[Tuple[int, int, int, int]]) : A list of roads in the city, where each road contains the start, end, cost, time of this road.
-        stations    (List[Tuple[int, int]])           : A list of train stations in the city, where each station contains the station_no and time_travel of this station.
-        start       (int)                             : Starting location number of the driver.
-        friend_start (int)                            : Starting location number of the friend (on the train).
+        :Space complexity:
+            O(1)
 
-    :Output:
-        Tuple[int, int, List[int, int]] or None : The best interception route, containing the cost, time and the route.
+        """
+        if self.heap.is_empty():
+            return float('inf')
+        return self.heap.peek()[0][0]
 
-    :Time complexity:
-        O(R log L), where R is the number of roads and L is the number of locations.
+    def settle_next(self):
+        """
+        :Function description:
+            Settles the location of least cost and visits its outgoing roads.
 
-    :Time complexity analysis:
-        - O(R + L) for the construction of the city and the roads.
-        - O(R log L) for the dijkstra search.
-        - O(S) for the search of the best intercept route.
-        - O(L) for the backtrack of the route.
-        Thus, the overall time complexity is O(R log L).
+        :Output:
+            int or None - Index of the settled location, None when every reachable location is settled
+                          or the deadline has passed, which sets timed_out
 
-    :Space complexity:
-        O(R + L), where R is the number of roads and L is the number of locations.
+        :Time complexity:
+            O(D log N), where D is the number of outgoing roads of the location and N is the number of locations.
 
-    :Space complexity analysis:
-        Input space of O(R) for the input list of roads to be constructed by City() constructor, 
-        and auxiliary space of O(R + L) for the storing of roads and locations in the city.
+        :Time complexity analysis:
+            - O(log N) to get the minimum cost location from heap
+            - O(log N) to update the heap for each outgoing road
 
-    """
-    intercept_route = None
+        :Space complexity:
+            O(1)
+
+        """
+        city = self.city
+        location_heap = self.heap
+        stats = self.stats
+        potential = self.potential
+        state = city.state
+        location_cost, location_time, previous, visited = state.cost, state.time, state.previous, state.visited
+        waited = state.waited
+        while not location_heap.is_empty():
+            # Stop at the deadline, checked every few pops
+            if self.deadline is not None:
+                if self.timed_out:
+                    return None
+                self.pops += 1
+                if self.pops % self.check_every == 0 and clock.perf_counter() > self.deadline:
+                    self.timed_out = True
+                    return None
+
+            # Choose location with lowest cost
+            current_cost, location_no = location_heap.get_min()
+            current_cost = location_cost[location_no]
+            current_time = location_time[location_no]
+            
+            if visited[location_no]:
+                if stats is not None:
+                    stats.stale_pops += 1
+                continue
+            visited[location_no] = 1
+            self.settled += 1
+            if stats is not None:
+                layer = city.node_position(location_no)[0]
+                stats.settled_per_layer[layer] = stats.settled_per_layer.get(layer, 0) + 1
+            if self.on_settle is not None:
+                self.on_settle(location_no, city.multiverse_locations[location_no])
+            if location_no in city.station_targets:
+                self.record_target(location_no)
+
+            # Visit each outgoing roads, with the implicit waiting road when waiting is allowed
+            outgoing_roads = city.roads_from(location_no)
+            if stats is not None:
+                stats.relaxations += len(outgoing_roads)
+            for road in outgoing_roads:     
+                new_cost = current_cost + road.cost
+                new_time = current_time + road.time
+                next_location = road.end
+                another_cost = location_cost[next_location]
+
+                # New cost or time lesser than current
+                if not visited[next_location] and (new_cost < another_cost or (new_cost == another_cost and new_time < location_time[next_location])):
+                    location_cost[next_location] = new_cost
+                    location_time[next_location] = new_time
+                    previous[next_location] = location_no
+                    waited[next_location] = type(road) is WaitRoad
+                    # Ties of cost are settled by time, so a zero cost road cannot reach a settled location earlier
+                    if potential is None:
+                        location_heap.push(road.end, (new_cost, new_time))
+                    else:
+                        location_heap.push(road.end, (new_cost + potential[city.node_position(road.end)[1]], new_time))
+            return location_no
+        return None
+
+    def settle_until(self, location_index):
+        """
+        :Function description:
+            Resumes the search until a location is settled.
+
+        :Input:
+            location_index (int) : Index of the location in the multiverse
+
+        :Output:
+            Location or None - The settled location, None when it is unreachable from the start or the deadline has passed
+
+        :Time complexity:
+            O(R log L) in the worst case, where R is the number of roads and L is the number of locations,
+            but only for the locations not settled by earlier calls.
+
+        :Space complexity:
+            O(1)
+
+        """
+        visited = self.city.state.visited
+        while not visited[location_index]:
+            if self.settle_next() is None:
+                return None
+        return self.city.multiverse_locations[location_index]
+
+    def settle_all(self):
+        """
+        :Function description:
+            Resumes the search until every reachable location is settled.
+
+        :Time complexity:
+            O(R log L), where R is the number of roads and L is the number of locations.
+
+        :Space complexity:
+            O(1)
+
+        """
+        while self.settle_next() is not None:
+            pass
+
+class LabelSearch:
+    """
+    This class represents a dijkstra search that labels only the locations it reaches with their least (cost, time),
+    in dictionaries rather than arrays of the whole multiverse, for searches that are many or reach few locations:
+    the searches of City.bidirectional_search() and City.backward_search(), the pruned searches of HubLabelIndex
+    and the landmark searches of LandmarkTable. It follows the roads forward, or backward along incoming roads.
+
+    :Attributes:
+        roads_of (callable)             : Roads of a location by its index, outgoing roads forward or incoming roads backward.
+        forward  (bool)                 : Whether the search follows the roads forward.
+        heap     (MinHeap)              : Labelled locations not yet settled, arranged by (cost, time).
+        distance (dict)                 : Least (cost, time) of each labelled location.
+        via      (dict)                 : Road that gave each labelled location its label, None at a source.
+        settled  (set)                  : Settled locations.
+        stats    (SearchStats or None)  : Counters of the search, None when not counted.
+        city     (City or None)         : City of the locations, for the multiverse layer of each settled location in stats.
+
+    """
+    def __init__(self, roads_of, forward, heap, stats=None, city=None):
+        """
+        :Function description:
+            A LabelSearch constructor, with no location labelled yet.
+
+        :Input:
+            roads_of (callable)           : Outgoing roads of a location forward, incoming roads backward, such as
+                                            City.roads_from() or the __getitem__ of a list of roads of each location
+            forward (bool)                : Follow the roads forward, or backward
+            heap    (MinHeap)             : An empty heap with room for every location, which may be shared by searches in turn
+            stats   (SearchStats or None) : Counters of the search, None to not count
+            city    (City or None)        : City of the locations, needed with stats
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.roads_of = roads_of
+        self.forward = forward
+        self.heap = heap
+        self.distance = {}
+        self.via = {}
+        self.settled = set()
+        self.stats = stats
+        self.city = city
+
+    def add_source(self, location_index):
+        """
+        :Function description:
+            Labels a source of the search at cost and time 0.
+
+        :Input:
+            location_index (int) : Index of the source location
+
+        :Time complexity:
+            O(log N), where N is the number of locations in the heap.
+
+        :Space complexity:
+            O(1)
+
+        """
+        if location_index not in self.distance:
+            self.distance[location_index] = (0, 0)
+            self.via[location_index] = None
+            self.heap.push(location_index, (0, 0))
+
+    def settle_next(self):
+        """
+        :Function description:
+            Settles the labelled location of least (cost, time), without relaxing its roads, so that the
+            caller may decide whether to follow them with relax().
+
+        :Output:
+            Tuple[Tuple[int, int], int] - The (cost, time) and index of the settled location
+
+        :Time complexity:
+            O(log N), where N is the number of locations in the heap.
+
+        :Space complexity:
+            O(1)
+
+        """
+        current, location_index = self.heap.get_min()
+        self.settled.add(location_index)
+        if self.stats is not None:
+            layer = self.city.node_position(location_index)[0]
+            self.stats.settled_per_layer[layer] = self.stats.settled_per_layer.get(layer, 0) + 1
+            self.stats.relaxations += len(self.roads_of(location_index))
+        return current, location_index
+
+    def relax(self, location_index, current):
+        """
+        :Function description:
+            Follows the roads of a settled location, labelling each location not yet settled that
+            they reach with a lesser (cost, time) than its label.
+
+        :Input:
+            location_index (int)             : Index of the settled location
+            current        (Tuple[int, int]) : Its (cost, time)
+
+        :Output:
+            List[int] - Indices of the locations given a new label
+
+        :Time complexity:
+            O(D log N), where D is the number of roads of the location and N is the number of locations in the heap.
+
+        :Space complexity:
+            O(D), where D is the number of roads of the location.
+
+        """
+        distance = self.distance
+        relaxed = []
+        for road in self.roads_of(location_index):
+            next_index = road.end if self.forward else road.start
+            if next_index in self.settled:
+                continue
+            new_distance = (current[0] + road.cost, current[1] + road.time)
+            if next_index in distance and new_distance >= distance[next_index]:
+                continue
+            distance[next_index] = new_distance
+            self.via[next_index] = road
+            self.heap.push(next_index, new_distance)
+            relaxed.append(next_index)
+        return relaxed
+
+    def towards_source(self, location_index):
+        """
+        :Function description:
+            Location before a labelled location on its route from the source of its label: the start of the road
+            that labelled it forward, or the end of that road backward.
+
+        :Input:
+            location_index (int) : Index of a labelled location
+
+        :Output:
+            int or None - Index of the location, None at a source
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        road = self.via[location_index]
+        if road is None:
+            return None
+        return road.start if self.forward else road.end
+
+class Road:
+    """
+    This class represents a road between two locations.
+    Attributes are kept in slots without a per-instance __dict__, as a city holds a road for each multiverse layer.
+    """
+    __slots__ = ("start", "end", "cost", "time")
+
+    def __init__(self, start, end, cost, time):
+        """
+        :Function description:
+            A Road constructor.
+
+        :Input:
+            start (int) : Start location no
+            end (int)   : End location no
+            cost (int)  : Travel cost of this road
+            time (int)  : Travel time (mins) of this road
+
+        :Time complexity:
+            O(1)
+
+        :Time complexity analysis:
+            Constant time for initialisation of Road attributes. 
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Constant space for input and auxiliary.
+
+        """
+        self.start = start
+        self.end = end
+        self.cost = cost
+        self.time = time
+    
+    def __str__(self):
+        """
+        :Function description:
+            Returns a string representation of the Road object.
+
+        :Output:
+            str - A string representation descripting Road in the format "start --(cost, time)--> end"
+        """
+        return f"{self.start} --(cost: {self.cost}, time: {self.time})--> {self.end}"
+
+class WaitRoad(Road):
+    """
+    This class represents the implicit road of waiting one minute at a location, into the next multiverse layer.
+    It is told apart from a road that starts and ends at the same location by its type, as both may lead to the
+    same location in the next layer.
+    """
+    __slots__ = ()
+
+
+class Location:
+    """
+    This class represents a regular location or a train station.
+    Attributes are kept in slots without a per-instance __dict__, as a city holds a location for each multiverse layer.
+    The cost, time, previous location and visit of a search are kept in the city's SearchState, and are read
+    through properties from the city the location belongs to.
+    """
+    __slots__ = ("location_no", "outgoing_roads", "city", "location_index")
+
+    def __init__(self, location_no, city=None, location_index=-1):
+        """
+        :Function description:
+            A Location constructor.
+
+        :Input:
+            location_no (int): Location number for tracking
+            city (City): City whose search state holds the cost, time, previous location and visit, if any
+            location_index (int): Index of the location across multiverse in the city
+
+        :Time complexity:
+            O(1)
+
+        :Time complexity analysis:
+            Constant time for initialisation of Location attributes. 
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Constant space for input and auxiliary.
+        """
+        self.location_no = location_no
+        self.outgoing_roads = []
+        self.city = city
+        self.location_index = location_index
+
+    @property
+    def cost(self):
+        """
+        :Function description:
+            Cost of the cheapest route found to this location by the latest search of its city.
+
+        :Output:
+            int - The cost, or INF if unreached or without a city
+
+        :Time complexity:
+            O(1)
+        """
+        if self.city is None:
+            return INF
+        return self.city.state.cost[self.location_index]
+
+    @property
+    def time(self):
+        """
+        :Function description:
+            Time of the cheapest route found to this location by the latest search of its city.
+
+        :Output:
+            int - The time, or INF if unreached or without a city
+
+        :Time complexity:
+            O(1)
+        """
+        if self.city is None:
+            return INF
+        return self.city.state.time[self.location_index]
+
+    @property
+    def visited(self):
+        """
+        :Function description:
+            Whether the latest search of its city has settled this location.
+
+        :Output:
+            bool - True if settled, False otherwise or without a city
+
+        :Time complexity:
+            O(1)
+        """
+        if self.city is None:
+            return False
+        return bool(self.city.state.visited[self.location_index])
+
+    @property
+    def previous_location(self):
+        """
+        :Function description:
+            Location before this one on the cheapest route found by the latest search of its city.
+
+        :Output:
+            Location - The previous location, or None if there is none or without a city
+
+        :Time complexity:
+            O(1)
+        """
+        if self.city is None:
+            return None
+        previous = self.city.state.previous[self.location_index]
+        if previous < 0:
+            return None
+        return self.city.multiverse_locations[previous]
+
+    def __str__(self):
+        """
+        :Function description:
+            Returns a string representation of the Location object.
+
+        :Output:
+            str - A string descripting the location and its outgoing roads.
+
+        """
+        description = f"Location {self.location_no}"
+        for road in self.outgoing_roads:
+            description += f"\n• {str(road)}"
+        return description
+
+    def add_road(self, road):
+        """
+        :Function description:
+            Add one outgoing road to a list of all for this location.
+
+        :Input:
+            road (Road): Road object to be added
+
+        :Time complexity:
+            O(1)
+
+        :Time complexity analysis:
+            Amortised complexity for append().
+
+        :Space complexity:
+            O(N), where N is the number of roads.
+
+        :Space complexity analysis:
+            Input space of O(N) and auxiliary space of O(N).
+
+        """
+        self.outgoing_roads.append(road)
+
+
+class MinHeap:
+    """
+    This class represents a MinHeap for efficient selection of the minimum cost vertex.
+    """
+    def __init__(self, locations, capacity=0, stats=None) :
+        """
+        :Function description:
+            A MinHeap constructor to store an array of minimum cost to locations.
+
+        :Input:
+            locations (list[tuple])       : List of tuples (cost, location_no), where cost is any comparable key
+            capacity  (int)               : Number of location_no that can be pushed later, for a heap that starts with few locations
+            stats     (SearchStats or None) : Counters of heap pops, decrease-keys and heap size, None to not count
+
+        :Time complexity:
+            O(N), where N is the number of locations.
+
+        :Time complexity analysis:
+            Linear time for heapify().
+
+        :Space complexity:
+            O(N), where N is the number of input locations.
+
+        :Space complexity analysis:
+            Input space of O(N) and auxiliary space of O(N) for heap and position arrays.
+
+        """
+        self.length = len(locations)
+        self.heap = [None] * (self.length + 1)
+        self.position = [0] * max(self.length, capacity) # position map for updates, 0 when not in heap
+        self.stats = stats
+        if stats is not None:
+            stats.max_heap_size = max(stats.max_heap_size, self.length)
+        self.heapify(locations)
+    
+    def __len__(self):
+        """
+        Function description:
+            Returns number of elements in heap array.
+
+        :Input:
+            None
+
+        :Time complexity:
+            O(1)
+
+        :Time complexity analysis:
+            Constant time for accessing the length attribute.
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            No additional space is used.
+
+        """
+        return self.length
+    
+    def is_empty(self):
+        """
+        :Function description:
+            Checks if heap is empty.
+
+        :Input:
+            None
+
+        :Output:
+            bool - True if heap array is empty, False otherwise
+
+        :Time complexity:
+            O(1)
+
+        :Time complexity analysis:
+            Constant time for checking the heap array empty or not.
+
+        :Space complexity:
+            O(N), where N is the number of input locations.
+
+        :Space complexity analysis:
+            Input space of O(N) and auxiliary space of O(1).
+
+        """
+        return len(self) == 0
+
+    def heapify(self, locations):
+        """
+        :Function description:
+            Bottom-up construction of MinHeap from an array of locations. 
+
+        :Input:
+            locations (list[tuple]): List of tuples (cost, location_no)
+
+        :Time complexity:
+            O(N), where N is the number of locations.
+
+        :Time complexity analysis:
+            Linear time for input locations and construction of MinHeap.
+
+        :Space complexity:
+            O(N), where N is the number of input locations.
+
+        :Space complexity analysis:
+            Input space of O(N) and auxiliary space of O(1).
+
+        """
+        # Add input data into the heap
+        for i in range(self.length):
+            self.heap[i + 1] = locations[i]  # heap starts from index 1
+            self.position[locations[i][1]] = i + 1  # map location_no to its position in the heap
+        # Perform bottom-up operation
+        for i in range(self.length//2, 0, -1):
+            self.sink(i)
+
+    def peek(self):
+        """
+        :Function description:
+            Minimum cost location of heap array, without removing it.
+
+        :Output:
+            Tuple[int, int] - Minimum cost and corresponding location
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        if self.is_empty():
+            raise IndexError("Heap is empty.")
+        return self.heap[1]
+
+    def get_min(self):
+        """
+        :Function description:
+            Get minimum cost location from heap array.
+
+        :Input:
+            None
+            
+        :Output:
+            Tuple[int, int] - Minimum cost and corresponding location
+
+        :Time complexity:
+            O(log N), where N is the number of elements in MinHeap.
+
+        :Time complexity analysis:
+            Logarithmic time for sink().
+
+        :Space complexity:
+            O(1)
+            
+        :Space complexity analysis:
+            Input space of O(1) and auxiliary space of O(1).
+
+        """
+        if self.is_empty():
+            raise IndexError("Heap is empty.")
+        minimum = self.heap[1]
+        if self.stats is not None:
+            self.stats.heap_pops += 1
+
+        # Swap the root with the last element
+        self.heap[1], self.heap[self.length] = self.heap[self.length], self.heap[1]
+        self.position[self.heap[1][1]], self.position[self.heap[self.length][1]] = 1, 0
+
+        self.length -= 1
+        self.sink(1)
+        return minimum
+    
+    def smallest_child(self, index):
+        """
+        :Function description:
+            Find smallest child of a given parent node in MinHeap.
+
+        :Input:
+            index (int): Parent node index in MinHeap
+
+        :Output:
+            int - Smallest child node index
+
+        :Time complexity:
+            O(1)
+
+        :Time complexity analysis:
+            Constant time for comparisons to find smallest child.
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Input space of O(1) and auxiliary space of O(1).
+
+        """
+        left = 2 * index
+        right = left + 1
+        smallest = 0
+        if left == self.length or self.heap[left][0] < self.heap[right][0]:
+            smallest = left
+        else:
+            smallest = right
+        return smallest
+
+    def sink(self, index):
+        """
+        :Function description:
+            Restores heap property by moving element down the heap.
+
+        :Input:
+            index (int): Index of the element to sink
+
+        :Time complexity:
+            O(log N), where N is the number of elements in MinHeap.
+
+        :Time complexity analysis:
+            Sinking an element involves traversing log N depth of the MinHeap.
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Input space of O(1) and auxiliary space of O(1).
+
+        """
+        while 2 * index <= self.length:
+            smallest = self.smallest_child(index)
+            if self.heap[index][0] <= self.heap[smallest][0]:
+                break
+            else:
+                # Swap the current element with its smallest child
+                self.heap[index], self.heap[smallest] = self.heap[smallest], self.heap[index]
+                self.position[self.heap[index][1]], self.position[self.heap[smallest][1]] = index, smallest
+
+            index = smallest
+
+    def rise(self, index):
+        """
+        :Function description:
+            Restores heap property by moving element up the heap.
+            
+        :Input:
+            index (int): Rise element index in MinHeap
+
+        :Time complexity:
+            O(log N), where N is the number of elements in MinHeap.
+
+        :Time complexity analysis:
+            Rising an element involves traversing log N height of the MinHeap.
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Input space of O(1) and auxiliary space of O(1).
+
+        """
+        while index > 1:
+            parent = index // 2
+            if self.heap[index][0] < self.heap[parent][0]:
+                # Swap the current element with its parent
+                self.heap[index], self.heap[parent] = self.heap[parent], self.heap[index]
+                self.position[self.heap[index][1]], self.position[self.heap[parent][1]] = index, parent
+                index = parent
+            else:
+                break
+
+    def update(self, location_no, new_cost):
+        """
+        :Function description:
+            Updates new cost for a location in MinHeap and restores heap property.
+
+        :Input:
+            location_no (int)   : Location to update
+            new_cost (int)      : New cost to update to the location
+
+        :Time complexity:
+            O(log N)
+
+        :Time complexity analysis:
+            Logarithmic time for rise().
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Input space of O(1) and auxiliary space of O(1).
+
+        """
+        position = self.position[location_no]
+        self.heap[position] = (new_cost, location_no)
+        if self.stats is not None:
+            self.stats.decrease_keys += 1
+        self.rise(position)
+
+    def push(self, location_no, new_cost):
+        """
+        :Function description:
+            Inserts a location into MinHeap, or updates its cost when it is already in MinHeap.
+
+        :Input:
+            location_no (int)   : Location to insert or update
+            new_cost (int)      : Cost of the location
+
+        :Time complexity:
+            O(log N), where N is the number of elements in MinHeap.
+
+        :Time complexity analysis:
+            Logarithmic time for rise().
+
+        :Space complexity:
+            O(1)
+
+        :Space complexity analysis:
+            Amortised constant auxiliary space for growing the heap array.
+
+        """
+        if self.position[location_no] != 0:
+            self.update(location_no, new_cost)
+            return
+        self.length += 1
+        if self.length == len(self.heap):
+            self.heap.append(None)
+        self.heap[self.length] = (new_cost, location_no)
+        self.position[location_no] = self.length
+        if self.stats is not None:
+            self.stats.max_heap_size = max(self.stats.max_heap_size, self.length)
+        self.rise(self.length)
+
+class HubLabelIndex:
+    """
+    This class represents a hub-label index over the multiverse, which answers the least cost and earliest time
+    from any location to any other location by intersecting their labels, without searching the city.
+
+    :Class description:
+        Every location in the multiverse has an outgoing label of (hub, cost, time) to the hubs it can reach and
+        an incoming label of (hub, cost, time) from the hubs that can reach it. The best route from a start to a
+        target always passes a hub common to the outgoing label of the start and the incoming label of the target.
+
+    :Approach description:
+        Pruned landmark labelling: locations are taken as hubs in order of their number of roads. From each hub,
+        a forward and a backward dijkstra search label every location reached, but a location is pruned (neither
+        labelled nor explored further) when the labels of earlier hubs already give a route no worse. Each label
+        also keeps the next location towards (or from) its hub, so that routes can be backtracked from the labels.
+        Distances are compared as (cost, time), the least cost first and then the earliest time.
+
+    :Attributes:
+        total_reality_location  (int)                           : Total number of all locations in reality.
+        total_multiverse        (int)                           : Total number of all multiverse layers.
+        location_numbers        (List[int])                     : Location number in reality of each location in the multiverse.
+        out_labels      (List[List[Tuple[int, int, int, int]]]) : Outgoing label of each location, as (hub, cost, time, next location) sorted by hub.
+        in_labels       (List[List[Tuple[int, int, int, int]]]) : Incoming label of each location, as (hub, cost, time, previous location) sorted by hub.
+        waiting                 (bool)                          : Whether the indexed city allows waiting at a location.
+        contracted_roads        (dict)                          : Contracted roads of the indexed city, to expand routes.
+        location_rank           (List[int] or None)             : Rank of each location number in the order of the indexed city.
+        location_major          (bool)                          : Whether the indexed city stores the layers of each location together.
+        wait_cost               (int or None)                   : Cost per minute of waiting in the indexed city, None when unknown or disabled.
+
+    """
+    def __init__(self, total_reality_location, total_multiverse, location_numbers, out_labels, in_labels,
+                 waiting=False, contracted_roads=None, location_rank=None, location_major=False, wait_cost=None):
+        """
+        :Function description:
+            A HubLabelIndex constructor from existing labels, see build() to construct the labels from a city.
+
+        :Input:
+            total_reality_location  (int)              : Total number of all locations in reality
+            total_multiverse        (int)              : Total number of all multiverse layers
+            location_numbers        (List[int])        : Location number in reality of each location in the multiverse
+            out_labels              (List[List[tuple]]) : Outgoing label of each location
+            in_labels               (List[List[tuple]]) : Incoming label of each location
+            waiting                 (bool)             : Whether the indexed city allows waiting
+            contracted_roads        (dict or None)     : Contracted roads of the indexed city
+            location_rank           (List[int] or None) : Rank of each location number in the order of the indexed city
+            location_major          (bool)             : Whether the indexed city has the "location" layout
+            wait_cost               (int or None)      : Cost per minute of waiting in the indexed city
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.total_reality_location = total_reality_location
+        self.total_multiverse = total_multiverse
+        self.location_numbers = location_numbers
+        self.out_labels = out_labels
+        self.in_labels = in_labels
+        self.waiting = waiting
+        self.contracted_roads = contracted_roads if contracted_roads is not None else {}
+        self.location_rank = location_rank
+        self.location_major = location_major
+        self.wait_cost = wait_cost
+
+    @classmethod
+    def build(cls, city):
+        """
+        :Function description:
+            Constructs the hub labels of every location in the multiverse of a city.
+
+        :Input:
+            city (City) : The city to be indexed
+
+        :Output:
+            HubLabelIndex - The index of the city
+
+        :Time complexity:
+            O(N (N + E) log N) in the worst case, where N is the number of locations and E is the number of roads
+            in the multiverse. Pruning makes each search much smaller in practice, as most locations are already
+            covered by the labels of the first hubs.
+
+        :Space complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        """
+        total = len(city.multiverse_locations)
+        incoming_roads = city.reverse_roads()
+        outgoing_roads = [city.roads_from(location_index) for location_index in range(total)]
+
+        # Busiest locations first, as they cover the most routes
+        order = sorted(range(total), key=lambda location_index: -(len(outgoing_roads[location_index]) + len(incoming_roads[location_index])))
+
+        index = cls(city.total_reality_location, city.total_multiverse,
+                    [city.node_position(location_index)[1] for location_index in range(total)],
+                    [[] for _ in range(total)], [[] for _ in range(total)],
+                    city.wait_cost is not None, city.contracted_roads, city.location_rank, city.location_major,
+                    city.wait_cost)
+
+        # One heap for all searches, as every search empties it
+        heap = MinHeap([], total)
+        for hub_rank in range(total):
+            hub = order[hub_rank]
+            index._pruned_search(heap, hub, hub_rank, outgoing_roads, True)
+            index._pruned_search(heap, hub, hub_rank, incoming_roads, False)
+        return index
+
+    def _pruned_search(self, heap, hub, hub_rank, roads, forward):
+        """
+        :Function description:
+            Pruned dijkstra search from a hub, adding the hub to the label of every location that is not
+            already covered by the labels of earlier hubs.
+
+        :Input:
+            heap      (MinHeap)          : An empty heap of the size of the multiverse
+            hub       (int)              : Index of the hub location
+            hub_rank  (int)              : Rank of the hub in the labels
+            roads     (List[List[Road]]) : Outgoing roads of each location for a forward search, incoming roads for a backward search
+            forward   (bool)             : Forward search to label incoming labels, or backward search to label outgoing labels
+
+        :Time complexity:
+            O((N + E) log N) in the worst case, where N is the number of locations and E is the number of roads searched.
+
+        :Space complexity:
+            O(N), where N is the number of locations searched.
+
+        """
+        search = LabelSearch(roads.__getitem__, forward, heap)
+        search.add_source(hub)
+        while not heap.is_empty():
+            current, location_index = search.settle_next()
+
+            # Pruned when an earlier hub already covers this location
+            if forward:
+                covered = self._label_distance(self.out_labels[hub], self.in_labels[location_index])
+                label = self.in_labels[location_index]
+            else:
+                covered = self._label_distance(self.out_labels[location_index], self.in_labels[hub])
+                label = self.out_labels[location_index]
+            if covered is not None and covered[0] <= current:
+                continue
+            label.append((hub_rank, current[0], current[1], search.towards_source(location_index)))
+            search.relax(location_index, current)
+
+    @staticmethod
+    def _label_distance(out_label, in_label):
+        """
+        :Function description:
+            Least (cost, time) through a hub common to an outgoing label and an incoming label.
+
+        :Input:
+            out_label (List[tuple]) : Outgoing label of the start location
+            in_label  (List[tuple]) : Incoming label of the target location
+
+        :Output:
+            Tuple[Tuple[int, int], int] or None - The (cost, time) and the rank of its hub, None if no hub is common.
+
+        :Time complexity:
+            O(H), where H is the size of the labels, as both labels are sorted by hub.
+
+        :Space complexity:
+            O(1)
+
+        """
+        best = None
+        i = 0
+        j = 0
+        while i < len(out_label) and j < len(in_label):
+            if out_label[i][0] == in_label[j][0]:
+                distance = (out_label[i][1] + in_label[j][1], out_label[i][2] + in_label[j][2])
+                if best is None or distance < best[0]:
+                    best = (distance, out_label[i][0])
+                i += 1
+                j += 1
+            elif out_label[i][0] < in_label[j][0]:
+                i += 1
+            else:
+                j += 1
+        return best
+
+    @staticmethod
+    def _label_entry(label, hub_rank):
+        """
+        :Function description:
+            Binary search for the entry of a hub in a label.
+
+        :Input:
+            label    (List[tuple]) : A label sorted by hub
+            hub_rank (int)         : Rank of the hub
+
+        :Output:
+            tuple - The entry (hub, cost, time, via) of the hub
+
+        :Time complexity:
+            O(log H), where H is the size of the label.
+
+        :Space complexity:
+            O(1)
+
+        """
+        low = 0
+        high = len(label) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if label[middle][0] < hub_rank:
+                low = middle + 1
+            else:
+                high = middle
+        return label[low]
+
+    def node_index(self, layer, location_no):
+        """
+        :Function description:
+            Index of a location of a multiverse layer, as in City.node_index().
+
+        :Input:
+            layer       (int) : Multiverse layer of the location
+            location_no (int) : Location number in reality
+
+        :Output:
+            int - Index of the location in the multiverse, -1 when the location is not in the indexed city
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        if not 0 <= location_no < self.total_reality_location:
+            return -1
+        if self.location_rank is not None:
+            location_no = self.location_rank[location_no]
+        if self.location_major:
+            return location_no * self.total_multiverse + layer
+        return layer * self.total_reality_location + location_no
+
+    def query(self, start_index, target_index):
+        """
+        :Function description:
+            Least cost and earliest time route between two locations in the multiverse, from their labels.
+
+        :Input:
+            start_index  (int) : Index of the start location in the multiverse, -1 for a location not in the city
+            target_index (int) : Index of the target location in the multiverse, -1 for a location not in the city
+
+        :Output:
+            Tuple[int, int, List[int]] or None - The cost, time and route, None if the target is unreachable.
+
+        :Time complexity:
+            O(H + P log H), where H is the size of the labels and P is the number of locations in the route.
+
+        :Space complexity:
+            O(P), where P is the number of locations in the route.
+
+        """
+        if start_index < 0 or target_index < 0:
+            return None
+        best = self._label_distance(self.out_labels[start_index], self.in_labels[target_index])
+        if best is None:
+            return None
+        (cost, time), hub_rank = best
+
+        # Start towards the hub, by the next location of each outgoing label
+        steps = []
+        location_index = start_index
+        while location_index is not None:
+            _, hub_cost, hub_time, next_index = self._label_entry(self.out_labels[location_index], hub_rank)
+            steps.append((self.location_numbers[location_index], cost - hub_cost, time - hub_time))
+            location_index = next_index
+        hub_cost, hub_time = steps[-1][1], steps[-1][2]
+
+        # Hub towards the target, by the previous location of each incoming label
+        backward = []
+        location_index = target_index
+        while location_index is not None:
+            _, from_cost, from_time, previous_index = self._label_entry(self.in_labels[location_index], hub_rank)
+            if previous_index is not None:
+                backward.append((self.location_numbers[location_index], hub_cost + from_cost, hub_time + from_time))
+            location_index = previous_index
+        backward.reverse()
+
+        # Labels keep only the next location, so a step is a wait when it stays at the location for the cost
+        # and the one minute of a wait, as a road back to the same location of that cost and time is no different
+        steps = steps + backward
+        route_steps = [steps[0] + (False,)]
+        for (previous_no, previous_cost, previous_time), (location_no, location_cost, location_time) in zip(steps, steps[1:]):
+            waited = (self.waiting and location_no == previous_no and location_time - previous_time == 1
+                      and (self.wait_cost is None or location_cost - previous_cost == self.wait_cost))
+            route_steps.append((location_no, location_cost, location_time, waited))
+        route = build_route(route_steps, self.contracted_roads)
+        return (cost, time, route)
+
+    def to_dict(self):
+        """
+        :Function description:
+            Serialisable representation of the index, of lists and numbers only.
+
+        :Output:
+            dict - The index, to be restored by from_dict()
+
+        :Time complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        :Space complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        """
+        return {
+            "total_reality_location": self.total_reality_location,
+            "total_multiverse": self.total_multiverse,
+            "location_numbers": self.location_numbers,
+            "out_labels": self.out_labels,
+            "in_labels": self.in_labels,
+            "waiting": self.waiting,
+            "contracted_roads": [[list(road), passing] for road, passing in self.contracted_roads.items()],
+            "location_rank": self.location_rank,
+            "location_major": self.location_major,
+            "wait_cost": self.wait_cost,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :Function description:
+            Restores an index from its to_dict() representation.
+
+        :Input:
+            data (dict) : The index from to_dict(), possibly through JSON
+
+        :Output:
+            HubLabelIndex - The restored index
+
+        :Time complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        :Space complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        """
+        return cls(data["total_reality_location"], data["total_multiverse"], list(data["location_numbers"]),
+                   [[tuple(entry) for entry in label] for label in data["out_labels"]],
+                   [[tuple(entry) for entry in label] for label in data["in_labels"]],
+                   data["waiting"], {tuple(road): list(passing) for road, passing in data["contracted_roads"]},
+                   data.get("location_rank"), data.get("location_major", False), data.get("wait_cost"))
+
+    def save(self, path):
+        """
+        :Function description:
+            Writes the index to a JSON file.
+
+        :Input:
+            path (str) : Path of the file
+
+        :Time complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        :Space complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :Function description:
+            Reads an index from a JSON file written by save().
+
+        :Input:
+            path (str) : Path of the file
+
+        :Output:
+            HubLabelIndex - The index in the file
+
+        :Time complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        :Space complexity:
+            O(N H), where N is the number of locations in the multiverse and H is the average label size.
+
+        """
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+class LandmarkTable:
+    """
+    This class represents the landmarks of a city in reality, with the least cost from and to every landmark,
+    which bound the least cost between any two locations by the triangle inequality.
+
+    :Class description:
+        For a landmark A, the least cost from location u to location v is at least d(A, v) - d(A, u) and at
+        least d(u, A) - d(v, A). The best of these bounds over all landmarks is a lower bound that never
+        overestimates and never decreases by more than the cost of a road, so it serves as the potential
+        of an A* search. A road in the multiverse costs the same as in reality, so the bounds hold in every layer.
+
+    :Attributes:
+        total_reality_location  (int)           : Total number of all locations in reality.
+        landmarks               (List[int])     : Location of each landmark.
+        forward                 (array)         : Least cost from landmark i to location v at i * total_reality_location + v, inf if unreachable.
+        backward                (array)         : Least cost from location v to landmark i at i * total_reality_location + v, inf if unreachable.
+
+    """
+    UNREACHABLE = float('inf')
+
+    def __init__(self, total_reality_location, landmarks, forward, backward):
+        """
+        :Function description:
+            A LandmarkTable constructor from existing distances, see build() to compute them from a city.
+
+        :Input:
+            total_reality_location  (int)       : Total number of all locations in reality
+            landmarks               (List[int]) : Location of each landmark
+            forward                 (array)     : Flat least costs from each landmark
+            backward                (array)     : Flat least costs to each landmark
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.total_reality_location = total_reality_location
+        self.landmarks = landmarks
+        self.forward = forward
+        self.backward = backward
+
+    @classmethod
+    def build(cls, city, count):
+        """
+        :Function description:
+            Chooses landmarks far apart from each other and computes their least costs from and to every location.
+
+        :Approach description:
+            The first landmark is the location with the most roads. Each next landmark is the location furthest
+            from its closest landmark chosen so far (a location no landmark reaches is the furthest), so that
+            the landmarks surround the city and give tight bounds in every direction.
+
+        :Input:
+            city  (City) : The city whose roads in reality are used
+            count (int)  : Number of landmarks
+
+        :Output:
+            LandmarkTable - The landmarks of the city
+
+        :Time complexity:
+            O(K (R log L + L)), where K is the number of landmarks, R is the number of roads and L is the number of locations.
+
+        :Space complexity:
+            O(K L + R), where K is the number of landmarks, R is the number of roads and L is the number of locations.
+
+        """
+        total = city.total_reality_location
+        outgoing = [[] for _ in range(total)]
+        incoming = [[] for _ in range(total)]
+        for start, end, cost in city.reality_roads():
+            road = Road(start, end, cost, 0)
+            outgoing[start].append(road)
+            incoming[end].append(road)
+
+        forward = array("d")
+        backward = array("d")
+        landmarks = []
+        closest = [float('inf')] * total
+        candidate = max(range(total), key=lambda location: len(outgoing[location]) + len(incoming[location])) if total else None
+        heap = MinHeap([], total)
+        while candidate is not None and len(landmarks) < min(count, total):
+            landmarks.append(candidate)
+            from_landmark = cls._distances(heap, outgoing, candidate, True)
+            to_landmark = cls._distances(heap, incoming, candidate, False)
+            forward.extend(from_landmark)
+            backward.extend(to_landmark)
+
+            # Furthest location from its closest landmark
+            candidate = None
+            furthest = -1
+            for location in range(total):
+                closest[location] = min(closest[location], from_landmark[location])
+                if location not in landmarks and closest[location] > furthest:
+                    furthest = closest[location]
+                    candidate = location
+        return cls(total, landmarks, forward, backward)
+
+    @classmethod
+    def _distances(cls, heap, roads, source, forward):
+        """
+        :Function description:
+            Least cost from a source to every location in reality, or from every location to the source
+            backward, by dijkstra search.
+
+        :Input:
+            heap    (MinHeap)          : An empty heap of the size of reality
+            roads   (List[List[Road]]) : Roads in reality of 0 minutes, outgoing from each location forward or incoming backward
+            source  (int)              : The source location
+            forward (bool)             : Search from the source, or towards it
+
+        :Output:
+            array - Least cost to each location, UNREACHABLE if unreachable
+
+        :Time complexity:
+            O(R log L), where R is the number of roads and L is the number of locations.
+
+        :Space complexity:
+            O(L), where L is the number of locations.
+
+        """
+        search = LabelSearch(roads.__getitem__, forward, heap)
+        search.add_source(source)
+        while not heap.is_empty():
+            current, location = search.settle_next()
+            search.relax(location, current)
+        distance = array("d", [cls.UNREACHABLE]) * len(roads)
+        for location, (cost, time) in search.distance.items():
+            distance[location] = cost
+        return distance
+
+    def lower_bound(self, source, target):
+        """
+        :Function description:
+            Lower bound of the least cost from a source to a target in reality, from every landmark.
+
+        :Input:
+            source (int) : Location of the source
+            target (int) : Location of the target
+
+        :Output:
+            int or float - The lower bound, float('inf') when the landmarks prove the target unreachable
+
+        :Time complexity:
+            O(K), where K is the number of landmarks.
+
+        :Space complexity:
+            O(1)
+
+        """
+        total = self.total_reality_location
+        bound = 0
+        for i in range(len(self.landmarks)):
+            from_source = self.forward[i * total + source]
+            from_target = self.forward[i * total + target]
+            if from_source != self.UNREACHABLE:
+                # A landmark reaching the source but not the target proves the target unreachable
+                if from_target == self.UNREACHABLE:
+                    return float('inf')
+                bound = max(bound, from_target - from_source)
+            to_source = self.backward[i * total + source]
+            to_target = self.backward[i * total + target]
+            if to_source != self.UNREACHABLE and to_target != self.UNREACHABLE:
+                bound = max(bound, to_source - to_target)
+        return bound
+
+    def potential(self, targets):
+        """
+        :Function description:
+            Lower bound of the least cost from every location to its nearest target, as the potential of an A* search.
+
+        :Input:
+            targets (List[int]) : Locations of the targets, such as the train stations
+
+        :Output:
+            List[int] - Lower bound for each location, float('inf') for a location that reaches no target
+
+        :Time complexity:
+            O(K T L), where K is the number of landmarks, T is the number of targets and L is the number of locations.
+
+        :Space complexity:
+            O(L), where L is the number of locations.
+
+        """
+        potential = [float('inf')] * self.total_reality_location
+        for location in range(self.total_reality_location):
+            for target in targets:
+                potential[location] = min(potential[location], self.lower_bound(location, target))
+        return potential
+
+    def to_dict(self):
+        """
+        :Function description:
+            Serialisable representation of the landmarks, of lists and numbers only, with None for unreachable.
+
+        :Output:
+            dict - The landmarks, to be restored by from_dict()
+
+        :Time complexity:
+            O(K L), where K is the number of landmarks and L is the number of locations.
+
+        :Space complexity:
+            O(K L), where K is the number of landmarks and L is the number of locations.
+
+        """
+        return {
+            "total_reality_location": self.total_reality_location,
+            "landmarks": list(self.landmarks),
+            "forward": [None if distance == self.UNREACHABLE else distance for distance in self.forward],
+            "backward": [None if distance == self.UNREACHABLE else distance for distance in self.backward],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :Function description:
+            Restores landmarks from their to_dict() representation.
+
+        :Input:
+            data (dict) : The landmarks from to_dict(), possibly through JSON
+
+        :Output:
+            LandmarkTable - The restored landmarks
+
+        :Time complexity:
+            O(K L), where K is the number of landmarks and L is the number of locations.
+
+        :Space complexity:
+            O(K L), where K is the number of landmarks and L is the number of locations.
+
+        """
+        forward = array("d", [cls.UNREACHABLE if distance is None else distance for distance in data["forward"]])
+        backward = array("d", [cls.UNREACHABLE if distance is None else distance for distance in data["backward"]])
+        return cls(data["total_reality_location"], list(data["landmarks"]), forward, backward)
+
+class DenseIndex:
+    """
+    A dense index of the least cost and earliest time between every pair of locations in the multiverse of
+    a small city, for many queries with different starts, each answered by a table lookup.
+
+    :Class description:
+        The cost and time of a route are combined into one key, cost * scale + time, where scale is larger than
+        the time of any two routes together, so that comparing keys compares (cost, time), the least cost first
+        and then the earliest time. The table holds the least key from every location to every other location,
+        and a route is followed from the start by the road whose key and remaining key add up to the least key.
+        It has the interface of HubLabelIndex used by intercept(), node_index() and query().
+
+    :Approach description:
+        Floyd-Warshall with min-plus operations: for each location k in turn, a route from i to j through k
+        replaces the best route from i to j when its key is smaller. With NumPy, each k is one operation on the
+        whole table; without NumPy, or when the keys may not fit in 64 bits, the table is lists of integers.
+        Only the locations that can reach a station, as pruned by station_reach(), are in the table.
+
+    :Attributes:
+        city             (City)                 : The indexed city, for the layout of its multiverse.
+        total_multiverse (int)                  : Total number of all multiverse layers.
+        rows             (List[int])            : Row of each location in multiverse_locations, -1 when not in the table.
+        location_numbers (List[int])            : Location number in reality of each row.
+        scale            (int)                  : Multiplier of the cost in each key.
+        unreached        (int)                  : Key of a location that cannot be reached, larger than any route.
+        keys      (List[List[int]] or ndarray)  : Least key from each row to each row.
+        row_roads (List[List[Tuple[int, int, bool]]]) : Roads from each row, as (row, key, waited) with the least key to each
+                                                  row, where waited tells a wait from a road back to the same location.
+        wait_cost        (int or None)          : Cost per minute of waiting in the indexed city, None when waiting is disabled.
+
+    """
+    def __init__(self, city, rows, location_numbers, scale, unreached, keys, row_roads):
+        """
+        :Function description:
+            A DenseIndex constructor from an existing table, see build() to construct the table from a city.
+
+        :Input:
+            city             (City)                : The indexed city
+            rows             (List[int])           : Row of each location in multiverse_locations, -1 when not in the table
+            location_numbers (List[int])           : Location number in reality of each row
+            scale            (int)                 : Multiplier of the cost in each key
+            unreached        (int)                 : Key of a location that cannot be reached
+            keys      (List[List[int]] or ndarray) : Least key from each row to each row
+            row_roads (List[List[Tuple[int, int, bool]]]) : Roads from each row, as (row, key, waited)
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.city = city
+        self.total_multiverse = city.total_multiverse
+        self.rows = rows
+        self.location_numbers = location_numbers
+        self.scale = scale
+        self.unreached = unreached
+        self.keys = keys
+        self.row_roads = row_roads
+        self.wait_cost = city.wait_cost
+
+    @staticmethod
+    def table_size(city):
+        """
+        :Function description:
+            Number of rows of the table of a city, the locations in the multiverse that can reach a station.
+
+        :Input:
+            city (City) : The city to be indexed
+
+        :Output:
+            int - Number of rows
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        if city.station_reachable is None:
+            return len(city.multiverse_locations)
+        return len(city.station_reachable) * city.total_multiverse
+
+    @classmethod
+    def build(cls, city):
+        """
+        :Function description:
+            Constructs the table of least keys between all locations of a city.
+
+        :Input:
+            city (City) : The city to be indexed
+
+        :Output:
+            DenseIndex - The index of the city
+
+        :Time complexity:
+            O(N^3), where N is the number of locations in the multiverse that can reach a station, as N operations
+            on the whole table with NumPy.
+
+        :Space complexity:
+            O(N^2), where N is the number of locations in the multiverse that can reach a station.
+
+        """
+        rows = [-1] * len(city.multiverse_locations)
+        location_numbers = []
+        for location_index in range(len(city.multiverse_locations)):
+            location_no = city.node_position(location_index)[1]
+            if city.station_reachable is None or location_no in city.station_reachable:
+                rows[location_index] = len(location_numbers)
+                location_numbers.append(location_no)
+        total = len(location_numbers)
+
+        # Roads between rows, without those that can never be taken
+        roads = []
+        max_cost = max_time = 0
+        for location_index in range(len(city.multiverse_locations)):
+            if rows[location_index] < 0:
+                continue
+            for road in city.roads_from(location_index):
+                if road.cost < INF and rows[road.end] >= 0:
+                    roads.append((rows[location_index], rows[road.end], road.cost, road.time, type(road) is WaitRoad))
+                    max_cost = max(max_cost, road.cost)
+                    max_time = max(max_time, road.time)
+
+        # Every route is simple, of fewer than N roads, so two routes together are below these bounds
+        scale = 2 * total * max_time + 1
+        unreached = (2 * total * max_cost + 1) * scale
+
+        # Least key of the roads between each pair of rows, and whether that road is a wait
+        least = {}
+        for start, end, cost, time, waited in roads:
+            key = cost * scale + time
+            if key < least.get((start, end), (unreached,))[0]:
+                least[(start, end)] = (key, waited)
+        row_roads = [[] for _ in range(total)]
+        for (start, end), (key, waited) in least.items():
+            row_roads[start].append((end, key, waited))
+
+        if numpy is not None and 2 * unreached < INF:
+            keys = numpy.full((total, total), unreached, dtype=numpy.int64)
+            numpy.fill_diagonal(keys, 0)
+            for (start, end), (key, _) in least.items():
+                if start != end:
+                    keys[start, end] = key
+            for through in range(total):
+                # Every route from i to j through the location, in one operation
+                numpy.minimum(keys, keys[:, through, None] + keys[through], out=keys)
+        else:
+            keys = [[unreached] * total for _ in range(total)]
+            for row in range(total):
+                keys[row][row] = 0
+            for (start, end), (key, _) in least.items():
+                if start != end:
+                    keys[start][end] = key
+            for through in range(total):
+                keys_from = keys[through]
+                for row in range(total):
+                    row_keys = keys[row]
+                    key_to = row_keys[through]
+                    if key_to >= unreached or row == through:
+                        continue
+                    for column in range(total):
+                        key = key_to + keys_from[column]
+                        if key < row_keys[column]:
+                            row_keys[column] = key
+
+        return cls(city, rows, location_numbers, scale, unreached, keys, row_roads)
+
+    def node_index(self, layer, location_no):
+        """
+        :Function description:
+            Row of a location of a multiverse layer, the counterpart of City.node_index() for query().
+
+        :Input:
+            layer       (int) : Multiverse layer of the location
+            location_no (int) : Location number in reality
+
+        :Output:
+            int - Row of the location, -1 when it is not in the table
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        if not 0 <= location_no < self.city.total_reality_location:
+            return -1
+        return self.rows[self.city.node_index(layer, location_no)]
+
+    def query(self, start_row, target_row):
+        """
+        :Function description:
+            Least cost and earliest time route between two locations in the multiverse, from the table.
+
+        :Input:
+            start_row  (int) : Row of the start location
+            target_row (int) : Row of the target location
+
+        :Output:
+            Tuple[int, int, List[int]] or None - The cost, time and route, None if the target is unreachable.
+
+        :Time complexity:
+            O(PD), where P is the number of locations in the route and D is the number of roads of a location.
+
+        :Space complexity:
+            O(P), where P is the number of locations in the route.
+
+        """
+        if start_row < 0 or target_row < 0:
+            return None
+        key = int(self.keys[start_row][target_row])
+        if key >= self.unreached:
+            return None
+
+        # Road of each location on a least route, as its key and the least key from its end add up to the remaining key
+        steps = [(self.location_numbers[start_row], 0, 0, False)]
+        row = start_row
+        travelled = 0
+        while row != target_row:
+            remaining = key - travelled
+            for end, road_key, waited in self.row_roads[row]:
+                if road_key + int(self.keys[end][target_row]) == remaining:
+                    break
+            row = end
+            travelled += road_key
+            cost, time = divmod(travelled, self.scale)
+            steps.append((self.location_numbers[row], cost, time, waited))
+        cost, time = divmod(key, self.scale)
+        return (cost, time, build_route(steps, self.city.contracted_roads))
+
+class InterceptCache:
+    """
+    This class represents cached intercept() results of one road network, keyed by the start and friend_start,
+    together with the roads that each route uses, so that a diff of the network only drops the results it affects.
+
+    :Class description:
+        Removing a road, or raising its cost without changing its time, makes no route cheaper, so a cached route
+        that does not use such a road is still the best. Only the results whose routes use one of them are dropped.
+        Added roads, cheaper roads, roads of another time and new stations can make any route better, so they drop
+        every result.
+
+    :Attributes:
+        results    (dict) : Maps (start, friend_start) to the cached result.
+        road_users (dict) : Maps a pair (start, end) of locations travelled in a route to the keys of the results using it.
+
+    """
+    def __init__(self):
+        """
+        :Function description:
+            An empty InterceptCache constructor.
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.results = {}
+        self.road_users = {}
+
+    def __contains__(self, key):
+        """
+        :Function description:
+            Whether the result of a query is cached.
+
+        :Input:
+            key (Tuple[int, int]) : The start and friend_start of the query
+
+        :Output:
+            bool - True when the result is cached
+
+        """
+        return key in self.results
+
+    def __len__(self):
+        """
+        :Function description:
+            Number of cached results.
+
+        :Output:
+            int - The number of results
+
+        """
+        return len(self.results)
+
+    def get(self, start, friend_start):
+        """
+        :Function description:
+            Cached result of a query.
+
+        :Input:
+            start        (int) : Starting location number of the driver
+            friend_start (int) : Starting location number of the friend
+
+        :Output:
+            The cached result of intercept(), None when there is no interception or nothing is cached
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        return self.results.get((start, friend_start))
+
+    def put(self, start, friend_start, result):
+        """
+        :Function description:
+            Caches the result of a query, with the roads of its route.
+
+        :Input:
+            start        (int)          : Starting location number of the driver
+            friend_start (int)          : Starting location number of the friend
+            result       (tuple or None) : The result of intercept() for the query
+
+        :Time complexity:
+            O(N), where N is the number of locations in the route.
+
+        :Space complexity:
+            O(N), where N is the number of locations in the route.
+
+        """
+        key = (start, friend_start)
+        self.results[key] = result
+        if result is not None:
+            route = result[2]
+            for i in range(1, len(route)):
+                self.road_users.setdefault((route[i - 1], route[i]), set()).add(key)
+
+    def invalidate(self, diff):
+        """
+        :Function description:
+            Drops the cached results that a diff of the road network can change.
+
+        :Input:
+            diff (dict) : The diff, as for City.apply_diff()
+
+        :Output:
+            int - Number of results dropped
+
+        :Time complexity:
+            O(D + K), where D is the size of the diff and K is the number of results dropped.
+
+        :Space complexity:
+            O(D)
+
+        """
+        # Roads that only got worse
+        worse = list(diff.get("removed", ()))
+        for old_road, new_road in diff.get("changed", ()):
+            if old_road[:2] == new_road[:2] and old_road[3] == new_road[3] and new_road[2] >= old_road[2]:
+                worse.append(old_road)
+            else:
+                worse = None
+                break
+        if worse is None or diff.get("added") or "stations" in diff:
+            dropped = len(self.results)
+            self.results = {}
+            self.road_users = {}
+            return dropped
+
+        dropped = 0
+        for road in worse:
+            for key in self.road_users.pop((road[0], road[1]), ()):
+                if key in self.results:
+                    del self.results[key]
+                    dropped += 1
+        return dropped
+
+def _outgoing_roads(roads, station_reachable):
+    """
+    :Function description:
+        Outgoing roads of each location in reality, in order of the roads, without the roads excluded by pruning.
+
+    :Input:
+        roads             (List[Tuple[int, int, int, int]]) : Roads in reality
+        station_reachable (Set[int] or None)                : Locations from station_reach(), None when not pruned
+
+    :Output:
+        dict - Maps each location with outgoing roads to the list of its roads
+
+    :Time complexity:
+        O(R), where R is the number of roads.
+
+    :Space complexity:
+        O(R), where R is the number of roads.
+
+    """
+    outgoing_roads = {}
+    for road in roads:
+        if station_reachable is None or (road[0] in station_reachable and road[1] in station_reachable):
+            outgoing_roads.setdefault(road[0], []).append(road)
+    return outgoing_roads
+
+def snapshot_diff(old_roads, new_roads):
+    """
+    :Function description:
+        Difference between two snapshots of the roads of a network, for City.apply_diff() and InterceptCache.invalidate().
+        A road removed and a road added between the same locations are paired as a changed road.
+
+    :Input:
+        old_roads (List[Tuple[int, int, int, int]]) : Roads of the previous snapshot
+        new_roads (List[Tuple[int, int, int, int]]) : Roads of the next snapshot
+
+    :Output:
+        dict - Lists of "added" roads, "removed" roads and "changed" roads as (old, new) pairs
+
+    :Time complexity:
+        O(R), where R is the number of roads in the snapshots.
+
+    :Space complexity:
+        O(R), where R is the number of roads in the snapshots.
+
+    """
+    # Roads of each snapshot, counted as a road can appear more than once
+    counts = {}
+    for road in old_roads:
+        counts[road] = counts.get(road, 0) + 1
+    for road in new_roads:
+        counts[road] = counts.get(road, 0) - 1
+
+    removed = {}
+    added = []
+    for road, count in counts.items():
+        for _ in range(count):
+            removed.setdefault(road[:2], []).append(road)
+        for _ in range(-count):
+            added.append(road)
+
+    # Removed and added roads between the same locations are changed
+    diff = {"added": [], "removed": [], "changed": []}
+    for road in added:
+        between = removed.get(road[:2])
+        if between:
+            diff["changed"].append((between.pop(), road))
+        else:
+            diff["added"].append(road)
+    for between in removed.values():
+        diff["removed"].extend(between)
+    return diff
+
+def compact_locations(roads, stations, extra=()):
+    """
+    :Function description:
+        Maps the location numbers of roads and stations, which may be sparse or very large, to dense indices
+        from 0 in order of first appearance, with one hash lookup for each location of each road and station.
+
+    :Input:
+        roads    (List[Tuple[int, int, int, int]]) : Roads with any hashable location numbers
+        stations (List[Tuple[int, int]])           : Train stations with any hashable location numbers
+        extra    (Iterable[int])                   : Other location numbers to map, such as the driver's start
+
+    :Output:
+        Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, int]], List[int], dict] - The roads and stations with dense
+        indices, the location number of each index, and the index of each location number
+
+    :Time complexity:
+        O(R + S), where R is the number of roads and S is the number of stations.
+
+    :Space complexity:
+        O(R + S + L), where L is the number of distinct locations.
+
+    """
+    location_ids = []
+    location_index = {}
+    locations = [location_no for road in roads for location_no in road[:2]]
+    locations += [station_no for station_no, travel_time in stations]
+    locations += list(extra)
+    for location_no in locations:
+        if location_no not in location_index:
+            location_index[location_no] = len(location_ids)
+            location_ids.append(location_no)
+
+    dense_roads = [(location_index[start], location_index[end], cost, time) for start, end, cost, time in roads]
+    dense_stations = [(location_index[station_no], travel_time) for station_no, travel_time in stations]
+    return dense_roads, dense_stations, location_ids, location_index
+
+def locality_order(roads, total_reality_location, method="rcm"):
+    """
+    :Function description:
+        Order of the locations in reality in which the two ends of most roads are close together, so that a
+        search following the roads of a location touches nearby parts of multiverse_locations and the search arrays.
+
+    :Approach description:
+        Both orders are breadth first searches over the roads taken in either direction, one component after another.
+        1.  "bfs" starts each component at its lowest location number and visits neighbours in order of their roads.
+        2.  "rcm" (reverse Cuthill-McKee) starts each component at a location of fewest roads, visits neighbours
+            in order of fewest roads, and reverses the whole order, which narrows the band of the road matrix.
+
+    :Input:
+        roads                  (List[Tuple[int, int, int, int]]) : Roads of the city
+        total_reality_location (int)                             : Total number of locations in reality
+        method                 (str)                             : "bfs" or "rcm"
 
-    # Construction of city
-    city = City(roads, stations, friend_start)
-    # Shortest path for each location in city
-    city.dijkstra_search(start)
+    :Output:
+        List[int] - Every location number in reality, in the new order
+
+    :Time complexity:
+        O(L + R) for "bfs" and O(L log L + R log R) for "rcm", where R is the number of roads and L is the number of locations.
+
+    :Space complexity:
+        O(L + R), where R is the number of roads and L is the number of locations.
+
+    """
+    if method not in ("bfs", "rcm"):
+        raise ValueError(f"Unknown order {method!r}, expected 'bfs' or 'rcm'.")
+
+    neighbours = [[] for _ in range(total_reality_location)]
+    for start, end, cost, time in roads:
+        if start != end:
+            neighbours[start].append(end)
+            neighbours[end].append(start)
+
+    if method == "rcm":
+        degree = [len(adjacent) for adjacent in neighbours]
+        for adjacent in neighbours:
+            adjacent.sort(key=degree.__getitem__)
+        starts = sorted(range(total_reality_location), key=degree.__getitem__)
+    else:
+        starts = range(total_reality_location)
+
+    order = []
+    seen = bytearray(total_reality_location)
+    for first in starts:
+        if seen[first]:
+            continue
+        seen[first] = 1
+        head = len(order)
+        order.append(first)
+        while head < len(order):
+            for neighbour in neighbours[order[head]]:
+                if not seen[neighbour]:
+                    seen[neighbour] = 1
+                    order.append(neighbour)
+            head += 1
+
+    if method == "rcm":
+        order.reverse()
+    return order
+
+def train_schedule(stations, friend_start):
+    """
+    :Function description:
+        Accumulated train duration of each station, from the friend's starting station along the train loop.
+
+    :Input:
+        stations     (List[Tuple[int, int]]) : A list of train stations in the city, where each station contains the station_no and time_travel of this station.
+        friend_start (int)                   : Starting location number of the friend (on the train).
+
+    :Output:
+        List[int] - Time for the friend to arrive at each station, in order of the stations.
+
+    :Time complexity:
+        O(S), where S is the number of stations.
+
+    :Space complexity:
+        O(S), where S is the number of stations.
+
+    """
+    # Track friend's position
+    friend_position = -1
+    for i in range(len(stations)):
+        station_no = stations[i][0]
+        if station_no == friend_start:
+            friend_position = i
+            break
+
+    # Track each accumulated train duration
+    acum_train_duration = [0] * len(stations)
+    duration = 0
+    for i in range(len(stations)):
+        acum_train_duration[friend_position] = duration
+        duration += stations[friend_position][1]
+        friend_position = (friend_position + 1) % len(stations)
+    return acum_train_duration
+
+def expand_profile(windows, total_multiverse, cost, time):
+    """
+    :Function description:
+        Cost and time of a time-dependent road in each multiverse layer, from its windows.
+
+    :Input:
+        windows          (List[Tuple[int, int, int]]) : Windows of (first_layer, cost, time), in order of first_layer
+        total_multiverse (int)                        : Number of multiverse layers
+        cost             (int)                        : Cost of the road before its first window
+        time             (int)                        : Time of the road before its first window
+
+    :Output:
+        List[Tuple[int, int]] - Cost and time of the road leaving in each multiverse layer
+
+    :Time complexity:
+        O(M + W), where M is the number of multiverse layers and W is the number of windows.
+
+    :Space complexity:
+        O(M), where M is the number of multiverse layers.
+
+    """
+    layers = []
+    window = 0
+    for layer in range(total_multiverse):
+        while window < len(windows) and windows[window][0] <= layer:
+            first_layer, cost, time = windows[window]
+            window += 1
+        layers.append((cost, time))
+    return layers
+
+def build_route(steps, contracted_roads):
+    """
+    :Function description:
+        Builds a route of location numbers from the locations travelled in the multiverse.
+        Waiting at a location does not repeat that location in the route, unlike a road that starts and ends
+        at that location, and contracted roads are expanded back into the locations they pass through.
+
+    :Input:
+        steps            (List[Tuple[int, int, int, bool]]) : Location number, cost and time of each travelled location, in order
+                                                              of travel, and whether it was reached by waiting at the previous one
+        contracted_roads (dict)                             : Contracted roads from preprocess_roads()
+
+    :Output:
+        List[int] - Location numbers of the route in order of travel
+
+    :Time complexity:
+        O(N), where N is the number of locations in the route.
+
+    :Space complexity:
+        O(N), where N is the number of locations in the route.
+
+    """
+    route = []
+    for i in range(len(steps)):
+        location_no, cost, time, waited = steps[i]
+        # Waiting in the same location is not a new stop of the route
+        if waited:
+            continue
+        # Locations passed through by a contracted road, identified by its cost and time
+        if i > 0 and contracted_roads:
+            previous_no, previous_cost, previous_time, _ = steps[i - 1]
+            road = (previous_no, location_no, cost - previous_cost, time - previous_time)
+            route.extend(contracted_roads.get(road, ()))
+        route.append(location_no)
+    return route
+
+def preprocess_roads(roads, stations, keep=(), wait_cost=None):
+    """
+    :Function description:
+        Reduces the roads in reality before the multiverse is constructed, by dropping dominated
+        parallel roads and contracting chains of locations that only pass traffic through.
+
+    :Approach description:
+        1.  Parallel roads between the same two locations are dominated when another road arrives
+            in the same multiverse (time modulo the train loop duration) no later and no costlier.
+            When waiting is allowed, an earlier road followed by waiting may also dominate.
+        2.  A location with exactly one incoming road and one outgoing road, which is neither a
+            train station nor a kept location, is contracted: both roads are replaced by a single
+            road summing their cost and time.
+        3.  Parallel roads created by the contraction are reduced again.
+
+    :Input:
+        roads       (List[Tuple[int, int, int, int]]) : A list of roads in the city, where each road contains the start, end, cost, time of this road.
+        stations    (List[Tuple[int, int]])           : A list of train stations in the city, where each station contains the station_no and time_travel of this station.
+        keep        (Iterable[int])                   : Location numbers that must not be contracted, such as the driver's start.
+        wait_cost   (int or None)                     : Cost per minute of waiting at a location, None if waiting is disabled.
+
+    :Output:
+        Tuple[List[Tuple[int, int, int, int]], dict] : The reduced roads, and the contracted roads (start, end, cost, time)
+                                                       mapped to the location numbers they pass through, for City.route_to().
+
+    :Time complexity:
+        O(R log R), where R is the number of roads.
+
+    :Time complexity analysis:
+        - O(R log R) to sort each group of parallel roads by time and cost.
+        - O(R) to contract each location at most once, as contraction never changes the degree of its neighbours.
+
+    :Space complexity:
+        O(R + L), where R is the number of roads and L is the number of locations.
+
+    :Space complexity analysis:
+        Input space of O(R) for the roads and auxiliary space of O(R + L) for the incoming and outgoing roads of each location.
+
+    """
+    total_train_duration = sum(travel_time for station_no, travel_time in stations)
+    protected = set(keep)
+    for station_no, travel_time in stations:
+        protected.add(station_no)
+
+    # Drop dominated parallel roads
+    roads = _drop_dominated_roads(roads, total_train_duration, wait_cost)
+
+    # Incoming and outgoing roads of each location, by road number
+    all_roads = list(roads)
+    passing = [()] * len(all_roads)
+    incoming = {}
+    outgoing = {}
+    for road_no in range(len(all_roads)):
+        start, end, cost, time = all_roads[road_no]
+        outgoing.setdefault(start, set()).add(road_no)
+        incoming.setdefault(end, set()).add(road_no)
+
+    # Contract each pass-through location
+    for location in list(incoming):
+        if location in protected or len(incoming[location]) != 1 or len(outgoing.get(location, ())) != 1:
+            continue
+        road_in = next(iter(incoming[location]))
+        road_out = next(iter(outgoing[location]))
+        if road_in == road_out:  # a road looping back to itself
+            continue
+        start, _, cost_in, time_in = all_roads[road_in]
+        _, end, cost_out, time_out = all_roads[road_out]
+
+        road_no = len(all_roads)
+        all_roads.append((start, end, cost_in + cost_out, time_in + time_out))
+        passing.append(passing[road_in] + (location,) + passing[road_out])
+
+        outgoing[start].discard(road_in)
+        outgoing[start].add(road_no)
+        incoming[end].discard(road_out)
+        incoming[end].add(road_no)
+        del incoming[location]
+        del outgoing[location]
+
+    # Remaining roads, with contracted roads recorded for route expansion
+    reduced = []
+    contracted_roads = {}
+    for location in outgoing:
+        for road_no in sorted(outgoing[location]):
+            road = all_roads[road_no]
+            if not passing[road_no]:
+                reduced.append(road)
+            elif road not in contracted_roads:
+                contracted_roads[road] = list(passing[road_no])
+    for road in reduced:
+        contracted_roads.pop(road, None)
+
+    # Drop dominated parallel roads made by contraction, preferring the original roads on ties
+    reduced = _drop_dominated_roads(reduced + list(contracted_roads), total_train_duration, wait_cost)
+    contracted_roads = {road: contracted_roads[road] for road in reduced if road in contracted_roads}
+    return reduced, contracted_roads
+
+def _drop_dominated_roads(roads, total_train_duration, wait_cost):
+    """
+    :Function description:
+        Drops parallel roads that are dominated by another road between the same two locations.
+        A road dominates when it arrives in the same multiverse no later and no costlier, or,
+        with waiting allowed, when it arrives earlier and waiting makes up the difference no costlier.
+
+    :Input:
+        roads                (List[Tuple[int, int, int, int]]) : Roads as (start, end, cost, time)
+        total_train_duration (int)                             : Total time for a train to loop through all stations
+        wait_cost            (int or None)                     : Cost per minute of waiting, None if waiting is disabled
+
+    :Output:
+        List[Tuple[int, int, int, int]] - Roads that are not dominated, in their input order
+
+    :Time complexity:
+        O(R log R + RP), where R is the number of roads and P is the largest number of parallel roads.
+
+    :Space complexity:
+        O(R), where R is the number of roads.
+
+    """
+    parallel = {}
+    for road_no in range(len(roads)):
+        start, end, cost, time = roads[road_no]
+        parallel.setdefault((start, end), []).append(road_no)
+
+    kept = [False] * len(roads)
+    for road_nos in parallel.values():
+        # Earliest and cheapest roads first, so a dominating road is always kept before the roads it dominates
+        road_nos.sort(key=lambda road_no: (roads[road_no][3], roads[road_no][2]))
+        chosen = []
+        for road_no in road_nos:
+            _, _, cost, time = roads[road_no]
+            dominated = False
+            for other in chosen:
+                _, _, other_cost, other_time = roads[other]
+                if total_train_duration and (time - other_time) % total_train_duration == 0 and other_cost <= cost:
+                    dominated = True
+                elif wait_cost is not None and other_cost + wait_cost * (time - other_time) <= cost:
+                    dominated = True
+                if dominated:
+                    break
+            if not dominated:
+                chosen.append(road_no)
+                kept[road_no] = True
+
+    return [roads[road_no] for road_no in range(len(roads)) if kept[road_no]]
+
+def station_reach(roads, stations):
+    """
+    :Function description:
+        Finds the locations in reality that have a path to any train station, so that dead-end
+        locations can be pruned from the multiverse.
+
+    :Approach description:
+        Breadth-first search from every train station over the reversed roads. A location that is
+        never discovered has no path to any train station, in any multiverse, as each road in
+        the multiverse is a copy of a road in reality.
+
+    :Input:
+        roads       (List[Tuple[int, int, int, int]]) : A list of roads in the city, where each road contains the start, end, cost, time of this road.
+        stations    (List[Tuple[int, int]])           : A list of train stations in the city, where each station contains the station_no and time_travel of this station.
+
+    :Output:
+        Set[int] - Location numbers that can reach a train station, including the stations.
+
+    :Time complexity:
+        O(R + L), where R is the number of roads and L is the number of locations.
+
+    :Time complexity analysis:
+        - O(R) to construct the reversed roads.
+        - O(R + L) for the breadth-first search.
+
+    :Space complexity:
+        O(R + L), where R is the number of roads and L is the number of locations.
+
+    :Space complexity analysis:
+        Input space of O(R) for the roads and auxiliary space of O(R + L) for the reversed roads and the queue.
+
+    """
+    # Reversed roads in reality
+    incoming = {}
+    for start, end, cost, time in roads:
+        incoming.setdefault(end, []).append(start)
+
+    # Breadth-first search from all stations
+    reachable = set()
+    queue = []
+    for station_no, travel_time in stations:
+        if station_no not in reachable:
+            reachable.add(station_no)
+            queue.append(station_no)
+    head = 0
+    while head < len(queue):
+        location = queue[head]
+        head += 1
+        for previous in incoming.get(location, ()):
+            if previous not in reachable:
+                reachable.add(previous)
+                queue.append(previous)
+
+    return reachable
+
+def intercept(roads, stations, start, friend_start, wait_cost=None, preprocess=False, prune=True, hub_index=None, search=None, return_stats=False,
+              bidirectional=False, landmarks=None, deadline=None, check_every=64, road_profiles=None, max_loops=None, with_loop=False,
+              compact_ids=False):
+    """
+    :Function description:
+        Search for best intercept location to meet a friend on a train loop.
+
+    :Approach description:
+        1.  Construct a city of roads and stations of the entire multiverse, and 
+            marking the friend start and train stations duration.
+        2.  Run dijsktra algorithm to search for shortest path from driver's location,
+            settling locations only until the best interception is known.
+        3.  Record each interception location as it is settled, from the city's station targets
+            of the multiverse layer and location index of each station.
+        4.  Check the interception location with the friend to be the same time.
+        5.  Keep the interception of lowest cost and earliest arrival time.
+        6.  Backtrack intercept route by checking the previous visited location.
+
+    :Input:
+        roads       (List[Tuple[int, int, int, int]]) : A list of roads in the city, where each road contains the start, end, cost, time of this road.
+        stations    (List[Tuple[int, int]])           : A list of train stations in the city, where each station contains the station_no and time_travel of this station.
+        start       (int)                             : Starting location number of the driver.
+        friend_start (int)                            : Starting location number of the friend (on the train).
+        wait_cost   (int or None)                     : Cost per minute for the driver to wait at a location, None if the driver never waits.
+        preprocess  (bool)                            : Reduce the roads with preprocess_roads() before the city is constructed.
+        prune       (bool)                            : Exclude dead-end locations that cannot reach any station, found by station_reach().
+        hub_index   (HubLabelIndex or None)           : Index built from the city of these roads, or a DenseIndex. When given, each
+                                                        station is answered from the index instead of constructing and searching the city.
+        search      (DijkstraSearch or None)          : Search of an earlier query from the same start, resumed instead of constructing
+                                                        and searching a new city. The roads, stations and options of its city are used.
+        return_stats (bool)                           : Also return the SearchStats of the search, for logging. A resumed search
+                                                        only has the stats it was created with.
+        bidirectional (bool)                          : Search forward from the start and backward from the interception locations
+                                                        at the same time, with City.bidirectional_search().
+        landmarks   (int or LandmarkTable or None)    : Number of landmarks to build, or landmarks built for these roads, whose lower
+                                                        bounds to the stations guide the search as an A* search.
+        deadline    (float or None)                   : Time budget in seconds for the dijkstra search. When it runs out, the best interception
+                                                        confirmed so far is returned, which may not be the best.
+        check_every (int)                             : Number of heap pops between checks of the deadline.
+        road_profiles (dict or None)                  : Cost and time windows of time-dependent roads, as City(). Roads are not
+                                                        preprocessed, as their reductions assume the same cost and time at all times.
+        max_loops   (int or None)                     : Number of train loops of the friend to consider, from the first. The city then has
+                                                        a horizon at the end of the last loop, see City, with a layer for every time up to
+                                                        the horizon. Not with hub_index. None considers every loop.
+        with_loop   (bool)                            : Also report the loop of the friend at the interception, from 0 for the first loop,
+                                                        as (cost, time, route, loop). The time is the absolute time of the interception.
+        compact_ids (bool)                            : Map the location numbers to dense indices with compact_locations() before the city
+                                                        is constructed, and back in the route, so that the city is sized by the number of
+                                                        locations rather than the largest location number. A LandmarkTable is then one of
+                                                        the compacted roads. Not with hub_index or search, whose cities are already built.
+
+    :Output:
+        Tuple[int, int, List[int, int]] or None : The best interception route, containing the cost, time and the route,
+        When a deadline is given, the result is (route, optimal, lower_bound) instead, where optimal tells whether the search finished
+        and lower_bound is the least cost that the best interception can have. Together with the SearchStats as (result, stats)
+        when return_stats is True.
+        A ValueError is raised for options that do not apply together: options of the constructed city (preprocess, prune=False,
+        bidirectional, landmarks, road_profiles, compact_ids) with hub_index or search, a wait_cost other than that of their city,
+        max_loops with hub_index, and landmarks or a deadline with bidirectional.
+
+    :Time complexity:
+        O(R log L), where R is the number of roads and L is the number of locations.
+
+    :Time complexity analysis:
+        - O(R + L) for the construction of the city and the roads.
+        - O(R log L) for the dijkstra search.
+        - O(1) to record each interception location as it is settled, with O(S) to track the stations of a resumed search.
+        - O(L) for the backtrack of the route.
+        Thus, the overall time complexity is O(R log L).
+
+    :Space complexity:
+        O(R + L), where R is the number of roads and L is the number of locations.
+
+    :Space complexity analysis:
+        Input space of O(R) for the input list of roads to be constructed by City() constructor, 
+        and auxiliary space of O(R + L) for the storing of roads and locations in the city.
+
+    """
+    intercept_route = None
+    stats = SearchStats() if return_stats else None
+    began = clock.perf_counter()
+
+    # Timing spans of the stages, only for the calls sampled by the profiler of set_profiler()
+    spans = _profiler.begin() if _profiler is not None else None
+
+    # Options of a city constructed by intercept() are rejected with an index or a search, whose city is already built
+    built = "hub_index" if hub_index is not None else "search" if search is not None else None
+    if built is not None:
+        if hub_index is not None and search is not None:
+            raise ValueError("Give either hub_index or search, not both.")
+        for option, given in (("preprocess", preprocess), ("prune=False", not prune), ("bidirectional", bidirectional),
+                              ("landmarks", landmarks), ("road_profiles", road_profiles), ("compact_ids", compact_ids)):
+            if given:
+                raise ValueError(f"{option} only applies to a city constructed by intercept(), not with {built}.")
+        built_wait_cost = hub_index.wait_cost if hub_index is not None else search.city.wait_cost
+        if wait_cost != built_wait_cost:
+            raise ValueError(f"wait_cost {wait_cost!r} differs from the wait_cost {built_wait_cost!r} of the {built}.")
+    if max_loops is not None and hub_index is not None:
+        raise ValueError("max_loops only limits a city constructed by intercept(), not with hub_index.")
+    if bidirectional and (landmarks or deadline is not None):
+        raise ValueError("A bidirectional search is neither guided by landmarks nor stopped at a deadline.")
+
+    # Duration of a train loop, for the loop of the interception and the last time of the loops considered
+    loop_duration = sum(travel_time for station_no, travel_time in stations)
+    horizon = max_loops * loop_duration - 1 if max_loops is not None else None
+    if not with_loop:
+        loop_duration = None
+
+    # Dense indices of sparse location numbers, for the city and the route
+    location_ids = None
+    if compact_ids:
+        roads, stations, location_ids, location_index = compact_locations(roads, stations, [start])
+        if road_profiles:
+            road_profiles = {(location_index[road[0]], location_index[road[1]], road[2], road[3]): windows
+                             for road, windows in road_profiles.items() if road[0] in location_index and road[1] in location_index}
+        start = location_index[start]
+        friend_start = location_index.get(friend_start, -1)
+
+    # Interceptions answered by the index, without the city
+    if hub_index is not None:
+        acum_train_duration = train_schedule(stations, friend_start)
+        start_index = hub_index.node_index(0, start)
+        # A start outside the indexed city never reaches a station
+        if start_index < 0:
+            return _intercept_result(None, stats, return_stats, deadline, spans=spans)
+        for station in range(len(stations)):
+            multiverse = acum_train_duration[station] % hub_index.total_multiverse
+            found = hub_index.query(start_index, hub_index.node_index(multiverse, stations[station][0]))
+            if found is not None and (intercept_route is None or found[:2] < intercept_route[:2]):
+                intercept_route = found
+        if spans is not None:
+            spans.mark("stations")
+        return _intercept_result(intercept_route, stats, return_stats, deadline, loop_duration=loop_duration,
+                                 location_ids=location_ids, spans=spans)
+
+    resumed = search is not None
+    if resumed:
+        # Resumed search of an earlier query from the same start
+        city = search.city
+        if search.start != city.node_index(0, start):
+            raise ValueError("The search does not start from the driver's start.")
+        if city.horizon != horizon:
+            raise ValueError("The search does not consider the same loops.")
+        city.set_friend_start(friend_start)
+        stats = search.stats
+        if spans is not None:
+            spans.mark("reset")
+    else:
+        # Construction of city, none when start never reaches a station
+        city = _build_city(roads, stations, start, friend_start, wait_cost, preprocess, prune, road_profiles, horizon)
+        if spans is not None:
+            spans.mark("construction")
+        if city is None:
+            return _intercept_result(None, stats, return_stats, deadline, spans=spans)
+
+        # Meeting of a forward and a backward search
+        if bidirectional:
+            intercept_route = city.bidirectional_search(start, stats)
+            if spans is not None:
+                spans.mark("search")
+            return _intercept_result(intercept_route, stats, return_stats, deadline, loop_duration=loop_duration,
+                                     location_ids=location_ids, spans=spans)
+
+        search = _build_search(city, start, landmarks, stats)
+        if spans is not None:
+            spans.mark("reset")
+
+    # Search budget, which also applies to a resumed search
+    search.deadline = began + deadline if deadline is not None else None
+    search.check_every = check_every
+    search.timed_out = False
     
-    # Possible interceptions for each train station
-    for station in range(len(stations)):
-        # Accumulative time of this station
-        arrival_time = city.acum_train_duration[station]
-
-        # Best intercept location of which multiverse using modulus
-        multiverse = arrival_time % city.total_multiverse
-
-        # Best intercept location of which index 
-        station_index = stations[station][0]
-        location_index = station_index + (multiverse * city.total_reality_location)
-        location = city.multiverse_locations[location_index]
-        
-        # Best intercept time using modulus
-        intercept_time = location.time % city.total_train_duration
-        
-        # Intercept !!!! when same location, same time
-        if arrival_time == intercept_time:
-            route = []
-            backtrack = location
-            # Backtrack previous locations to build route
-            while backtrack is not None:
-                route.insert(0, backtrack.location_no)
-                backtrack = backtrack.previous_location
-
-            # Best result for least cost
-            if (intercept_route is None) or (location.cost < intercept_route[0]):
-                intercept_route = (location.cost, location.time, route)
-            # Best result for least time when same cost
-            elif location.cost == intercept_route[0]:
-                if location.time < intercept_route[1]:
-                    intercept_route = (location.cost, location.time, route)
-
-    return intercept_route
+    # Interceptions are recorded as the search settles their locations, until the best one is known
+    if resumed:
+        search.track_targets()
+        if spans is not None:
+            spans.mark("stations")
+    while not search.intercept_known():
+        if search.settle_next() is None:
+            break
+    if spans is not None:
+        spans.mark("search")
+
+    # Backtrack previous locations to build route
+    if search.best_intercept is not None:
+        cost, time, station, location_index = search.best_intercept
+        intercept_route = (cost, time, city.route_to(location_index))
+
+    # Least cost possible for the best interception, from the confirmed interception and the unsettled frontier
+    lower_bound = search.frontier_cost()
+    if intercept_route is not None:
+        lower_bound = min(lower_bound, intercept_route[0])
+    if spans is not None:
+        spans.mark("route")
+    return _intercept_result(intercept_route, stats, return_stats, deadline, not search.timed_out, lower_bound, loop_duration,
+                             location_ids, spans)
+
+def _intercept_result(intercept_route, stats, return_stats, deadline, optimal=True, lower_bound=None, loop_duration=None,
+                      location_ids=None, spans=None):
+    """
+    :Function description:
+        Result of intercept() in the form asked for by its options.
+
+    :Input:
+        intercept_route (tuple or None)       : The best interception route found
+        stats           (SearchStats or None) : Counters of the search
+        return_stats    (bool)                : Whether the stats are returned
+        deadline        (float or None)       : The deadline of the search, when given the result carries optimal and lower_bound
+        optimal         (bool)                : Whether the search finished before the deadline
+        lower_bound     (int or None)         : Least cost the best interception can have, the route's cost when None
+        loop_duration   (int or None)         : Duration of a train loop, when the loop of the interception is reported
+        location_ids    (List[int] or None)   : Location number of each dense index, when the route is of compacted locations
+        spans           (object or None)      : Timing spans of a call sampled by the profiler, finished with the result
+
+    :Output:
+        The route, with its loop when loop_duration is given, (route, optimal, lower_bound) with a deadline,
+        and either with the stats as (result, stats) when return_stats.
+
+    :Time complexity:
+        O(1), or O(N) to map back a route of N compacted locations.
+
+    :Space complexity:
+        O(1), or O(N) for a route of N compacted locations.
+
+    """
+    if intercept_route is not None and location_ids is not None:
+        intercept_route = (intercept_route[0], intercept_route[1], [location_ids[location] for location in intercept_route[2]])
+    if intercept_route is not None and loop_duration is not None:
+        intercept_route = intercept_route + (intercept_route[1] // loop_duration,)
+    result = intercept_route
+    if deadline is not None:
+        if lower_bound is None:
+            lower_bound = intercept_route[0] if intercept_route is not None else float('inf')
+        result = (intercept_route, optimal, lower_bound)
+    if spans is not None:
+        spans.finish()
+    return (result, stats) if return_stats else result
+
+def _build_city(roads, stations, start, friend_start, wait_cost, preprocess, prune, road_profiles=None, horizon=None):
+    """
+    :Function description:
+        Constructs the city of an intercept() query, after the preprocessing and pruning of its roads.
+
+    :Input:
+        As intercept(), with the horizon of the city from max_loops.
+
+    :Output:
+        City or None - The city, None when the start cannot reach any station
+
+    :Time complexity:
+        O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+    :Space complexity:
+        O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+    """
+    # Reduction of roads in reality, which time-dependent roads do not allow
+    contracted_roads = None
+    if preprocess and road_profiles:
+        raise ValueError("Roads with profiles cannot be preprocessed.")
+    if preprocess:
+        roads, contracted_roads = preprocess_roads(roads, stations, [start], wait_cost)
+
+    # Dead-end locations, and no interception at all when start never reaches a station
+    station_reachable = None
+    if prune:
+        station_reachable = station_reach(roads, stations)
+        if start not in station_reachable:
+            return None
+
+    return City(roads, stations, friend_start, wait_cost, contracted_roads, station_reachable, road_profiles, horizon=horizon)
+
+def _build_search(city, start, landmarks, stats):
+    """
+    :Function description:
+        Starts the dijkstra search of an intercept() query, guided by landmarks when asked for.
+
+    :Input:
+        city      (City)                          : The city of the query
+        start     (int)                           : Starting location number of the driver
+        landmarks (int or LandmarkTable or None)  : As intercept()
+        stats     (SearchStats or None)           : Counters of the search
+
+    :Output:
+        DijkstraSearch - The search, with nothing settled yet
+
+    :Time complexity:
+        O(ML), where L is the number of locations and M is the number of multiverse layers, without landmarks to build.
+
+    :Space complexity:
+        O(ML), where L is the number of locations and M is the number of multiverse layers.
+
+    """
+    # Landmark lower bounds towards the stations
+    if isinstance(landmarks, LandmarkTable):
+        city.use_landmarks(landmarks)
+    elif landmarks:
+        city.build_landmarks(landmarks)
+
+    return DijkstraSearch(city, start, stats, potential=city.station_potential)
+
+# In-flight intercept_async() queries, shared by identical concurrent queries
+_pending_intercepts = {}
+
+def set_profiler(profiler):
+    """
+    :Function description:
+        Sets the profiler that times the stages of intercept(): construction of the city, reset of the search,
+        the search, the stations of a resumed search or of an index, and the route. For each call the profiler's
+        begin() returns None when the call is not sampled, or spans with mark(stage), called at the end of each
+        stage, and finish(), called with the result. Without a profiler, each stage costs one comparison with None.
+
+    :Input:
+        profiler (object or None) : The profiler, such as profiling.StageProfiler, None to stop timing
+
+    :Output:
+        object or None - The previous profiler
+
+    :Time complexity:
+        O(1)
+
+    :Space complexity:
+        O(1)
+
+    """
+    global _profiler
+    previous = _profiler
+    _profiler = profiler
+    return previous
+
+def intercept_many(roads, stations, queries, wait_cost=None, dense=None):
+    """
+    :Function description:
+        Answers many interception queries on one city, which is constructed once. In dense mode a DenseIndex of
+        the city answers each query by a table lookup for each station; in sparse mode the queries are grouped
+        by start, and each search is resumed by the other queries of its start.
+
+    :Input:
+        roads     (List[Tuple[int, int, int, int]]) : Roads of the city
+        stations  (List[Tuple[int, int]])           : Train stations of the city
+        queries   (List[Tuple[int, int]])           : Start of the driver and friend_start of each query
+        wait_cost (int or None)                     : Cost per minute for the driver to wait at a location
+        dense     (bool or None)                    : True for dense mode, False for sparse mode, None to choose dense mode when
+                                                      NumPy is available, the table has at most DENSE_ROW_LIMIT rows and there
+                                                      are enough distinct starts to pay for the table
+
+    :Output:
+        List[Tuple[int, int, List[int]] or None] - As intercept(), for each query in order
+
+    :Time complexity:
+        O(N^3 + QS) in dense mode, where N is the number of locations in the multiverse that can reach a station,
+        Q is the number of queries and S is the number of stations, with the routes on top.
+        O(U R log L) in sparse mode, where U is the number of distinct starts, R is the number of roads and
+        L is the number of locations.
+
+    :Space complexity:
+        O(N^2) in dense mode, and O(R + L) in sparse mode.
+
+    """
+    # Without a train there is no interception, nor a friend_start for the city
+    if len(stations) == 0:
+        return [None] * len(queries)
+
+    station_reachable = station_reach(roads, stations)
+    city = City(roads, stations, stations[0][0], wait_cost, station_reachable=station_reachable)
+    if dense is None:
+        rows = DenseIndex.table_size(city)
+        starts = len({start for start, friend_start in queries})
+        dense = numpy is not None and rows <= DENSE_ROW_LIMIT and starts * DENSE_STARTS_PER_ROWS >= rows * rows
+
+    if dense:
+        index = DenseIndex.build(city)
+        return [intercept(roads, stations, start, friend_start, wait_cost, hub_index=index) for start, friend_start in queries]
+
+    # A start that never reaches a station has no interception
+    results = [None] * len(queries)
+    search = None
+    for i in sorted(range(len(queries)), key=lambda i: queries[i][0]):
+        start, friend_start = queries[i]
+        if start not in station_reachable:
+            continue
+        if search is None or search.start != city.node_index(0, start):
+            search = DijkstraSearch(city, start)
+        results[i] = intercept(roads, stations, start, friend_start, wait_cost, search=search)
+    return results
+
+def min_cost_assignment(costs):
+    """
+    :Function description:
+        Assignment of rows to columns of a cost matrix with the least total cost, where each row and each column
+        is assigned at most once and every row is assigned when there are no more rows than columns.
+
+    :Approach description:
+        The Hungarian algorithm with potentials: rows are added one at a time, and each is assigned by the
+        shortest augmenting path in the reduced costs, cost - u[row] - v[column], updating the potentials by
+        the least reduced cost of the columns not yet reached, so that reduced costs stay non-negative.
+        A matrix of more rows than columns is solved transposed.
+
+    :Input:
+        costs (List[List[int]]) : Cost of each row for each column, of any comparable numbers
+
+    :Output:
+        List[Tuple[int, int]] - Assigned (row, column) pairs, in order of row
+
+    :Time complexity:
+        O(N^2 M), where N is the smaller and M the larger dimension of the matrix.
+
+    :Space complexity:
+        O(M) besides the matrix, or O(NM) for a transposed matrix.
+
+    """
+    if not costs or not costs[0]:
+        return []
+    transposed = len(costs) > len(costs[0])
+    if transposed:
+        costs = [list(column) for column in zip(*costs)]
+    rows, columns = len(costs), len(costs[0])
+
+    # Row and column potentials, the row assigned to each column and the previous column of each augmenting path,
+    # with column 0 standing for the row being added
+    u = [0] * (rows + 1)
+    v = [0] * (columns + 1)
+    assigned = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        assigned[0] = row
+        column = 0
+        least = [float('inf')] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[column] = True
+            current_row = assigned[column]
+            row_costs = costs[current_row - 1]
+            delta = float('inf')
+            next_column = 0
+            for j in range(1, columns + 1):
+                if not used[j]:
+                    reduced = row_costs[j - 1] - u[current_row] - v[j]
+                    if reduced < least[j]:
+                        least[j] = reduced
+                        way[j] = column
+                    if least[j] < delta:
+                        delta = least[j]
+                        next_column = j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[assigned[j]] += delta
+                    v[j] -= delta
+                else:
+                    least[j] -= delta
+            column = next_column
+            if assigned[column] == 0:
+                break
+
+        # Augment along the path back to the added row
+        while column != 0:
+            previous = way[column]
+            assigned[column] = assigned[previous]
+            column = previous
+
+    pairs = [(assigned[j] - 1, j - 1) for j in range(1, columns + 1) if assigned[j] != 0]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    pairs.sort()
+    return pairs
+
+def assign_fleet(roads, stations, drivers, friends, wait_cost=None, direction=None):
+    """
+    :Function description:
+        Assigns drivers to friends on the train so that the most friends are intercepted, then with the least total
+        cost, then with the earliest total time. The city is constructed once for all pairs, and the cost of every
+        pair comes from one search for each driver or for each friend, whichever are fewer.
+
+    :Approach description:
+        1.  Construct the city once, pruned to the locations that can reach a station.
+        2.  Forward: a search from each distinct driver start, until the interception locations of every friend are
+            settled, gives the best interception of every friend from that driver.
+            Backward: a search backward from the interception locations of each distinct friend, until every driver
+            start is settled, gives the best interception of that friend from every driver.
+        3.  Combine each (cost, time) into one key, cost * scale + time, with scale larger than any total time, and
+            give pairs without an interception a penalty larger than any total key.
+        4.  Solve the assignment with min_cost_assignment(), and drop the assigned pairs of the penalty.
+
+    :Input:
+        roads     (List[Tuple[int, int, int, int]]) : Roads of the city
+        stations  (List[Tuple[int, int]])           : Train stations of the city
+        drivers   (List[int])                       : Starting location number of each driver
+        friends   (List[int])                       : Starting station of each friend
+        wait_cost (int or None)                     : Cost per minute for the drivers to wait at a location
+        direction (str or None)                     : "forward" or "backward" searches, None for the fewer searches
+
+    :Output:
+        dict - The assigned pairs, as driver and friend positions in drivers and friends with the cost, time and route,
+               the unassigned drivers and friends, the totals, the direction and number of searches, and the seconds
+               of each stage
+
+    :Time complexity:
+        O(K R log L + DF P + N^2 M), where K is the number of searches, the fewer of the distinct drivers and friends,
+        R is the number of roads, L is the number of locations, D and F are the numbers of drivers and friends,
+        P is the length of a route, N = min(D, F) and M = max(D, F).
+
+    :Space complexity:
+        O(R + L + DF P), for the city and the routes of every pair.
+
+    """
+    started = began = clock.perf_counter()
+    seconds = {}
+    station_numbers = {station_no for station_no, travel_time in stations}
+    for friend_start in friends:
+        if friend_start not in station_numbers:
+            raise ValueError(f"friend_start {friend_start!r} is not a station.")
+    station_reachable = station_reach(roads, stations)
+    city = City(roads, stations, stations[0][0], wait_cost, station_reachable=station_reachable)
+    seconds["construction"] = clock.perf_counter() - began
+
+    # Interception locations of each distinct friend, and the start of each distinct driver that reaches a station
+    friend_targets = {}
+    for friend_start in friends:
+        if friend_start not in friend_targets:
+            acum_train_duration = train_schedule(stations, friend_start)
+            friend_targets[friend_start] = [city.node_index(acum_train_duration[station] % city.total_multiverse, stations[station][0])
+                                            for station in range(len(stations))]
+    driver_sources = {start: city.node_index(0, start) for start in drivers if start in station_reachable}
+
+    if direction is None:
+        direction = "forward" if len(driver_sources) <= len(friend_targets) else "backward"
+    if direction not in ("forward", "backward"):
+        raise ValueError(f"Unknown direction {direction!r}, expected 'forward' or 'backward'.")
+
+    # Best interception of each pair of distinct driver and friend
+    began = clock.perf_counter()
+    route_seconds = 0.0
+    best = {}
+    searches = 0
+    if direction == "forward":
+        all_targets = {target for targets in friend_targets.values() for target in targets}
+        for start, source in driver_sources.items():
+            search = DijkstraSearch(city, start)
+            searches += 1
+            remaining = set(all_targets)
+            while remaining:
+                location_index = search.settle_next()
+                if location_index is None:
+                    break
+                remaining.discard(location_index)
+            state = city.state
+            routes_began = clock.perf_counter()
+            for friend_start, targets in friend_targets.items():
+                reached = [(state.cost[target], state.time[target], target) for target in targets if state.visited[target]]
+                if reached:
+                    cost, time, target = min(reached)
+                    best[(start, friend_start)] = (cost, time, city.route_to(target))
+            route_seconds += clock.perf_counter() - routes_began
+    else:
+        for friend_start, targets in friend_targets.items():
+            distance, via = city.backward_search(targets, driver_sources.values())
+            searches += 1
+            routes_began = clock.perf_counter()
+            for start, source in driver_sources.items():
+                if source in distance:
+                    cost, time = distance[source]
+                    best[(start, friend_start)] = (cost, time, city.backward_route(source, distance, via))
+            route_seconds += clock.perf_counter() - routes_began
+    seconds["searches"] = clock.perf_counter() - began - route_seconds
+    seconds["routes"] = route_seconds
+
+    # Keys of the cost matrix, with a penalty above any total key for the pairs without an interception
+    began = clock.perf_counter()
+    scale = 1 + sum(time for cost, time, route in best.values())
+    penalty = 1 + sum(cost * scale + time for cost, time, route in best.values())
+    costs = []
+    for start in drivers:
+        row = []
+        for friend_start in friends:
+            found = best.get((start, friend_start))
+            row.append(found[0] * scale + found[1] if found is not None else penalty)
+        costs.append(row)
+    seconds["matrix"] = clock.perf_counter() - began
+
+    began = clock.perf_counter()
+    assignment = []
+    for driver, friend in min_cost_assignment(costs):
+        found = best.get((drivers[driver], friends[friend]))
+        if found is not None:
+            assignment.append({"driver": driver, "friend": friend, "cost": found[0], "time": found[1], "route": found[2]})
+    seconds["assignment"] = clock.perf_counter() - began
+    seconds["total"] = clock.perf_counter() - started
+
+    return {
+        "assignment": assignment,
+        "unassigned_drivers": sorted(set(range(len(drivers))) - {pair["driver"] for pair in assignment}),
+        "unassigned_friends": sorted(set(range(len(friends))) - {pair["friend"] for pair in assignment}),
+        "total_cost": sum(pair["cost"] for pair in assignment),
+        "total_time": sum(pair["time"] for pair in assignment),
+        "direction": direction,
+        "searches": searches,
+        "seconds": seconds,
+    }
+
+async def intercept_async(roads, stations, start, friend_start, wait_cost=None, preprocess=False, prune=True, landmarks=None,
+                          yield_every=256, executor=None, coalesce=True, road_profiles=None):
+    """
+    :Function description:
+        Asynchronous intercept() for an asyncio event loop, which does not block the loop for the whole search.
+
+    :Approach description:
+        1.  Identical queries in flight at the same time share one computation, when coalesce is True.
+        2.  With an executor, intercept() runs in the executor and the loop only awaits its result.
+        3.  Otherwise the dijkstra search runs in the loop, giving control back to the loop every
+            yield_every heap pops, until it has settled as much as intercept() would.
+            intercept() then finds the interception from the settled search.
+
+    :Input:
+        roads, stations, start, friend_start, wait_cost, preprocess, prune, landmarks, road_profiles : As intercept().
+        yield_every (int)                         : Number of heap pops between yields to the event loop.
+        executor    (concurrent.futures.Executor or None) : Executor to run the query in, None to run it in the event loop.
+        coalesce    (bool)                        : Share one computation between identical queries in flight.
+
+    :Output:
+        As intercept().
+
+    :Time complexity:
+        As intercept(), with O(R log L / yield_every) yields to the event loop.
+
+    :Space complexity:
+        As intercept().
+
+    """
+    if not coalesce:
+        return await _intercept_async(roads, stations, start, friend_start, wait_cost, preprocess, prune, landmarks, yield_every, executor,
+                                      road_profiles)
+
+    # Identical queries in flight, of the same roads, stations and options
+    landmark_key = landmarks if not isinstance(landmarks, LandmarkTable) else id(landmarks)
+    key = (tuple(roads), tuple(stations), start, friend_start, wait_cost, preprocess, prune, landmark_key, id(road_profiles))
+    task = _pending_intercepts.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_intercept_async(roads, stations, start, friend_start, wait_cost, preprocess, prune, landmarks,
+                                                      yield_every, executor, road_profiles))
+        _pending_intercepts[key] = task
+        task.add_done_callback(lambda _: _pending_intercepts.pop(key, None))
+
+    # A cancelled caller does not cancel the computation of the others
+    return await asyncio.shield(task)
+
+async def _intercept_async(roads, stations, start, friend_start, wait_cost, preprocess, prune, landmarks, yield_every, executor,
+                           road_profiles):
+    """
+    :Function description:
+        One computation of intercept_async(), in the executor or in the event loop.
+
+    :Input:
+        As intercept_async().
+
+    :Output:
+        As intercept().
+
+    :Time complexity:
+        As intercept().
+
+    :Space complexity:
+        As intercept().
+
+    """
+    if executor is not None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(intercept, roads, stations, start, friend_start, wait_cost,
+                                                                      preprocess, prune, landmarks=landmarks,
+                                                                      road_profiles=road_profiles))
+
+    city = _build_city(roads, stations, start, friend_start, wait_cost, preprocess, prune, road_profiles)
+    if city is None:
+        return None
+    await asyncio.sleep(0)
+    search = _build_search(city, start, landmarks, None)
+
+    # Settle until the best interception is known, as intercept() would
+    pops = 0
+    while not search.intercept_known():
+        if search.settle_next() is None:
+            break
+        pops += 1
+        if pops % yield_every == 0:
+            await asyncio.sleep(0)
+
+    return intercept(roads, stations, start, friend_start, wait_cost, search=search)
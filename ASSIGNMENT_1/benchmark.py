@@ -0,0 +1,446 @@
+"""
+:Module description:
+This module is a benchmark for the interception search of assignment1, with a seeded generator of
+synthetic cities of any size and a runner that times each stage of an interception separately.
+
+:Functions:
+grid_city       : A grid of streets, with roads both ways between neighbouring locations.
+geometric_city  : Random locations on a plane, with roads between nearby locations.
+suburban_city   : A grid of fast arterial roads, with slow local streets and dead ends hanging off it.
+generate_city   : Generates a city of a given shape.
+run_benchmark   : Times City construction, dijkstra search and route reconstruction of a city.
+compare_layouts : Runs the benchmark of a city in every order and layout of its multiverse.
+main            : Runs a suite of benchmarks and writes the results as JSON.
+
+"""
+
+__author__ = "Er Jun Yet"
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from assignment1 import City, DijkstraSearch, SearchStats
+
+
+# Benchmark suites as (shape, locations, stations, loop duration)
+SUITES = {
+    "small": [
+        ("grid", 400, 5, 20),
+        ("geometric", 400, 5, 20),
+        ("suburban", 400, 5, 20),
+    ],
+    "medium": [
+        ("grid", 2500, 10, 50),
+        ("geometric", 2500, 10, 50),
+        ("suburban", 2500, 10, 50),
+    ],
+    "large": [
+        ("grid", 10000, 20, 100),
+        ("geometric", 10000, 20, 100),
+        ("suburban", 10000, 20, 100),
+        ("grid", 40000, 20, 100),
+    ],
+}
+
+# Orders of the locations in reality and layouts of the multiverse compared by compare_layouts()
+LAYOUTS = [
+    (None, "layer"),
+    (None, "location"),
+    ("bfs", "layer"),
+    ("bfs", "location"),
+    ("rcm", "layer"),
+    ("rcm", "location"),
+]
+
+
+def _stations(rng, locations, station_count, loop_duration):
+    """
+    :Function description:
+        Chooses train stations among the locations, with travel times adding up to the loop duration.
+
+    :Input:
+        rng             (random.Random) : Seeded random generator
+        locations       (int)           : Total number of locations
+        station_count   (int)           : Number of train stations
+        loop_duration   (int)           : Total time for a train to loop through all stations
+
+    :Output:
+        List[Tuple[int, int]] - Train stations as (station_no, travel_time)
+
+    :Time complexity:
+        O(S log S), where S is the number of stations.
+
+    :Space complexity:
+        O(S), where S is the number of stations.
+
+    """
+    station_count = max(1, min(station_count, locations, loop_duration))
+    station_nos = rng.sample(range(locations), station_count)
+    cuts = sorted(rng.sample(range(1, loop_duration), station_count - 1))
+    travel_times = [end - begin for begin, end in zip([0] + cuts, cuts + [loop_duration])]
+    return list(zip(station_nos, travel_times))
+
+
+def _two_way(roads, start, end, cost, time):
+    """
+    :Function description:
+        Adds a road both ways between two locations.
+
+    :Input:
+        roads (List[Tuple[int, int, int, int]]) : Roads to add to
+        start (int) : One location
+        end   (int) : The other location
+        cost  (int) : Travel cost of the road
+        time  (int) : Travel time of the road
+
+    :Time complexity:
+        O(1)
+
+    :Space complexity:
+        O(1)
+
+    """
+    roads.append((start, end, cost, time))
+    roads.append((end, start, cost, time))
+
+
+def grid_city(locations, station_count, loop_duration, seed=0):
+    """
+    :Function description:
+        A grid of streets, with roads both ways between neighbouring locations.
+
+    :Input:
+        locations       (int) : Approximate number of locations, rounded to a square grid
+        station_count   (int) : Number of train stations
+        loop_duration   (int) : Total time for a train to loop through all stations
+        seed            (int) : Seed of the random costs, times and stations
+
+    :Output:
+        Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, int]]] - The roads and train stations
+
+    :Time complexity:
+        O(L), where L is the number of locations.
+
+    :Space complexity:
+        O(L), where L is the number of locations.
+
+    """
+    rng = random.Random(seed)
+    side = max(2, int(locations ** 0.5))
+    roads = []
+    for row in range(side):
+        for column in range(side):
+            location = row * side + column
+            if column + 1 < side:
+                _two_way(roads, location, location + 1, rng.randint(1, 20), rng.randint(1, 5))
+            if row + 1 < side:
+                _two_way(roads, location, location + side, rng.randint(1, 20), rng.randint(1, 5))
+    return roads, _stations(rng, side * side, station_count, loop_duration)
+
+
+def geometric_city(locations, station_count, loop_duration, seed=0, neighbours=3):
+    """
+    :Function description:
+        Random locations on a unit square, with roads both ways between each location and its nearest
+        locations. Cost and time grow with the distance of the road.
+
+    :Input:
+        locations       (int) : Number of locations
+        station_count   (int) : Number of train stations
+        loop_duration   (int) : Total time for a train to loop through all stations
+        seed            (int) : Seed of the random positions and stations
+        neighbours      (int) : Number of nearest locations connected to each location
+
+    :Output:
+        Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, int]]] - The roads and train stations
+
+    :Time complexity:
+        O(L K log K), where L is the number of locations and K is the number of locations in the nearby cells.
+
+    :Time complexity analysis:
+        Locations are bucketed into cells holding a few locations each, so that nearest locations are
+        only searched in the surrounding cells.
+
+    :Space complexity:
+        O(L), where L is the number of locations.
+
+    """
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for _ in range(locations)]
+
+    # Bucket locations into cells of about two locations each
+    cells_per_side = max(1, int((locations / 2) ** 0.5))
+    cells = {}
+    for location in range(locations):
+        x, y = points[location]
+        cell = (min(int(x * cells_per_side), cells_per_side - 1), min(int(y * cells_per_side), cells_per_side - 1))
+        cells.setdefault(cell, []).append(location)
+
+    connected = set()
+    roads = []
+    for location in range(locations):
+        x, y = points[location]
+        cell_x = min(int(x * cells_per_side), cells_per_side - 1)
+        cell_y = min(int(y * cells_per_side), cells_per_side - 1)
+
+        # Widen the surrounding cells until enough locations are found
+        reach = 1
+        nearby = []
+        while len(nearby) <= neighbours and reach <= cells_per_side:
+            nearby = []
+            for dx in range(-reach, reach + 1):
+                for dy in range(-reach, reach + 1):
+                    nearby.extend(cells.get((cell_x + dx, cell_y + dy), ()))
+            reach += 1
+
+        nearby.sort(key=lambda other: (points[other][0] - x) ** 2 + (points[other][1] - y) ** 2)
+        for other in nearby[1:neighbours + 1]:
+            pair = (min(location, other), max(location, other))
+            if pair in connected:
+                continue
+            connected.add(pair)
+            distance = ((points[other][0] - x) ** 2 + (points[other][1] - y) ** 2) ** 0.5 * cells_per_side
+            _two_way(roads, location, other, 1 + int(distance * 10), 1 + int(distance * 2))
+    return roads, _stations(rng, locations, station_count, loop_duration)
+
+
+def suburban_city(locations, station_count, loop_duration, seed=0):
+    """
+    :Function description:
+        A city shaped like real road networks: a grid of arterial roads that are cheap and fast, with
+        neighbourhoods of slow local streets hanging off each arterial junction. Local streets form
+        trees with long chains and dead ends, and some of them are one-way.
+
+    :Input:
+        locations       (int) : Approximate number of locations
+        station_count   (int) : Number of train stations, placed on arterial junctions
+        loop_duration   (int) : Total time for a train to loop through all stations
+        seed            (int) : Seed of the random streets and stations
+
+    :Output:
+        Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, int]]] - The roads and train stations
+
+    :Time complexity:
+        O(L), where L is the number of locations.
+
+    :Space complexity:
+        O(L), where L is the number of locations.
+
+    """
+    rng = random.Random(seed)
+    side = max(2, int((locations / 10) ** 0.5))
+    junctions = side * side
+    roads = []
+
+    # Arterial grid
+    for row in range(side):
+        for column in range(side):
+            junction = row * side + column
+            if column + 1 < side:
+                _two_way(roads, junction, junction + 1, rng.randint(1, 4), rng.randint(1, 2))
+            if row + 1 < side:
+                _two_way(roads, junction, junction + side, rng.randint(1, 4), rng.randint(1, 2))
+
+    # Local streets growing from the junctions
+    location = junctions
+    while location < locations:
+        parent = rng.randrange(location) if rng.random() < 0.7 and location > junctions else rng.randrange(junctions)
+        cost = rng.randint(5, 20)
+        travel_time = rng.randint(2, 6)
+        if rng.random() < 0.15:
+            roads.append((parent, location, cost, travel_time))
+        else:
+            _two_way(roads, parent, location, cost, travel_time)
+        location += 1
+
+    station_nos = rng.sample(range(junctions), max(1, min(station_count, junctions, loop_duration)))
+    stations = _stations(rng, len(station_nos), len(station_nos), loop_duration)
+    return roads, [(station_nos[index], travel_time) for index, travel_time in stations]
+
+
+GENERATORS = {
+    "grid": grid_city,
+    "geometric": geometric_city,
+    "suburban": suburban_city,
+}
+
+
+def generate_city(shape, locations, station_count, loop_duration, seed=0):
+    """
+    :Function description:
+        Generates a city of a given shape, with a driver's start and a friend's start.
+
+    :Input:
+        shape           (str) : One of "grid", "geometric" or "suburban"
+        locations       (int) : Approximate number of locations
+        station_count   (int) : Number of train stations
+        loop_duration   (int) : Total time for a train to loop through all stations
+        seed            (int) : Seed of the generator
+
+    :Output:
+        dict - The roads, stations, start and friend_start of the city
+
+    :Time complexity:
+        As the generator of the shape.
+
+    :Space complexity:
+        O(L + R), where L is the number of locations and R is the number of roads.
+
+    """
+    roads, stations = GENERATORS[shape](locations, station_count, loop_duration, seed)
+    rng = random.Random(seed + 1)
+    total = 1 + max(max(start, end) for start, end, cost, time in roads)
+    return {
+        "roads": roads,
+        "stations": stations,
+        "start": rng.randrange(total),
+        "friend_start": rng.choice(stations)[0],
+    }
+
+
+def run_benchmark(city_input, repeat=1, order=None, layout="layer"):
+    """
+    :Function description:
+        Times the stages of an interception of a city separately: City construction, the dijkstra search
+        of every reachable location, and the route reconstruction to every train station.
+
+    :Input:
+        city_input (dict)        : The roads, stations, start and friend_start of the city, as from generate_city()
+        repeat     (int)         : Number of runs of each stage, of which the fastest is reported
+        order      (str or None) : Locality order of the locations in reality, as City()
+        layout     (str)         : Layout of the multiverse, as City()
+
+    :Output:
+        dict - Sizes of the city and the seconds taken by each stage
+
+    :Time complexity:
+        O(K R log L), where K is the number of runs, R is the number of roads and L is the number of locations.
+
+    :Space complexity:
+        O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+    """
+    roads = city_input["roads"]
+    stations = city_input["stations"]
+    start = city_input["start"]
+    friend_start = city_input["friend_start"]
+
+    timings = {"construction": [], "search": [], "routes": []}
+    stats = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        city = City(roads, stations, friend_start, order=order, layout=layout)
+        timings["construction"].append(time.perf_counter() - began)
+
+        stats = SearchStats()
+        began = time.perf_counter()
+        DijkstraSearch(city, start, stats).settle_all()
+        timings["search"].append(time.perf_counter() - began)
+
+        began = time.perf_counter()
+        for station in range(len(stations)):
+            multiverse = city.acum_train_duration[station] % city.total_multiverse
+            location_index = city.node_index(multiverse, stations[station][0])
+            if city.state.visited[location_index]:
+                city.route_to(location_index)
+        timings["routes"].append(time.perf_counter() - began)
+
+    return {
+        "locations": city.total_reality_location,
+        "roads": len(roads),
+        "stations": len(stations),
+        "order": order,
+        "layout": layout,
+        "multiverse_layers": city.total_multiverse,
+        "multiverse_locations": len(city.multiverse_locations),
+        "multiverse_roads": len(roads) * city.total_multiverse,
+        "seconds": {stage: min(runs) for stage, runs in timings.items()},
+        "search_stats": stats.to_dict() if stats is not None else None,
+    }
+
+
+def compare_layouts(city_input, repeat=1, layouts=LAYOUTS):
+    """
+    :Function description:
+        Runs the benchmark of one city in each order of its locations in reality and layout of its multiverse.
+        The search and routes are the same in every layout, so only the memory access pattern differs.
+
+    :Input:
+        city_input (dict)                          : The roads, stations, start and friend_start of the city, as from generate_city()
+        repeat     (int)                           : Number of runs of each stage, of which the fastest is reported
+        layouts    (List[Tuple[str or None, str]]) : Pairs of order and layout to compare
+
+    :Output:
+        List[dict] - The result of run_benchmark() for each pair of order and layout
+
+    :Time complexity:
+        As run_benchmark(), for each pair of order and layout.
+
+    :Space complexity:
+        As run_benchmark().
+
+    """
+    return [run_benchmark(city_input, repeat, order, layout) for order, layout in layouts]
+
+
+def main(argv=None):
+    """
+    :Function description:
+        Runs a suite of benchmarks and writes the results as JSON, to a file or to standard output.
+
+    :Input:
+        argv (List[str] or None) : Command line arguments, None for sys.argv
+
+    :Time complexity:
+        As run_benchmark() for each city of the suite.
+
+    :Space complexity:
+        As run_benchmark() for the largest city of the suite.
+
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the interception search on synthetic cities.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="small", help="sizes of the cities to benchmark")
+    parser.add_argument("--shape", choices=sorted(GENERATORS), action="append", help="only benchmark these shapes")
+    parser.add_argument("--locations", type=int, help="benchmark one city of this many locations instead of a suite")
+    parser.add_argument("--stations", type=int, default=10, help="number of stations, with --locations")
+    parser.add_argument("--loop", type=int, default=50, help="train loop duration, with --locations")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated cities")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each stage, the fastest is reported")
+    parser.add_argument("--layouts", action="store_true", help="compare every order and layout of the multiverse of each city")
+    parser.add_argument("--output", help="JSON file for the results, standard output if omitted")
+    args = parser.parse_args(argv)
+
+    if args.locations is not None:
+        cases = [(shape, args.locations, args.stations, args.loop) for shape in (args.shape or sorted(GENERATORS))]
+    else:
+        cases = [case for case in SUITES[args.suite] if args.shape is None or case[0] in args.shape]
+
+    results = []
+    for shape, locations, station_count, loop_duration in cases:
+        city_input = generate_city(shape, locations, station_count, loop_duration, args.seed)
+        if args.layouts:
+            case_results = compare_layouts(city_input, args.repeat)
+        else:
+            case_results = [run_benchmark(city_input, args.repeat)]
+        for result in case_results:
+            result["shape"] = shape
+            result["seed"] = args.seed
+            results.append(result)
+            layout = f" order={result['order'] or 'none':<4} layout={result['layout']:<8}" if args.layouts else ""
+            print(f"{shape:<10} L={result['locations']:<7} R={result['roads']:<7} M={result['multiverse_layers']:<4}{layout} "
+                  f"construction={result['seconds']['construction']:.3f}s search={result['seconds']['search']:.3f}s "
+                  f"routes={result['seconds']['routes']:.4f}s", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
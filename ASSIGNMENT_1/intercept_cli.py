@@ -0,0 +1,343 @@
+"""
+:Module description:
+This module is a command line entry point for batches of interception queries. The road network is
+loaded and its city constructed once, then queries are read from standard input as JSON lines and
+their interceptions written to standard output as JSON lines, in the same order.
+
+A network file is a JSON object of roads, stations and optionally wait_cost. A query is a JSON object
+of start, friend_start and optionally id, which is copied to its result:
+
+    {"id": 7, "start": 6, "friend_start": 0}
+    {"id": 7, "cost": 7, "time": 9, "route": [6, 7, 8, 3]}
+
+:Classes:
+NetworkQueries : Answers interception queries on one city, reusing the search of the same start.
+
+:Functions:
+load_network    : Reads a network file.
+read_batches    : Reads lines of a file in batches of bounded size.
+main            : Answers queries from standard input with one process or a pool of workers.
+
+"""
+
+__author__ = "Er Jun Yet"
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import sys
+
+from assignment1 import City, DijkstraSearch, compact_locations, intercept, station_reach
+
+
+class NetworkQueries:
+    """
+    :Class description:
+        Interception queries on one city, constructed once for the network. The multiverse does not depend
+        on the friend, so each query only sets the friend's start, and the search of a start is resumed by
+        the next query from the same start instead of searching again. Location numbers are compacted to dense
+        indices, so that a network of sparse location numbers is sized by its number of locations.
+
+    :Attributes:
+        roads            (List[Tuple[int, int, int, int]]) : Roads of the network, with dense indices
+        stations         (List[Tuple[int, int]])           : Train stations of the network, with dense indices
+        location_ids     (List[int])                       : Location number of each dense index
+        location_index   (dict)                            : Dense index of each location number
+        city             (City)                            : The city of the network
+        station_reachable (Set[int])                       : Dense indices of the locations that can reach any station
+        search           (DijkstraSearch or None)          : Search of the latest start
+
+    """
+    def __init__(self, roads, stations, wait_cost=None):
+        """
+        :Function description:
+            Constructs the city of a network.
+
+        :Input:
+            roads     (List[Tuple[int, int, int, int]]) : Roads of the network
+            stations  (List[Tuple[int, int]])           : Train stations of the network
+            wait_cost (int or None)                     : Cost per minute for the driver to wait at a location
+
+        :Time complexity:
+            O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+        :Space complexity:
+            O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+        """
+        self.roads, self.stations, self.location_ids, self.location_index = compact_locations(roads, stations)
+        self.station_reachable = station_reach(self.roads, self.stations)
+        self.city = City(self.roads, self.stations, self.stations[0][0], wait_cost, station_reachable=self.station_reachable)
+        self.station_numbers = {station[0] for station in stations}
+        self.search = None
+
+    def answer(self, query):
+        """
+        :Function description:
+            Answers one query.
+
+        :Input:
+            query (dict) : The query, with start, friend_start and optionally id
+
+        :Output:
+            dict - The cost, time and route of the interception, a null route when there is none,
+                   or the error of an invalid query
+
+        :Time complexity:
+            As intercept(), without the construction of the city, and only for the locations
+            not settled by an earlier query from the same start.
+
+        :Space complexity:
+            O(L), where L is the number of locations, for the route.
+
+        """
+        result = {"id": query["id"]} if isinstance(query, dict) and "id" in query else {}
+        try:
+            start = query["start"]
+            friend_start = query["friend_start"]
+        except (KeyError, TypeError):
+            result["error"] = "a query needs start and friend_start"
+            return result
+        # JSON true and false are ints to isinstance(), but never location numbers
+        if type(start) is not int:
+            result["error"] = f"unknown start {start!r}"
+            return result
+        if type(friend_start) is not int or friend_start not in self.station_numbers:
+            result["error"] = f"friend_start {friend_start!r} is not a station"
+            return result
+
+        # A start without roads never reaches a station
+        start = self.location_index.get(start, -1)
+        friend_start = self.location_index[friend_start]
+        route = None
+        if start in self.station_reachable:
+            if self.search is None or self.search.start != self.city.node_index(0, start):
+                self.search = DijkstraSearch(self.city, start)
+            route = intercept(self.roads, self.stations, start, friend_start, self.city.wait_cost, search=self.search)
+        if route is None:
+            result["route"] = None
+        else:
+            result["cost"], result["time"] = route[0], route[1]
+            result["route"] = [self.location_ids[location] for location in route[2]]
+        return result
+
+    def answer_lines(self, lines):
+        """
+        :Function description:
+            Answers a batch of query lines, grouped by start so that each search is resumed
+            by the other queries of its start, with the results in the order of the lines.
+
+        :Input:
+            lines (List[str]) : JSON lines of queries
+
+        :Output:
+            List[str] - JSON lines of the results
+
+        :Time complexity:
+            O(Q log Q) to group the Q queries, and as answer() for each query.
+
+        :Space complexity:
+            O(Q), where Q is the number of queries.
+
+        """
+        queries = []
+        for line in lines:
+            try:
+                queries.append(json.loads(line))
+            except ValueError:
+                queries.append(None)
+
+        results = [None] * len(queries)
+        order = sorted(range(len(queries)), key=lambda i: _query_start(queries[i]))
+        for i in order:
+            if queries[i] is None:
+                results[i] = {"error": "invalid JSON"}
+            else:
+                results[i] = self.answer(queries[i])
+        return [json.dumps(result) for result in results]
+
+
+def _query_start(query):
+    """
+    :Function description:
+        Start of a query as a sort key, with invalid queries first.
+
+    :Input:
+        query (object) : A parsed query line
+
+    :Output:
+        Tuple[int, int] - The sort key
+
+    :Time complexity:
+        O(1)
+
+    :Space complexity:
+        O(1)
+
+    """
+    if isinstance(query, dict) and type(query.get("start")) is int:
+        return (1, query["start"])
+    return (0, 0)
+
+
+def load_network(path):
+    """
+    :Function description:
+        Reads a network file of roads, stations and optionally wait_cost.
+
+    :Input:
+        path (str) : Path of the JSON file
+
+    :Output:
+        Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, int]], int or None] - The roads, stations and wait_cost
+
+    :Time complexity:
+        O(R + S), where R is the number of roads and S is the number of stations.
+
+    :Space complexity:
+        O(R + S), where R is the number of roads and S is the number of stations.
+
+    """
+    with open(path) as file:
+        network = json.load(file)
+    roads = [tuple(road) for road in network["roads"]]
+    stations = [tuple(station) for station in network["stations"]]
+    return roads, stations, network.get("wait_cost")
+
+
+def read_batches(file, size):
+    """
+    :Function description:
+        Reads the non-empty lines of a file in batches, so that no more than one batch is held at a time.
+
+    :Input:
+        file (file) : The file to read
+        size (int)  : Number of lines in each batch
+
+    :Output:
+        Iterator[List[str]] - The batches of lines
+
+    :Time complexity:
+        O(1) per line.
+
+    :Space complexity:
+        O(size)
+
+    """
+    lines = (line for line in file if line.strip())
+    while True:
+        batch = list(itertools.islice(lines, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Queries of the network in a worker process, constructed once by _start_worker()
+_worker_queries = None
+
+def _start_worker(roads, stations, wait_cost):
+    """
+    :Function description:
+        Constructs the city of the network in a worker process.
+
+    :Input:
+        As NetworkQueries().
+
+    :Time complexity:
+        As NetworkQueries().
+
+    :Space complexity:
+        As NetworkQueries().
+
+    """
+    global _worker_queries
+    _worker_queries = NetworkQueries(roads, stations, wait_cost)
+
+def _answer_in_worker(lines):
+    """
+    :Function description:
+        Answers a slice of a batch in a worker process.
+
+    :Input:
+        lines (List[str]) : JSON lines of queries
+
+    :Output:
+        List[str] - JSON lines of the results
+
+    :Time complexity:
+        As NetworkQueries.answer_lines().
+
+    :Space complexity:
+        As NetworkQueries.answer_lines().
+
+    """
+    return _worker_queries.answer_lines(lines)
+
+
+def main(argv=None, stdin=None, stdout=None):
+    """
+    :Function description:
+        Answers the queries of standard input on a network, writing each batch of results before the
+        next batch is read. With workers, each batch is split between a pool of processes which each
+        construct the city once.
+
+    :Input:
+        argv   (List[str] or None) : Command line arguments, None for sys.argv
+        stdin  (file or None)      : File of query lines, None for standard input
+        stdout (file or None)      : File for result lines, None for standard output
+
+    :Time complexity:
+        As NetworkQueries() for each process, and as NetworkQueries.answer() for each query.
+
+    :Space complexity:
+        As NetworkQueries() for each process, and O(B) for a batch of B lines.
+
+    """
+    parser = argparse.ArgumentParser(description="Answer interception queries read as JSON lines from standard input.")
+    parser.add_argument("network", help="JSON file with roads, stations and optionally wait_cost")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 to answer in this process")
+    parser.add_argument("--batch", type=int, default=10000, help="query lines read and answered at a time")
+    args = parser.parse_args(argv)
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+
+    roads, stations, wait_cost = load_network(args.network)
+    if args.workers > 0:
+        with multiprocessing.Pool(args.workers, _start_worker, (roads, stations, wait_cost)) as pool:
+            for batch in read_batches(stdin, args.batch):
+                # Contiguous slices keep the queries of each worker in order
+                size = -(-len(batch) // args.workers)
+                slices = [batch[i:i + size] for i in range(0, len(batch), size)]
+                for results in pool.map(_answer_in_worker, slices):
+                    _write_lines(stdout, results)
+    else:
+        queries = NetworkQueries(roads, stations, wait_cost)
+        for batch in read_batches(stdin, args.batch):
+            _write_lines(stdout, queries.answer_lines(batch))
+
+
+def _write_lines(file, lines):
+    """
+    :Function description:
+        Writes lines to a file and flushes it, so that results reach a pipe as soon as they are answered.
+
+    :Input:
+        file  (file)      : The file to write
+        lines (List[str]) : Lines without their line breaks
+
+    :Time complexity:
+        O(N), where N is the total length of the lines.
+
+    :Space complexity:
+        O(1)
+
+    """
+    for line in lines:
+        file.write(line)
+        file.write("\n")
+    file.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,618 @@
+"""
+:Module description:
+This module is a memory profiler for the construction of a City of assignment1, reporting the peak and
+retained memory of the construction and the memory held by each type of object, in total and for each
+multiverse layer. It also times the stages of intercept() for a sample of calls, with sinks that keep
+a histogram in memory or write each sampled call to a JSON lines file.
+
+:Classes:
+StageProfiler   : Samples 1 in N calls of intercept() and sends the time of their stages to sinks.
+StageSpans      : Timing spans of the stages of one sampled call.
+HistogramSink   : Histogram in memory of the time of each stage.
+JsonLinesSink   : JSON lines file of the time of the stages of each sampled call.
+
+:Functions:
+object_size     : Memory of an object and its attribute dictionary.
+city_memory     : Memory held by the Location, Road, list and heap tuple objects and search arrays of a city.
+profile_city    : Builds a city under tracemalloc and reports its memory.
+profile_stages  : Times the stages of intercept() for queries of a city.
+main            : Profiles a city from a JSON file or a generated benchmark city.
+
+"""
+
+__author__ = "Er Jun Yet"
+
+import argparse
+import json
+import linecache
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import assignment1
+from assignment1 import City, DijkstraSearch
+from benchmark import GENERATORS, generate_city
+
+
+class StageProfiler:
+    """
+    :Class description:
+        Profiler of the stages of intercept(), installed by assignment1.set_profiler() or as a context manager.
+        Only 1 in sample_every calls is timed, so that the profiler can stay installed in production, and the
+        other calls pay for one counter.
+
+    :Attributes:
+        sinks        (list) : Sinks with record(stages, total), given the stages of each sampled call.
+        sample_every (int)  : A call in every sample_every calls is timed.
+        calls        (int)  : Number of calls so far.
+        previous     (object or None) : Profiler installed before this one, while this one is installed as a context manager.
+
+    """
+    def __init__(self, sinks, sample_every=1):
+        """
+        :Function description:
+            A StageProfiler constructor.
+
+        :Input:
+            sinks        (list) : Sinks of the sampled calls, such as HistogramSink and JsonLinesSink
+            sample_every (int)  : A call in every sample_every calls is timed
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1.")
+        self.sinks = list(sinks)
+        self.sample_every = sample_every
+        self.calls = 0
+        self.previous = None
+
+    def begin(self):
+        """
+        :Function description:
+            Starts a call of intercept(), timed when it is sampled.
+
+        :Output:
+            StageSpans or None - Spans of the call, None when it is not sampled
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.calls += 1
+        if self.calls % self.sample_every:
+            return None
+        return StageSpans(self)
+
+    def emit(self, stages, total):
+        """
+        :Function description:
+            Sends the stages of a sampled call to every sink.
+
+        :Input:
+            stages (List[Tuple[str, float]]) : Stage and seconds of each stage, in order
+            total  (float)                   : Seconds of the whole call
+
+        :Time complexity:
+            O(KS), where K is the number of sinks and S is the number of stages.
+
+        :Space complexity:
+            O(S), where S is the number of stages.
+
+        """
+        for sink in self.sinks:
+            sink.record(stages, total)
+
+    def __enter__(self):
+        """
+        :Function description:
+            Installs the profiler, until the end of the with block.
+
+        :Output:
+            StageProfiler - This profiler
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.previous = assignment1.set_profiler(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        :Function description:
+            Restores the profiler installed before this one.
+
+        :Input:
+            exc_info (tuple) : Exception of the with block, which is not suppressed
+
+        :Output:
+            bool - False
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        assignment1.set_profiler(self.previous)
+        self.previous = None
+        return False
+
+
+class StageSpans:
+    """
+    :Class description:
+        Timing spans of the stages of one sampled call of intercept(). Each stage lasts from the end of the previous
+        stage, or from the start of the call, to its mark().
+
+    :Attributes:
+        profiler (StageProfiler)          : Profiler of the call.
+        started  (float)                  : Start of the call, from time.perf_counter().
+        last     (float)                  : End of the latest stage.
+        stages   (List[Tuple[str, float]]) : Stage and seconds of each stage so far.
+
+    """
+    __slots__ = ("profiler", "started", "last", "stages")
+
+    def __init__(self, profiler):
+        """
+        :Function description:
+            A StageSpans constructor, which starts timing the call.
+
+        :Input:
+            profiler (StageProfiler) : Profiler of the call
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.profiler = profiler
+        self.started = self.last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        """
+        :Function description:
+            Ends a stage of the call.
+
+        :Input:
+            stage (str) : Name of the stage
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def finish(self):
+        """
+        :Function description:
+            Ends the call and sends its stages to the sinks of the profiler.
+
+        :Time complexity:
+            As StageProfiler.emit().
+
+        :Space complexity:
+            As StageProfiler.emit().
+
+        """
+        self.profiler.emit(self.stages, time.perf_counter() - self.started)
+
+
+class HistogramSink:
+    """
+    :Class description:
+        Histogram in memory of the time of each stage, and of the whole call as the "total" stage, in buckets
+        of powers of two microseconds, so that its size does not grow with the number of calls.
+
+    :Attributes:
+        stages (dict) : Maps each stage to its count, total seconds, largest seconds and count of each bucket.
+        lock   (Lock) : Lock of the histogram, as intercept() may be called from several threads.
+
+    """
+    def __init__(self):
+        """
+        :Function description:
+            A HistogramSink constructor, of an empty histogram.
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def record(self, stages, total):
+        """
+        :Function description:
+            Adds the stages of a sampled call to the histogram.
+
+        :Input:
+            stages (List[Tuple[str, float]]) : Stage and seconds of each stage
+            total  (float)                   : Seconds of the whole call
+
+        :Time complexity:
+            O(S), where S is the number of stages.
+
+        :Space complexity:
+            O(1), or O(S) for the first call of each stage.
+
+        """
+        with self.lock:
+            for stage, seconds in stages + [("total", total)]:
+                histogram = self.stages.get(stage)
+                if histogram is None:
+                    histogram = self.stages[stage] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "buckets": {}}
+                # Bucket b holds the times below 2 ** b microseconds
+                bucket = int(seconds * 1e6).bit_length()
+                histogram["count"] += 1
+                histogram["seconds"] += seconds
+                histogram["max_seconds"] = max(histogram["max_seconds"], seconds)
+                histogram["buckets"][bucket] = histogram["buckets"].get(bucket, 0) + 1
+
+    def summary(self):
+        """
+        :Function description:
+            Count, mean, largest and percentiles of the time of each stage. A percentile is the upper bound of
+            its bucket, so it is within a factor of two of the exact time.
+
+        :Output:
+            dict - Maps each stage to its summary, with the count of each bucket by its upper bound in microseconds
+
+        :Time complexity:
+            O(SB), where S is the number of stages and B is the number of buckets.
+
+        :Space complexity:
+            O(SB), where S is the number of stages and B is the number of buckets.
+
+        """
+        summary = {}
+        with self.lock:
+            for stage, histogram in self.stages.items():
+                buckets = sorted(histogram["buckets"].items())
+                stage_summary = {
+                    "count": histogram["count"],
+                    "mean_seconds": histogram["seconds"] / histogram["count"],
+                    "max_seconds": histogram["max_seconds"],
+                    "buckets_us": {2 ** bucket: count for bucket, count in buckets},
+                }
+                for name, fraction in (("p50_seconds", 0.5), ("p90_seconds", 0.9), ("p99_seconds", 0.99)):
+                    seen = 0
+                    for bucket, count in buckets:
+                        seen += count
+                        if seen >= fraction * histogram["count"]:
+                            stage_summary[name] = 2 ** bucket / 1e6
+                            break
+                summary[stage] = stage_summary
+        return summary
+
+
+class JsonLinesSink:
+    """
+    :Class description:
+        JSON lines file of the sampled calls, one line of the wall clock time, the seconds of the whole call and
+        the seconds of each stage for each call, appended as the call finishes.
+
+    :Attributes:
+        file (file) : The file, opened for appending.
+        lock (Lock) : Lock of the file, as intercept() may be called from several threads.
+
+    """
+    def __init__(self, path):
+        """
+        :Function description:
+            A JsonLinesSink constructor, which opens the file for appending.
+
+        :Input:
+            path (str) : Path of the file
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.file = open(path, "a")
+        self.lock = threading.Lock()
+
+    def record(self, stages, total):
+        """
+        :Function description:
+            Writes the stages of a sampled call as one line.
+
+        :Input:
+            stages (List[Tuple[str, float]]) : Stage and seconds of each stage
+            total  (float)                   : Seconds of the whole call
+
+        :Time complexity:
+            O(S), where S is the number of stages.
+
+        :Space complexity:
+            O(S), where S is the number of stages.
+
+        """
+        line = json.dumps({"time": time.time(), "total": total, "stages": dict(stages)})
+        with self.lock:
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        """
+        :Function description:
+            Closes the file.
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.file.close()
+
+
+def object_size(obj):
+    """
+    :Function description:
+        Memory of an object, including its attribute dictionary when it has one.
+
+    :Input:
+        obj (object) : Any object
+
+    :Output:
+        int - Size in bytes
+
+    :Time complexity:
+        O(1)
+
+    :Space complexity:
+        O(1)
+
+    """
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+    return size
+
+
+def city_memory(city, heap=None):
+    """
+    :Function description:
+        Memory held by the objects of a city, grouped by type: Location objects, Road objects, lists
+        (the multiverse and the outgoing roads of each location), the tuples in a search heap and the
+        arrays of the search state, which belong to no single layer.
+
+    :Input:
+        city (City)              : The city to be measured
+        heap (MinHeap or None)   : A search heap of the city, whose ((cost, time), location_no) tuples are measured
+
+    :Output:
+        dict - Bytes by type in total, and bytes by type for each multiverse layer
+
+    :Time complexity:
+        O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+    :Space complexity:
+        O(M), where M is the number of multiverse layers.
+
+    """
+    layers = [{"Location": 0, "Road": 0, "list": 0, "tuple": 0} for _ in range(city.total_multiverse)]
+    for location_index in range(len(city.multiverse_locations)):
+        location = city.multiverse_locations[location_index]
+        if location is None:
+            continue
+        layer = layers[city.node_position(location_index)[0]]
+        layer["Location"] += object_size(location)
+        layer["list"] += sys.getsizeof(location.outgoing_roads)
+        for road in location.outgoing_roads:
+            layer["Road"] += object_size(road)
+
+    if heap is not None:
+        # Only the locations reached are in the heap, each with its own (cost, time) key
+        for item in heap.heap[1:len(heap) + 1]:
+            size = sys.getsizeof(item)
+            if isinstance(item[0], tuple):
+                size += sys.getsizeof(item[0])
+            layers[city.node_position(item[1])[0]]["tuple"] += size
+
+    state = city.state
+    total = {"Location": 0, "Road": 0, "list": sys.getsizeof(city.multiverse_locations), "tuple": 0,
+             "array": sum(sys.getsizeof(array) for array in (state.cost, state.time, state.previous, state.visited,
+                                                             state.waited, state.unreached, state.no_previous))}
+    if heap is not None:
+        total["list"] += sys.getsizeof(heap.heap) + sys.getsizeof(heap.position)
+    for layer in layers:
+        for kind in layer:
+            total[kind] += layer[kind]
+    return {"total": total, "layers": layers}
+
+
+def profile_city(roads, stations, friend_start, start=None, top=10):
+    """
+    :Function description:
+        Builds a city under tracemalloc and reports the peak memory of the construction, the memory
+        retained by the city, the allocating lines of assignment1 that retain the most, and the memory
+        by type of object. When a start is given, the heap of a search from the start is included.
+        When tracemalloc is already tracing, its traces are kept and peak_bytes is None, as the peak
+        belongs to the caller's trace.
+
+    :Input:
+        roads        (List[Tuple[int, int, int, int]]) : Roads of the city
+        stations     (List[Tuple[int, int]])           : Train stations of the city
+        friend_start (int)                             : Starting location number of the friend
+        start        (int or None)                     : Starting location number of the driver, None to not search
+        top          (int)                             : Number of allocating lines to report
+
+    :Output:
+        dict - The memory report
+
+    :Time complexity:
+        O(ML + MR) for the construction under tracemalloc, which slows every allocation.
+
+    :Space complexity:
+        O(ML + MR), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+    """
+    # An active trace belongs to the caller, so it is compared against a snapshot rather than cleared
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    if not was_tracing:
+        tracemalloc.reset_peak()
+    current_before = tracemalloc.get_traced_memory()[0]
+
+    city = City(roads, stations, friend_start)
+    search = DijkstraSearch(city, start) if start is not None else None
+
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    if not was_tracing:
+        tracemalloc.stop()
+
+    # Allocating lines of the city, which tell the type they construct
+    lines = []
+    for difference in snapshot.compare_to(baseline, "lineno")[:top]:
+        frame = difference.traceback[0]
+        lines.append({"file": frame.filename, "line": frame.lineno, "code": linecache.getline(frame.filename, frame.lineno).strip(),
+                      "bytes": difference.size_diff, "count": difference.count_diff})
+
+    return {
+        "locations": city.total_reality_location,
+        "roads": len(roads),
+        "multiverse_layers": city.total_multiverse,
+        "multiverse_locations": len(city.multiverse_locations),
+        "peak_bytes": peak - current_before if not was_tracing else None,
+        "retained_bytes": current - current_before,
+        "top_lines": lines,
+        "by_type": city_memory(city, search.heap if search is not None else None),
+    }
+
+
+def profile_stages(roads, stations, calls, sample_every=1, path=None, seed=0):
+    """
+    :Function description:
+        Times the stages of intercept() for calls from random starts to random friend starts of a city,
+        sampling 1 in sample_every calls, and optionally writes each sampled call to a JSON lines file.
+
+    :Input:
+        roads        (List[Tuple[int, int, int, int]]) : Roads of the city
+        stations     (List[Tuple[int, int]])           : Train stations of the city
+        calls        (int)                             : Number of calls of intercept()
+        sample_every (int)                             : A call in every sample_every calls is timed
+        path         (str or None)                     : JSON lines file of the sampled calls, None for none
+        seed         (int)                             : Seed of the starts and friend starts
+
+    :Output:
+        dict - Summary of the time of each stage, as HistogramSink.summary()
+
+    :Time complexity:
+        As intercept() for each call.
+
+    :Space complexity:
+        As intercept().
+
+    """
+    rng = random.Random(seed)
+    total = 1 + max(max(start, end) for start, end, cost, travel_time in roads)
+    histogram = HistogramSink()
+    sinks = [histogram]
+    if path is not None:
+        sinks.append(JsonLinesSink(path))
+    try:
+        with StageProfiler(sinks, sample_every):
+            for _ in range(calls):
+                assignment1.intercept(roads, stations, rng.randrange(total), rng.choice(stations)[0])
+    finally:
+        for sink in sinks[1:]:
+            sink.close()
+    return histogram.summary()
+
+
+def main(argv=None):
+    """
+    :Function description:
+        Profiles the memory of a city from a JSON file of roads, stations and friend_start, or of a
+        generated benchmark city, and writes the report as JSON.
+
+    :Input:
+        argv (List[str] or None) : Command line arguments, None for sys.argv
+
+    :Time complexity:
+        As profile_city().
+
+    :Space complexity:
+        As profile_city().
+
+    """
+    parser = argparse.ArgumentParser(description="Profile the memory of a City construction.")
+    parser.add_argument("--input", help="JSON file with roads, stations, friend_start and optionally start")
+    parser.add_argument("--shape", choices=sorted(GENERATORS), default="grid", help="shape of a generated city")
+    parser.add_argument("--locations", type=int, default=2500, help="locations of a generated city")
+    parser.add_argument("--stations", type=int, default=10, help="stations of a generated city")
+    parser.add_argument("--loop", type=int, default=50, help="train loop duration of a generated city")
+    parser.add_argument("--seed", type=int, default=0, help="seed of a generated city")
+    parser.add_argument("--no-search", action="store_true", help="do not include the heap of a search")
+    parser.add_argument("--layers", action="store_true", help="include the memory of each multiverse layer")
+    parser.add_argument("--intercepts", type=int, default=0, help="also time the stages of this many intercept() calls")
+    parser.add_argument("--sample-every", type=int, default=1, help="time 1 in this many intercept() calls")
+    parser.add_argument("--spans", help="JSON lines file of the timed intercept() calls")
+    parser.add_argument("--output", help="JSON file for the report, standard output if omitted")
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input) as file:
+            city_input = json.load(file)
+        city_input["roads"] = [tuple(road) for road in city_input["roads"]]
+        city_input["stations"] = [tuple(station) for station in city_input["stations"]]
+    else:
+        city_input = generate_city(args.shape, args.locations, args.stations, args.loop, args.seed)
+
+    start = None if args.no_search else city_input.get("start")
+    report = profile_city(city_input["roads"], city_input["stations"], city_input["friend_start"], start)
+    if not args.layers:
+        del report["by_type"]["layers"]
+    if args.intercepts:
+        report["stages"] = profile_stages(city_input["roads"], city_input["stations"], args.intercepts, args.sample_every,
+                                          args.spans, args.seed)
+
+    peak = "n/a" if report["peak_bytes"] is None else f"{report['peak_bytes'] / 2 ** 20:.1f} MiB"
+    print(f"peak={peak} retained={report['retained_bytes'] / 2 ** 20:.1f} MiB "
+          f"multiverse_locations={report['multiverse_locations']}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
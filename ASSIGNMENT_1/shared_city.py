@@ -0,0 +1,495 @@
+"""
+:Module description:
+This module is a city of assignment1 stored in a multiprocessing.shared_memory block, for query workers
+in several processes. The roads in reality are stored as compressed adjacency arrays and the stations
+as a table, and the roads of the multiverse are computed from them as the search follows them instead of
+being constructed, so that the DijkstraSearch of assignment1 searches it as it searches a City. Workers
+attach to the block by name without copying it, and each worker keeps its own search state of flat arrays,
+so memory for N workers is one city and N search states, with no stored Location or Road objects whose
+reference counts would copy the pages of a forked city into every worker.
+
+:Classes:
+SharedCity  : Roads and stations of a city in a shared memory block, searched with a SearchState of each worker.
+
+:Functions:
+pool_intercept : Answers interception queries with a pool of worker processes attached to a shared city.
+
+"""
+
+__author__ = "Er Jun Yet"
+
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+from assignment1 import DijkstraSearch, Road, SearchState, WaitRoad, build_route, station_reach, train_schedule
+
+
+# Fields at the start of the block: locations in reality, multiverse layers, roads, stations, wait cost, waiting
+HEADER_FIELDS = 6
+ITEM_SIZE = 8
+
+
+class SharedCity:
+    """
+    :Class description:
+        Roads and stations of a city in one shared memory block of 64-bit integers: a header, the offsets of
+        the outgoing roads of each location in reality, the end, cost and time of each road, and the number
+        and travel time of each station. The multiverse is the same as City's, with the index of a location
+        of a multiverse layer at layer * total_reality_location + location_no, but its roads are computed
+        from the roads in reality when they are followed. It has the interface of City that DijkstraSearch
+        uses, without the Location objects given to on_settle.
+
+    :Attributes:
+        memory  (SharedMemory)  : The shared memory block
+        total_reality_location (int) : Total number of locations in reality.
+        total_multiverse (int)  : Number of multiverse layers, the total train loop duration.
+        wait_cost (int or None) : Cost per minute of waiting at a location, None when waiting is disabled.
+        offsets (memoryview)    : Index of the first outgoing road of each location, and the number of roads at the end.
+        ends    (memoryview)    : End location of each road.
+        costs   (memoryview)    : Cost of each road.
+        times   (memoryview)    : Time of each road.
+        stations (List[Tuple[int, int]]) : The train stations with their travel time.
+        horizon         (None)  : No horizon, as the layers wrap around the train loop.
+        state (SearchState or None) : Search state of the latest search of this process.
+        friend_start (int or None)  : Starting location number of the friend of the latest search.
+        acum_train_duration (List[int]) : Accumulated time for each station in the train loop from the friend's start.
+        station_targets (dict)  : Maps the index of each interception location in the multiverse to its station.
+
+    """
+    def __init__(self, memory):
+        """
+        :Function description:
+            Views the arrays of a shared memory block, without copying them.
+
+        :Input:
+            memory (SharedMemory) : A block written by create()
+
+        :Time complexity:
+            O(S), where S is the number of stations, for the station table.
+
+        :Space complexity:
+            O(S), where S is the number of stations.
+
+        """
+        self.memory = memory
+        items = memory.buf.cast("q")
+        self.items = items
+        total_reality_location, total_multiverse, total_roads, total_stations, wait_cost, waiting = items[:HEADER_FIELDS]
+        self.total_reality_location = total_reality_location
+        self.total_multiverse = total_multiverse
+        self.total_train_duration = total_multiverse
+        self.wait_cost = wait_cost if waiting else None
+        self.horizon = None
+        self.state = None
+        self.friend_start = None
+        self.acum_train_duration = []
+        self.station_targets = {}
+
+        # Arrays of the block, in order
+        position = HEADER_FIELDS
+        self.offsets = items[position:position + total_reality_location + 1]
+        position += total_reality_location + 1
+        self.ends = items[position:position + total_roads]
+        position += total_roads
+        self.costs = items[position:position + total_roads]
+        position += total_roads
+        self.times = items[position:position + total_roads]
+        position += total_roads
+        station_numbers = items[position:position + total_stations]
+        position += total_stations
+        station_times = items[position:position + total_stations]
+        self.stations = [(station_numbers[i], station_times[i]) for i in range(total_stations)]
+        station_numbers.release()
+        station_times.release()
+
+    @classmethod
+    def create(cls, roads, stations, wait_cost=None, prune=True, name=None):
+        """
+        :Function description:
+            Writes the roads and stations of a city into a new shared memory block. The outgoing roads of each
+            location keep the order of the roads, so searches break ties as a City of the same roads does.
+
+        :Input:
+            roads     (List[Tuple[int, int, int, int]]) : Roads of the city
+            stations  (List[Tuple[int, int]])           : Train stations of the city
+            wait_cost (int or None)                     : Cost per minute of waiting at a location, None if the driver never waits
+            prune     (bool)                            : Exclude roads from or to locations that cannot reach any station
+            name      (str or None)                     : Name of the block, None for a unique name
+
+        :Output:
+            SharedCity - The city, owning the block until unlink()
+
+        :Time complexity:
+            O(R + L + S), where R is the number of roads, L is the number of locations and S is the number of stations.
+
+        :Space complexity:
+            O(R + L + S) in the shared memory block.
+
+        """
+        # Total number of locations in reality, including stations without roads
+        total_reality_location = 0
+        for start, end, cost, time in roads:
+            total_reality_location = max(total_reality_location, start + 1, end + 1)
+        for station_no, travel_time in stations:
+            total_reality_location = max(total_reality_location, station_no + 1)
+
+        if prune:
+            station_reachable = station_reach(roads, stations)
+            roads = [road for road in roads if road[0] in station_reachable and road[1] in station_reachable]
+
+        # Roads of infinite cost are never taken, and the arrays only hold integers
+        roads = [road for road in roads if road[2] != float("inf")]
+
+        # Offsets of the outgoing roads of each location, then each road at the next free place of its start
+        offsets = [0] * (total_reality_location + 1)
+        for start, end, cost, time in roads:
+            offsets[start + 1] += 1
+        for location in range(total_reality_location):
+            offsets[location + 1] += offsets[location]
+        free = offsets[:-1]
+        ends = [0] * len(roads)
+        costs = [0] * len(roads)
+        times = [0] * len(roads)
+        for start, end, cost, time in roads:
+            ends[free[start]] = end
+            costs[free[start]] = cost
+            times[free[start]] = time
+            free[start] += 1
+
+        total_multiverse = sum(travel_time for station_no, travel_time in stations)
+        header = [total_reality_location, total_multiverse, len(roads), len(stations),
+                  wait_cost if wait_cost is not None else 0, int(wait_cost is not None)]
+        items = array("q", header + offsets + ends + costs + times
+                      + [station_no for station_no, travel_time in stations]
+                      + [travel_time for station_no, travel_time in stations])
+
+        memory = shared_memory.SharedMemory(name=name, create=True, size=len(items) * ITEM_SIZE)
+        memory.buf[:len(items) * ITEM_SIZE] = items.tobytes()
+        return cls(memory)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        :Function description:
+            Attaches to the block of a city created by another process, by name.
+
+        :Input:
+            name (str) : Name of the block
+
+        :Output:
+            SharedCity - The city, viewing the shared block
+
+        :Time complexity:
+            O(S), where S is the number of stations.
+
+        :Space complexity:
+            O(S), where S is the number of stations.
+
+        """
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        """
+        :Function description:
+            Name of the shared memory block, for workers to attach().
+
+        :Output:
+            str - The name
+
+        """
+        return self.memory.name
+
+    def close(self):
+        """
+        :Function description:
+            Releases the views of this process and closes its access to the block.
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        for view in (self.offsets, self.ends, self.costs, self.times, self.items):
+            view.release()
+        self.memory.close()
+
+    def unlink(self):
+        """
+        :Function description:
+            Frees the block once every process has closed it, called once by the process that created it.
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.memory.unlink()
+
+    def search_state(self):
+        """
+        :Function description:
+            A new search state for searches of this city in one process.
+
+        :Output:
+            SearchState - The search state
+
+        :Time complexity:
+            O(ML), where L is the number of locations and M is the number of multiverse layers.
+
+        :Space complexity:
+            O(ML), where L is the number of locations and M is the number of multiverse layers.
+
+        """
+        return SearchState(self.total_reality_location * self.total_multiverse)
+
+    def node_index(self, layer, location_no):
+        """
+        :Function description:
+            Index of a location of a multiverse layer, as City.node_index() with the "layer" layout.
+
+        :Input:
+            layer       (int) : Multiverse layer of the location
+            location_no (int) : Location number in reality
+
+        :Output:
+            int - Index of the location in the multiverse
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        return layer * self.total_reality_location + location_no
+
+    def node_position(self, location_index):
+        """
+        :Function description:
+            Multiverse layer and location number in reality of an index, the inverse of node_index().
+
+        :Input:
+            location_index (int) : Index of the location in the multiverse
+
+        :Output:
+            Tuple[int, int] - The multiverse layer and the location number
+
+        :Time complexity:
+            O(1)
+
+        :Space complexity:
+            O(1)
+
+        """
+        return divmod(location_index, self.total_reality_location)
+
+    def set_friend_start(self, friend_start):
+        """
+        :Function description:
+            Tracks the accumulated train duration of each station from the friend's starting station, and the
+            interception location of each station, as City.set_friend_start().
+
+        :Input:
+            friend_start (int) : Starting location number of the friend (on the train)
+
+        :Time complexity:
+            O(S), where S is the number of stations.
+
+        :Space complexity:
+            O(S), where S is the number of stations.
+
+        """
+        self.friend_start = friend_start
+        self.acum_train_duration = train_schedule(self.stations, friend_start)
+        self.station_targets = {}
+        for station in range(len(self.stations)):
+            multiverse = self.acum_train_duration[station] % self.total_multiverse
+            self.station_targets[self.node_index(multiverse, self.stations[station][0])] = station
+
+    def reset_city(self, start):
+        """
+        :Function description:
+            Resets the search state for a search from the start, as City.reset_city().
+
+        :Input:
+            start (int) : Index of the starting location
+
+        :Time complexity:
+            O(ML), where L is the number of locations and M is the number of multiverse layers.
+
+        :Space complexity:
+            O(1)
+
+        """
+        self.state.reset(start)
+
+    def roads_from(self, location_index):
+        """
+        :Function description:
+            Outgoing roads of a location in the multiverse, computed from its roads in reality into the multiverse
+            layer of their arrival, and the waiting road when waiting is allowed. The roads are not stored.
+
+        :Input:
+            location_index (int) : Index of the location in the multiverse
+
+        :Output:
+            List[Road] - Outgoing roads of the location
+
+        :Time complexity:
+            O(D), where D is the number of outgoing roads of the location.
+
+        :Space complexity:
+            O(D), where D is the number of outgoing roads of the location.
+
+        """
+        total_reality_location = self.total_reality_location
+        total_multiverse = self.total_multiverse
+        layer, location_no = divmod(location_index, total_reality_location)
+        outgoing_roads = []
+        for road in range(self.offsets[location_no], self.offsets[location_no + 1]):
+            time = self.times[road]
+            ending = ((layer + time) % total_multiverse) * total_reality_location + self.ends[road]
+            outgoing_roads.append(Road(location_index, ending, self.costs[road], time))
+        if self.wait_cost is not None:
+            ending = ((layer + 1) % total_multiverse) * total_reality_location + location_no
+            outgoing_roads.append(WaitRoad(location_index, ending, self.wait_cost, 1))
+        return outgoing_roads
+
+    def route_to(self, location_index):
+        """
+        :Function description:
+            Backtrack previous locations from a searched location to build its route from the start, as City.route_to().
+
+        :Input:
+            location_index (int) : Index of the searched location at the end of the route
+
+        :Output:
+            List[int] - Location numbers of the route in order of travel
+
+        :Time complexity:
+            O(P), where P is the number of locations in the route.
+
+        :Space complexity:
+            O(P), where P is the number of locations in the route.
+
+        """
+        state = self.state
+        steps = []
+        while location_index != -1:
+            steps.append((location_index % self.total_reality_location, state.cost[location_index], state.time[location_index],
+                          state.waited[location_index]))
+            location_index = state.previous[location_index]
+        steps.reverse()
+        return build_route(steps, {})
+
+    def intercept(self, start, friend_start, state=None):
+        """
+        :Function description:
+            Searches for the best route to intercept the friend, as intercept() does for a City of the same roads.
+
+        :Approach description:
+            1.  Track the interception location of each station from the friend's start.
+            2.  Search the city with a DijkstraSearch from the start in the first multiverse layer, which follows
+                the roads computed by roads_from(), until the best interception is known.
+            3.  Backtrack the route of the interception of least cost and earliest time.
+
+        :Input:
+            start        (int)               : Starting location number of the driver
+            friend_start (int)               : Starting location number of the friend (on the train)
+            state        (SearchState or None) : Search state of this process, None for a new one
+
+        :Output:
+            Tuple[int, int, List[int]] or None : The cost, time and route of the best interception, None when there is none
+
+        :Time complexity:
+            O(ML + MR log ML), where R is the number of roads, L is the number of locations and M is the number of multiverse layers.
+
+        :Space complexity:
+            O(ML) in the search state and the heap, and O(S) for the station targets.
+
+        """
+        self.state = state if state is not None else self.search_state()
+        self.set_friend_start(friend_start)
+        search = DijkstraSearch(self, start)
+        while not search.intercept_known():
+            if search.settle_next() is None:
+                break
+        if search.best_intercept is None:
+            return None
+        cost, time, station, location_index = search.best_intercept
+        return (cost, time, self.route_to(location_index))
+
+
+# Shared city and search state of a worker process, attached by _start_worker()
+_worker_city = None
+_worker_state = None
+
+def _start_worker(name):
+    """
+    :Function description:
+        Attaches a worker process to a shared city and allocates its search state.
+
+    :Input:
+        name (str) : Name of the shared memory block
+
+    :Time complexity:
+        O(ML), where L is the number of locations and M is the number of multiverse layers, for the search state.
+
+    :Space complexity:
+        O(ML), where L is the number of locations and M is the number of multiverse layers.
+
+    """
+    global _worker_city, _worker_state
+    _worker_city = SharedCity.attach(name)
+    _worker_state = _worker_city.search_state()
+
+def _intercept_in_worker(query):
+    """
+    :Function description:
+        Answers one query in a worker process.
+
+    :Input:
+        query (Tuple[int, int]) : Start of the driver and friend_start
+
+    :Output:
+        As SharedCity.intercept().
+
+    :Time complexity:
+        As SharedCity.intercept().
+
+    :Space complexity:
+        As SharedCity.intercept().
+
+    """
+    start, friend_start = query
+    return _worker_city.intercept(start, friend_start, _worker_state)
+
+def pool_intercept(city, queries, workers):
+    """
+    :Function description:
+        Answers interception queries with a pool of worker processes, which attach to the shared city
+        by name and each keep one search state.
+
+    :Input:
+        city    (SharedCity)            : The shared city
+        queries (List[Tuple[int, int]]) : Start of the driver and friend_start of each query
+        workers (int)                   : Number of worker processes
+
+    :Output:
+        List[Tuple[int, int, List[int]] or None] - The interception of each query, in order of the queries
+
+    :Time complexity:
+        As SharedCity.intercept() for each query, shared between the workers.
+
+    :Space complexity:
+        O(WML) for the search states of W workers, where L is the number of locations and M is the number of multiverse layers.
+
+    """
+    with multiprocessing.Pool(workers, _start_worker, (city.name,)) as pool:
+        return pool.map(_intercept_in_worker, queries)
@@ -0,0 +1,657 @@
+import unittest
+import json
+import asyncio
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import intercept_cli
+import assignment1
+from profiling import StageProfiler, HistogramSink, JsonLinesSink, profile_city, city_memory, object_size
+from benchmark import GENERATORS, LAYOUTS, generate_city, run_benchmark, compare_layouts
+from shared_city import SharedCity, pool_intercept
+from assignment1 import intercept, intercept_async, intercept_many, DenseIndex, min_cost_assignment, assign_fleet, expand_profile, INF, snapshot_diff, InterceptCache, compact_locations, locality_order, preprocess_roads, station_reach, City, HubLabelIndex, DijkstraSearch, SearchStats, Location, Road, LandmarkTable
+
+# City of the assignment specification, shared by the tests that need no particular city
+ROADS = [(0,1,35,7), (1,2,5,4), (2,0,35,6), (0,4,10,5), (4,1,22,3), (1,5,60,4), (5,3,70,2), (3,0,10,7)]
+STATIONS = [(4,2), (5,1), (3,4)]
+
+class TestWaitIntercept(unittest.TestCase):
+    def test_no_wait(self):
+        roads = [(0, 1, 1, 1), (1, 2, 50, 50)]
+        stations = [(1, 3), (2, 3)]
+        result = intercept(roads, stations, 0, 1)
+        self.assertEqual(result, (51, 51, [0, 1, 2]))
+
+    def test_free_wait(self):
+        roads = [(0, 1, 1, 1), (1, 2, 50, 50)]
+        stations = [(1, 3), (2, 3)]
+        result = intercept(roads, stations, 0, 1, wait_cost=0)
+        self.assertEqual(result, (1, 6, [0, 1]))
+
+    def test_paid_wait(self):
+        roads = [(0, 1, 1, 1), (1, 2, 50, 50)]
+        stations = [(1, 3), (2, 3)]
+        result = intercept(roads, stations, 0, 1, wait_cost=2)
+        self.assertEqual(result, (11, 6, [0, 1]))
+
+    def test_road_back_with_wait(self):
+        # Taking the road from 0 back to 0 is a stop of the route, even when waiting is allowed
+        roads = [(0, 0, 1, 1), (0, 1, 5, 1), (1, 2, 10, 1), (2, 1, 10, 1)]
+        stations = [(1, 2), (2, 1)]
+        expected = (7, 3, [0, 0, 0, 1])
+        for options in ({}, {'landmarks': 1}, {'bidirectional': True}, {'preprocess': True}):
+            self.assertEqual(intercept(roads, stations, 0, 1, wait_cost=3, **options), expected)
+        city = City(roads, stations, 1, wait_cost=3)
+        self.assertEqual(intercept(roads, stations, 0, 1, wait_cost=3, hub_index=HubLabelIndex.build(city)), expected)
+        self.assertEqual(intercept(roads, stations, 0, 1, wait_cost=3, hub_index=DenseIndex.build(city)), expected)
+        self.assertEqual(intercept(roads, stations, 0, 1, wait_cost=0), (5, 3, [0, 1]))
+        shared = SharedCity.create(roads, stations, 3)
+        try:
+            self.assertEqual(shared.intercept(0, 1), expected)
+        finally:
+            shared.close()
+            shared.unlink()
+
+class TestPreprocessRoads(unittest.TestCase):
+    def test_reduced_roads(self):
+        roads = [(0, 5, 1, 1), (0, 5, 3, 1), (5, 6, 1, 1), (6, 1, 1, 1), (1, 2, 2, 3), (2, 1, 2, 3)]
+        stations = [(1, 3), (2, 3)]
+        reduced, contracted = preprocess_roads(roads, stations, [0])
+        self.assertEqual(sorted(reduced), [(0, 1, 3, 3), (1, 2, 2, 3), (2, 1, 2, 3)])
+        self.assertEqual(contracted, {(0, 1, 3, 3): [5, 6]})
+
+    def test_expanded_route(self):
+        roads = [(0, 5, 1, 1), (0, 5, 3, 1), (5, 6, 1, 1), (6, 1, 1, 1), (1, 2, 2, 3), (2, 1, 2, 3)]
+        stations = [(1, 3), (2, 3)]
+        result = intercept(roads, stations, 0, 2, preprocess=True)
+        self.assertEqual(result, (3, 3, [0, 5, 6, 1]))
+
+    def test_keep_start(self):
+        result = intercept(ROADS, STATIONS, 0, 3, preprocess=True)
+        self.assertEqual(result, (160, 39, [0, 1, 2, 0, 1, 2, 0, 4]))
+
+class TestStationReach(unittest.TestCase):
+    def test_dead_ends(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 3, 1, 1), (3, 4, 1, 1), (5, 0, 1, 1)]
+        stations = [(1, 2), (2, 2)]
+        self.assertEqual(station_reach(roads, stations), {0, 1, 2, 5})
+
+    def test_unreachable_start(self):
+        roads = [(0, 1, 1, 1), (1, 0, 1, 1), (2, 3, 1, 1), (3, 2, 1, 1)]
+        stations = [(0, 1), (1, 1)]
+        self.assertIsNone(intercept(roads, stations, 2, 0))
+        self.assertIsNone(intercept(roads, stations, 2, 0, prune=False))
+
+    def test_pruned_route(self):
+        roads = [(6,0,3,1), (6,7,4,3), (6,5,6,2), (5,7,10,5), (4,8,8,5), (5,4,8,2),
+                 (8,9,1,2), (7,8,1,3), (8,3,2,3), (1,10,5,4), (0,1,10,3), (10,2,7,2),
+                 (3,2,15,2), (9,3,2,2), (2,4,10,5), (3,11,1,1), (11,12,1,1)]
+        stations = [(0,1), (5,1), (4,1), (3,1), (2,1), (1,1)]
+        self.assertEqual(intercept(roads, stations, 6, 0), (7, 9, [6,7,8,3]))
+
+    def test_pruned_locations(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 3, 1, 1), (3, 4, 1, 1), (5, 0, 1, 1)]
+        stations = [(1, 2), (2, 2)]
+        city = City(roads, stations, 1, 1, station_reachable=station_reach(roads, stations))
+        for location_index in range(len(city.multiverse_locations)):
+            location_no = city.node_position(location_index)[1]
+            self.assertEqual(city.multiverse_locations[location_index] is None, location_no in (3, 4))
+        updated = city.apply_diff({"added": [(4, 1, 1, 1)]})
+        self.assertTrue(all(location is not None for location in updated.multiverse_locations))
+        self.assertEqual(updated.apply_diff({"removed": [(4, 1, 1, 1)]}).multiverse_locations.count(None), 8)
+
+class TestHubLabelIndex(unittest.TestCase):
+    def test_same_intercept(self):
+        index = HubLabelIndex.build(City(ROADS, STATIONS, 3))
+        for start in range(6):
+            for friend_start in (4, 5, 3):
+                self.assertEqual(intercept(ROADS, STATIONS, start, friend_start, hub_index=index),
+                                 intercept(ROADS, STATIONS, start, friend_start))
+
+    def test_serialised(self):
+        roads = [(0, 5, 1, 1), (0, 5, 3, 1), (5, 6, 1, 1), (6, 1, 1, 1), (1, 2, 2, 3), (2, 1, 2, 3)]
+        stations = [(1, 3), (2, 3)]
+        reduced, contracted = preprocess_roads(roads, stations, [0])
+        index = HubLabelIndex.build(City(reduced, stations, 2, contracted_roads=contracted))
+        restored = HubLabelIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+        self.assertEqual(intercept(roads, stations, 0, 2, hub_index=restored), (3, 3, [0, 5, 6, 1]))
+
+    def test_start_outside_city(self):
+        roads = [(3,2,14,5), (1,2,10,3)]
+        stations = [(3,3), (2,4), (1,1), (0,4)]
+        index = HubLabelIndex.build(City(roads, stations, 3, 1))
+        self.assertEqual(index.node_index(0, 4), -1)
+        self.assertIsNone(intercept(roads, stations, 4, 3, 1, hub_index=index))
+        self.assertIsNone(intercept(roads, stations, -1, 3, 1, hub_index=index))
+
+class TestResumableSearch(unittest.TestCase):
+    def test_resumed_friends(self):
+        search = DijkstraSearch(City(ROADS, STATIONS, 4), 0)
+        for friend_start in (4, 5, 3):
+            self.assertEqual(intercept(ROADS, STATIONS, 0, friend_start, search=search),
+                             intercept(ROADS, STATIONS, 0, friend_start))
+
+    def test_partial_search(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 3, 50, 1), (3, 0, 50, 1)]
+        stations = [(1, 1), (2, 1)]
+        city = City(roads, stations, 2)
+        search = DijkstraSearch(city, 0)
+        self.assertEqual(intercept(roads, stations, 0, 2, search=search), (1, 1, [0, 1]))
+        self.assertLess(search.settled, len(city.multiverse_locations))
+
+    def test_wrong_start(self):
+        roads = [(0, 1, 1, 1), (1, 0, 1, 1)]
+        stations = [(0, 1), (1, 1)]
+        search = DijkstraSearch(City(roads, stations, 0), 0)
+        with self.assertRaises(ValueError):
+            intercept(roads, stations, 1, 0, search=search)
+
+class TestSearchStats(unittest.TestCase):
+    def test_intercept_stats(self):
+        roads = [(6,0,3,1), (6,7,4,3), (6,5,6,2), (5,7,10,5), (4,8,8,5), (5,4,8,2),
+                 (8,9,1,2), (7,8,1,3), (8,3,2,3), (1,10,5,4), (0,1,10,3), (10,2,7,2),
+                 (3,2,15,2), (9,3,2,2), (2,4,10,5)]
+        stations = [(0,1), (5,1), (4,1), (3,1), (2,1), (1,1)]
+        result, stats = intercept(roads, stations, 6, 0, return_stats=True)
+        self.assertEqual(result, (7, 9, [6,7,8,3]))
+        self.assertEqual(stats.heap_pops, stats.settled() + stats.stale_pops)
+        self.assertGreaterEqual(stats.relaxations, stats.decrease_keys)
+        # Only the locations reached are pushed, not every location of the multiverse
+        self.assertEqual(stats.max_heap_size, 5)
+
+    def test_settle_hook(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 0, 1, 1)]
+        stations = [(0, 1), (1, 1), (2, 1)]
+        city = City(roads, stations, 0)
+        settled = []
+        stats = SearchStats()
+        city.dijkstra_search(0, stats, lambda index, location: settled.append(index))
+        self.assertEqual(settled, [0, 4, 8])
+        self.assertEqual(stats.settled_per_layer, {0: 1, 1: 1, 2: 1})
+
+class TestCompactObjects(unittest.TestCase):
+    def test_slots(self):
+        location = Location(3)
+        road = Road(3, 4, 5, 6)
+        location.add_road(road)
+        self.assertFalse(hasattr(location, '__dict__'))
+        self.assertFalse(hasattr(road, '__dict__'))
+        self.assertEqual((road.start, road.end, road.cost, road.time), (3, 4, 5, 6))
+        self.assertEqual((location.location_no, location.outgoing_roads, location.visited, location.previous_location),
+                         (3, [road], False, None))
+
+    def test_settled_cost_and_time(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 0, 1, 1)]
+        stations = [(0, 1), (1, 1), (2, 1)]
+        city = City(roads, stations, 0)
+        settled = []
+        city.dijkstra_search(0, None, lambda index, location: settled.append(
+            (location.location_no, location.cost, location.time, location.visited,
+             location.previous_location and location.previous_location.location_no)))
+        self.assertEqual(settled, [(0, 0, 0, True, None), (1, 1, 1, True, 0), (2, 2, 2, True, 1)])
+
+    def test_search_state(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 0, 1, 1)]
+        stations = [(0, 1), (1, 1), (2, 1)]
+        city = City(roads, stations, 0)
+        search = DijkstraSearch(city, 0)
+        target = city.node_index(2, 2)
+        search.settle_until(target)
+        self.assertEqual((city.state.cost[target], city.state.time[target], city.state.visited[target]), (2, 2, 1))
+        self.assertEqual(city.route_to(target), [0, 1, 2])
+        self.assertEqual(city.state.cost[city.node_index(1, 0)], INF)
+
+class TestBidirectionalSearch(unittest.TestCase):
+    def test_same_intercept(self):
+        for start in range(6):
+            for friend_start in (4, 5, 3):
+                self.assertEqual(intercept(ROADS, STATIONS, start, friend_start, bidirectional=True),
+                                 intercept(ROADS, STATIONS, start, friend_start))
+
+    def test_start_at_friend(self):
+        roads = [(0, 1, 1, 1), (1, 0, 1, 1)]
+        stations = [(0, 1), (1, 1)]
+        self.assertEqual(intercept(roads, stations, 0, 0, bidirectional=True), (0, 0, [0]))
+
+    def test_unsolvable(self):
+        roads = [(0,1,35,3), (1,2,5,2), (2,0,35,4), (0,4,10,1), (4,1,22,2),
+                 (1,5,65,1), (5,2,70,1), (2,3,10,1), (3,0,20,3)]
+        stations = [(4,3), (5,2), (3,4)]
+        self.assertIsNone(intercept(roads, stations, 0, 4, bidirectional=True))
+
+class TestLandmarks(unittest.TestCase):
+    def test_lower_bounds(self):
+        roads = [(0, 1, 4, 1), (1, 2, 3, 1), (2, 3, 5, 1), (3, 0, 2, 1), (1, 3, 9, 1)]
+        stations = [(0, 2), (2, 2)]
+        city = City(roads, stations, 0)
+        table = city.build_landmarks(2)
+        exact = {(0, 2): 7, (1, 3): 8, (3, 1): 6, (2, 0): 7}
+        for (source, target), cost in exact.items():
+            self.assertLessEqual(table.lower_bound(source, target), cost)
+        self.assertEqual(city.station_potential[0], 0)
+        self.assertEqual(city.station_potential[2], 0)
+
+    def test_same_intercept(self):
+        roads = [(6,0,3,1), (6,7,4,3), (6,5,6,2), (5,7,10,5), (4,8,8,5), (5,4,8,2),
+                 (8,9,1,2), (7,8,1,3), (8,3,2,3), (1,10,5,4), (0,1,10,3), (10,2,7,2),
+                 (3,2,15,2), (9,3,2,2), (2,4,10,5)]
+        stations = [(0,1), (5,1), (4,1), (3,1), (2,1), (1,1)]
+        table = City(roads, stations, 0).build_landmarks(3)
+        restored = LandmarkTable.from_dict(json.loads(json.dumps(table.to_dict())))
+        self.assertEqual(list(restored.forward), list(table.forward))
+        for start in range(11):
+            self.assertEqual(intercept(roads, stations, start, 0, landmarks=restored),
+                             intercept(roads, stations, start, 0))
+
+    def test_free_wait_ties(self):
+        # Free waits tie in cost, so the earlier of two routes of equal cost must be settled first
+        roads = [(1,2,4,3), (2,5,3,1), (3,0,0,3), (4,2,0,4), (5,1,0,1), (5,1,2,2), (5,1,4,1)]
+        stations = [(5,2), (0,3)]
+        self.assertEqual(intercept(roads, stations, 4, 5, wait_cost=0, landmarks=1), (3, 5, [4, 2, 5]))
+        self.assertEqual(intercept(roads, stations, 4, 5, wait_cost=0), (3, 5, [4, 2, 5]))
+
+class TestDeadline(unittest.TestCase):
+    def test_finished(self):
+        roads = [(6,0,3,1), (6,7,4,3), (6,5,6,2), (5,7,10,5), (4,8,8,5), (5,4,8,2),
+                 (8,9,1,2), (7,8,1,3), (8,3,2,3), (1,10,5,4), (0,1,10,3), (10,2,7,2),
+                 (3,2,15,2), (9,3,2,2), (2,4,10,5)]
+        stations = [(0,1), (5,1), (4,1), (3,1), (2,1), (1,1)]
+        self.assertEqual(intercept(roads, stations, 6, 0, deadline=60), ((7, 9, [6,7,8,3]), True, 7))
+
+    def test_expired(self):
+        route, optimal, lower_bound = intercept(ROADS, STATIONS, 0, 3, deadline=0, check_every=1)
+        self.assertIsNone(route)
+        self.assertFalse(optimal)
+        self.assertLessEqual(lower_bound, 160)
+
+    def test_unsolvable(self):
+        roads = [(0,1,35,3), (1,2,5,2), (2,0,35,4), (0,4,10,1), (4,1,22,2),
+                 (1,5,65,1), (5,2,70,1), (2,3,10,1), (3,0,20,3)]
+        stations = [(4,3), (5,2), (3,4)]
+        self.assertEqual(intercept(roads, stations, 0, 4, deadline=60), (None, True, float('inf')))
+
+class TestInterceptAsync(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_cooperative(self):
+        for friend_start in (4, 5, 3):
+            self.assertEqual(asyncio.run(intercept_async(self.roads, self.stations, 0, friend_start, yield_every=1)),
+                             intercept(self.roads, self.stations, 0, friend_start))
+
+    def test_executor(self):
+        with ThreadPoolExecutor(1) as executor:
+            result = asyncio.run(intercept_async(self.roads, self.stations, 0, 3, executor=executor))
+        self.assertEqual(result, (160, 39, [0,1,2,0,1,2,0,4]))
+
+    def test_coalesced(self):
+        async def queries():
+            return await asyncio.gather(intercept_async(self.roads, self.stations, 0, 3),
+                                        intercept_async(self.roads, self.stations, 0, 3))
+        first, second = asyncio.run(queries())
+        self.assertEqual(first, (160, 39, [0,1,2,0,1,2,0,4]))
+        self.assertIs(first, second)
+
+class TestInterceptCli(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def run_cli(self, lines, *options):
+        with tempfile.TemporaryDirectory() as directory:
+            network = os.path.join(directory, 'network.json')
+            with open(network, 'w') as file:
+                json.dump({'roads': self.roads, 'stations': self.stations}, file)
+            output = io.StringIO()
+            intercept_cli.main([network, '--batch', '2', *options], io.StringIO(''.join(line + '\n' for line in lines)), output)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_queries(self):
+        queries = [(start, friend_start) for start in (2, 0, 1) for friend_start in (4, 5, 3)]
+        results = self.run_cli([json.dumps({'id': i, 'start': q[0], 'friend_start': q[1]}) for i, q in enumerate(queries)])
+        for i, (start, friend_start) in enumerate(queries):
+            expected = intercept(self.roads, self.stations, start, friend_start)
+            self.assertEqual(results[i]['id'], i)
+            self.assertEqual((results[i]['cost'], results[i]['time'], results[i]['route']), expected)
+
+    def test_invalid(self):
+        results = self.run_cli(['{"start": 0}', 'not json', '{"start": 0, "friend_start": 1}', '{"start": 0, "friend_start": 3}'])
+        self.assertIn('error', results[0])
+        self.assertIn('error', results[1])
+        self.assertIn('error', results[2])
+        self.assertEqual(results[3]['route'], [0,1,2,0,1,2,0,4])
+
+    def test_bool_locations(self):
+        results = self.run_cli(['{"start": true, "friend_start": 3}', '{"start": 0, "friend_start": false}'])
+        self.assertIn('error', results[0])
+        self.assertIn('error', results[1])
+
+    def test_workers(self):
+        lines = [json.dumps({'start': start, 'friend_start': 3}) for start in range(6)]
+        self.assertEqual(self.run_cli(lines, '--workers', '2'), self.run_cli(lines))
+
+class TestStationTargets(unittest.TestCase):
+    def test_targets(self):
+        city = City(ROADS, STATIONS, 3)
+        self.assertEqual(city.station_targets, {city.node_index(4, 4): 0, city.node_index(6, 5): 1, city.node_index(0, 3): 2})
+        city.set_friend_start(5)
+        self.assertEqual(city.station_targets, {city.node_index(5, 4): 0, city.node_index(0, 5): 1, city.node_index(1, 3): 2})
+
+    def test_recorded_when_settled(self):
+        roads = [(0, 1, 1, 1), (1, 2, 1, 1), (2, 3, 50, 1), (3, 0, 50, 1)]
+        stations = [(1, 1), (2, 1)]
+        city = City(roads, stations, 2)
+        search = DijkstraSearch(city, 0)
+        while search.best_intercept is None:
+            search.settle_next()
+        self.assertEqual(search.best_intercept, (1, 1, 0, city.node_index(1, 1)))
+        self.assertTrue(search.intercept_known())
+
+class TestSharedCity(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_same_intercept(self):
+        for wait_cost in (None, 0, 3):
+            city = SharedCity.create(self.roads, self.stations, wait_cost)
+            state = city.search_state()
+            try:
+                for start in range(6):
+                    for friend_start in (4, 5, 3):
+                        self.assertEqual(city.intercept(start, friend_start, state),
+                                         intercept(self.roads, self.stations, start, friend_start, wait_cost))
+            finally:
+                city.close()
+                city.unlink()
+
+    def test_attached_workers(self):
+        city = SharedCity.create(self.roads, self.stations)
+        try:
+            queries = [(start, friend_start) for start in range(6) for friend_start in (4, 5, 3)]
+            self.assertEqual(pool_intercept(city, queries, 2),
+                             [intercept(self.roads, self.stations, start, friend_start) for start, friend_start in queries])
+        finally:
+            city.close()
+            city.unlink()
+
+class TestRoadProfiles(unittest.TestCase):
+    roads = [(0, 1, 1, 1), (1, 0, 1, 1), (0, 2, 10, 2)]
+    stations = [(1, 2), (2, 2)]
+    profiles = {(0, 2, 10, 2): [(2, 1, 2)]}
+
+    def test_expand(self):
+        self.assertEqual(expand_profile([(1, 5, 2), (3, 7, 1)], 4, 9, 3), [(9, 3), (5, 2), (5, 2), (7, 1)])
+
+    def test_layer_cost(self):
+        self.assertEqual(intercept(self.roads, self.stations, 0, 2), (12, 4, [0, 1, 0, 2]))
+        self.assertEqual(intercept(self.roads, self.stations, 0, 2, road_profiles=self.profiles), (3, 4, [0, 1, 0, 2]))
+        self.assertEqual(intercept(self.roads, self.stations, 0, 1, road_profiles=self.profiles), (10, 2, [0, 2]))
+
+    def test_landmark_bounds(self):
+        for friend_start in (1, 2):
+            self.assertEqual(intercept(self.roads, self.stations, 0, friend_start, road_profiles=self.profiles, landmarks=2),
+                             intercept(self.roads, self.stations, 0, friend_start, road_profiles=self.profiles))
+
+    def test_no_preprocess(self):
+        with self.assertRaises(ValueError):
+            intercept(self.roads, self.stations, 0, 2, preprocess=True, road_profiles=self.profiles)
+
+class TestLoops(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_loop_reported(self):
+        self.assertEqual(intercept(self.roads, self.stations, 0, 3, with_loop=True), (160, 39, [0,1,2,0,1,2,0,4], 5))
+
+    def test_max_loops(self):
+        self.assertIsNone(intercept(self.roads, self.stations, 0, 3, max_loops=2))
+        self.assertEqual(intercept(self.roads, self.stations, 0, 3, max_loops=3, with_loop=True), (162, 14, [0,4,1,5,3], 2))
+        self.assertEqual(intercept(self.roads, self.stations, 0, 3, max_loops=6), (160, 39, [0,1,2,0,1,2,0,4]))
+
+    def test_dearer_earlier_route(self):
+        # The cheapest route to 0 arrives too late for the last loop, the dearer one arrives in time
+        roads = [(1,1,16,5), (1,1,18,6), (1,1,11,1), (1,0,9,4), (1,0,2,2), (1,0,3,4), (1,1,2,5),
+                 (0,1,9,5), (0,1,20,3), (1,1,4,6), (1,1,7,4), (1,0,13,6), (1,1,14,6), (1,0,5,3)]
+        stations = [(1,2)]
+        for options in ({}, {'landmarks': 1}, {'bidirectional': True}):
+            self.assertEqual(intercept(roads, stations, 0, 1, max_loops=3, **options)[:2], (31, 4))
+
+    def test_horizon_layers(self):
+        city = City(self.roads, self.stations, 3, horizon=20)
+        self.assertEqual(city.total_multiverse, 21)
+        self.assertEqual(sorted(city.node_position(index)[0] for index in city.target_locations()), [0, 4, 6, 7, 11, 13, 14, 18, 20])
+        self.assertTrue(all(city.node_position(road.end)[0] <= 20 for location in city.multiverse_locations
+                            for road in location.outgoing_roads))
+
+    def test_resumed_limit(self):
+        search = DijkstraSearch(City(self.roads, self.stations, 3), 0)
+        with self.assertRaises(ValueError):
+            intercept(self.roads, self.stations, 0, 3, search=search, max_loops=3)
+
+class TestInterceptOptions(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_unsupported_combinations(self):
+        city = City(self.roads, self.stations, 3, 2)
+        index = HubLabelIndex.build(city)
+        search = DijkstraSearch(city, 0)
+        built = [{'hub_index': index}, {'search': search}]
+        for options in built:
+            for option in ({'preprocess': True}, {'prune': False}, {'bidirectional': True}, {'landmarks': 2},
+                           {'road_profiles': {(0,1,35,7): [(3, 5, 7)]}}, {'compact_ids': True}, {'wait_cost': None}, {'wait_cost': 3}):
+                with self.assertRaises(ValueError):
+                    intercept(self.roads, self.stations, 0, 3, **dict({'wait_cost': 2}, **options, **option))
+            self.assertEqual(intercept(self.roads, self.stations, 0, 3, 2, **options), intercept(self.roads, self.stations, 0, 3, 2))
+        for options in ({'hub_index': index, 'search': search}, {'hub_index': index, 'max_loops': 3},
+                        {'bidirectional': True, 'landmarks': 2}, {'bidirectional': True, 'deadline': 1.0}):
+            with self.assertRaises(ValueError):
+                intercept(self.roads, self.stations, 0, 3, 2, **options)
+
+class TestSnapshotDiff(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_diff(self):
+        new_roads = [(0,1,35,7), (1,2,5,4), (2,0,30,6), (0,4,10,5), (4,1,22,3), (1,5,60,4), (3,0,10,7), (5,0,1,1)]
+        self.assertEqual(snapshot_diff(self.roads, new_roads),
+                         {'added': [(5,0,1,1)], 'removed': [(5,3,70,2)], 'changed': [((2,0,35,6), (2,0,30,6))]})
+
+    def test_shared_city(self):
+        new_roads = [(0,1,35,7), (1,2,5,4), (2,0,30,6), (0,4,10,5), (4,1,22,3), (1,5,60,4), (5,3,70,2), (3,0,10,7)]
+        city = City(self.roads, self.stations, 3)
+        updated = city.apply_diff(snapshot_diff(self.roads, new_roads))
+        for index in range(len(city.multiverse_locations)):
+            self.assertIs(updated.multiverse_locations[index].city, updated)
+            if city.node_position(index)[1] == 2:
+                self.assertIsNot(updated.multiverse_locations[index].outgoing_roads,
+                                 city.multiverse_locations[index].outgoing_roads)
+            else:
+                self.assertIs(updated.multiverse_locations[index].outgoing_roads,
+                              city.multiverse_locations[index].outgoing_roads)
+        for start in range(6):
+            for friend_start in (4, 5, 3):
+                updated.set_friend_start(friend_start)
+                self.assertEqual(intercept(new_roads, self.stations, start, friend_start, search=DijkstraSearch(updated, start)),
+                                 intercept(new_roads, self.stations, start, friend_start, prune=False))
+
+    def test_new_multiverse(self):
+        city = City(self.roads, self.stations, 3)
+        updated = city.apply_diff({'stations': [(4,2), (5,1), (3,5)]})
+        self.assertEqual(updated.total_multiverse, 8)
+        with self.assertRaises(ValueError):
+            city.apply_diff({'removed': [(0,1,1,1)]})
+
+    def test_cache(self):
+        cache = InterceptCache()
+        for friend_start in (4, 5, 3):
+            cache.put(0, friend_start, intercept(self.roads, self.stations, 0, friend_start))
+        self.assertEqual(cache.get(0, 3), (160, 39, [0,1,2,0,1,2,0,4]))
+        self.assertEqual(cache.invalidate({'changed': [((2,0,35,6), (2,0,40,6))]}), 2)
+        self.assertNotIn((0, 3), cache)
+        self.assertEqual(cache.get(0, 5), (10, 5, [0, 4]))
+        self.assertEqual(cache.invalidate({'added': [(5,0,1,1)]}), 1)
+        self.assertEqual(len(cache), 0)
+
+class TestCompactIds(unittest.TestCase):
+    def test_compact(self):
+        roads = [(10**9, 7, 1, 1), (7, 10**9, 2, 1)]
+        self.assertEqual(compact_locations(roads, [(7, 1), (10**9, 1)], [5]),
+                         ([(0, 1, 1, 1), (1, 0, 2, 1)], [(1, 1), (0, 1)], [10**9, 7, 5], {10**9: 0, 7: 1, 5: 2}))
+
+    def test_sparse_intercept(self):
+        ids = [10**9 + 6, 3, 70000, 10**9, 12, 555]
+        roads = [(ids[a], ids[b], cost, time) for a, b, cost, time in ROADS]
+        stations = [(ids[station_no], travel_time) for station_no, travel_time in STATIONS]
+        self.assertEqual(intercept(roads, stations, ids[0], ids[3], compact_ids=True),
+                         (160, 39, [ids[location] for location in [0,1,2,0,1,2,0,4]]))
+
+class TestLocalityOrder(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_order(self):
+        roads = [(0,3,1,1), (3,1,1,1), (1,2,1,1)]
+        self.assertEqual(locality_order(roads, 5, "bfs"), [0,3,1,2,4])
+        self.assertEqual(locality_order(roads, 5, "rcm"), [2,1,3,0,4])
+        self.assertRaises(ValueError, locality_order, roads, 5, "random")
+
+    def test_layouts(self):
+        for order in (None, "bfs", "rcm"):
+            for layout in ("layer", "location"):
+                city = City(self.roads, self.stations, 3, order=order, layout=layout)
+                for location_index in range(len(city.multiverse_locations)):
+                    layer, location_no = city.node_position(location_index)
+                    self.assertEqual(city.node_index(layer, location_no), location_index)
+                    self.assertEqual(city.multiverse_locations[location_index].location_no, location_no)
+                search = DijkstraSearch(city, 0)
+                self.assertEqual(intercept(self.roads, self.stations, 0, 3, search=search), (160, 39, [0,1,2,0,1,2,0,4]))
+                index = HubLabelIndex.build(city)
+                self.assertEqual(intercept(self.roads, self.stations, 0, 3, hub_index=index)[:2], (160, 39))
+        self.assertRaises(ValueError, City, self.roads, self.stations, 3, layout="diagonal")
+
+class TestDenseIndex(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_dense_index(self):
+        city = City(self.roads, self.stations, 3, station_reachable=station_reach(self.roads, self.stations))
+        index = DenseIndex.build(city)
+        self.assertEqual(DenseIndex.table_size(city), len(index.location_numbers))
+        self.assertEqual(intercept(self.roads, self.stations, 0, 3, hub_index=index), (160, 39, [0,1,2,0,1,2,0,4]))
+        self.assertIsNone(intercept(self.roads, self.stations, 9, 3, hub_index=index))
+
+    def test_dense_and_sparse(self):
+        queries = [(start, friend_start) for start in range(6) for friend_start in (4, 5, 3)] + [(9, 3)]
+        for wait_cost in (None, 1):
+            dense = intercept_many(self.roads, self.stations, queries, wait_cost, dense=True)
+            sparse = intercept_many(self.roads, self.stations, queries, wait_cost, dense=False)
+            self.assertEqual(sparse[:-1], [intercept(self.roads, self.stations, start, friend_start, wait_cost)
+                                           for start, friend_start in queries[:-1]])
+            self.assertEqual([result and result[:2] for result in dense], [result and result[:2] for result in sparse])
+            chosen = intercept_many(self.roads, self.stations, queries, wait_cost)
+            self.assertEqual([result and result[:2] for result in chosen], [result and result[:2] for result in sparse])
+            self.assertIsNone(dense[-1])
+
+    def test_no_stations(self):
+        self.assertIsNone(intercept(self.roads, [], 0, 3))
+        self.assertEqual(intercept_many(self.roads, [], [(0, 3), (1, 4)]), [None, None])
+
+class TestStageProfiler(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_sampled_stages(self):
+        histogram = HistogramSink()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            sink = JsonLinesSink(path)
+            with StageProfiler([histogram, sink], sample_every=2):
+                for _ in range(4):
+                    self.assertEqual(intercept(self.roads, self.stations, 0, 3), (160, 39, [0,1,2,0,1,2,0,4]))
+            sink.close()
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+        self.assertIsNone(assignment1._profiler)
+        self.assertEqual([list(line["stages"]) for line in lines], [["construction", "reset", "search", "route"]] * 2)
+        summary = histogram.summary()
+        self.assertEqual(summary["total"]["count"], 2)
+        self.assertEqual(sum(summary["search"]["buckets_us"].values()), 2)
+
+    def test_resumed_and_index(self):
+        histogram = HistogramSink()
+        city = City(self.roads, self.stations, 3)
+        index = HubLabelIndex.build(city)
+        with StageProfiler([histogram]):
+            intercept(self.roads, self.stations, 0, 3, search=DijkstraSearch(city, 0))
+            intercept(self.roads, self.stations, 0, 3, hub_index=index)
+        self.assertEqual(sorted(histogram.summary()), ["reset", "route", "search", "stations", "total"])
+        self.assertEqual(histogram.summary()["stations"]["count"], 2)
+
+class TestBenchmark(unittest.TestCase):
+    def test_seeded_generator(self):
+        for shape in GENERATORS:
+            self.assertEqual(generate_city(shape, 50, 3, 6, seed=2), generate_city(shape, 50, 3, 6, seed=2))
+
+    def test_stages(self):
+        city_input = generate_city("suburban", 50, 3, 6, seed=2)
+        result = run_benchmark(city_input)
+        self.assertEqual(sorted(result["seconds"]), ["construction", "routes", "search"])
+        self.assertEqual(result["multiverse_locations"], result["locations"] * result["multiverse_layers"])
+        self.assertGreater(result["search_stats"]["settled"], 0)
+        results = compare_layouts(city_input)
+        self.assertEqual([(result["order"], result["layout"]) for result in results], LAYOUTS)
+        for result in results:
+            self.assertEqual(sorted(result["seconds"]), ["construction", "routes", "search"])
+
+class TestMemoryProfile(unittest.TestCase):
+    def test_profile_city(self):
+        city_input = generate_city("grid", 50, 3, 6, seed=1)
+        report = profile_city(city_input["roads"], city_input["stations"], city_input["friend_start"], city_input["start"])
+        self.assertEqual(len(report["by_type"]["layers"]), report["multiverse_layers"])
+        self.assertGreaterEqual(report["peak_bytes"], report["retained_bytes"])
+        self.assertGreater(report["retained_bytes"], 0)
+        self.assertTrue(report["top_lines"])
+        self.assertGreater(report["by_type"]["total"]["tuple"], 0)
+
+    def test_city_memory(self):
+        city = City([(0, 1, 1, 1), (1, 0, 1, 1)], [(0, 1), (1, 1)], 0)
+        memory = city_memory(city)
+        self.assertEqual(len(memory["layers"]), 2)
+        self.assertEqual(memory["total"]["Location"], 4 * object_size(city.multiverse_locations[0]))
+        self.assertEqual(memory["total"]["Road"], 4 * object_size(city.multiverse_locations[0].outgoing_roads[0]))
+        self.assertEqual(memory["total"]["tuple"], 0)
+
+    def test_object_size(self):
+        class Plain:
+            pass
+        plain = Plain()
+        plain.value = 1
+        self.assertGreater(object_size(plain), object_size(Location(0)))
+
+class TestFleet(unittest.TestCase):
+    roads = ROADS
+    stations = STATIONS
+
+    def test_min_cost_assignment(self):
+        self.assertEqual(min_cost_assignment([[4,1,3], [2,0,5], [3,2,2]]), [(0,1), (1,0), (2,2)])
+        self.assertEqual(min_cost_assignment([[7,3], [1,9], [2,2]]), [(1,0), (2,1)])
+        self.assertEqual(min_cost_assignment([]), [])
+
+    def test_assign_fleet(self):
+        drivers = [0, 2, 9]
+        friends = [3, 5]
+        results = [assign_fleet(self.roads, self.stations, drivers, friends, direction=direction) for direction in ("forward", "backward")]
+        for result in results:
+            self.assertEqual(result["unassigned_drivers"], [2])
+            for pair in result["assignment"]:
+                self.assertEqual(intercept(self.roads, self.stations, drivers[pair["driver"]], friends[pair["friend"]])[:2],
+                                 (pair["cost"], pair["time"]))
+        self.assertEqual((results[0]["total_cost"], results[0]["total_time"]), (results[1]["total_cost"], results[1]["total_time"]))
+        self.assertEqual(results[0]["searches"], 2)
+        self.assertEqual(results[1]["searches"], 2)
+        self.assertIn("searches", results[0]["seconds"])
+        self.assertRaises(ValueError, assign_fleet, self.roads, self.stations, drivers, [1])
+
+if __name__ == '__main__':
+    unittest.main()